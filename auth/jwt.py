@@ -11,6 +11,7 @@ from datetime import timezone
 
 from database import get_db
 from models.user import User
+from auth.principal_cache import load_principal
 
 # ======================
 # CONFIG JWT (ENV)
@@ -27,12 +28,14 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 # ======================
 def create_access_token(user_id: int, role: str, expires_delta: Optional[timedelta] = None) -> str:
     """Crée un JWT access token avec l'ID utilisateur et son rôle"""
-    expire = datetime.now(timezone.utc) + (
+    now = datetime.now(timezone.utc)
+    expire = now + (
         expires_delta if expires_delta else timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     payload = {
         "sub": str(user_id),   # ⚠️ ID utilisateur
         "role": role,          # ⚠️ rôle ajouté
+        "iat": now,            # clé du cache des utilisateurs authentifiés
         "exp": expire
     }
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
@@ -52,31 +55,44 @@ def create_refresh_token(user_id: int, role: str, expires_delta: Optional[timede
     }
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
+# ======================
+# PRINCIPAL DE LA REQUÊTE
+# ======================
+def resolve_principal(request: Request, db: Session, token: Optional[str]) -> Optional[User]:
+    """
+    Résout l'utilisateur du token une seule fois par requête : le résultat est
+    gardé sur request.state et réutilisé par toutes les dépendances
+    (get_current_user, get_current_user_optional, require_role...).
+    """
+    state = request.state
+    if getattr(state, "principal_token", None) == token and hasattr(state, "principal"):
+        return state.principal
+
+    user = None
+    payload = decode_access_token(token) if token else None
+    if payload and payload.get("sub"):
+        user = load_principal(db, payload)
+
+    state.principal_token = token
+    state.principal = user
+    return user
+
 # ======================
 # USER OBLIGATOIRE (API protégée)
 # ======================
 def get_current_user(
+    request: Request,
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
 ) -> User:
     """Récupère l'utilisateur courant à partir du JWT"""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Token invalide ou expiré ❌",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        if not user_id:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    user = db.query(User).filter(User.id == int(user_id)).first()
+    user = resolve_principal(request, db, token)
     if not user:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token invalide ou expiré ❌",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
     return user
 
@@ -92,15 +108,7 @@ def get_current_user_optional(
     if not token:
         return None
 
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        if not user_id:
-            return None
-    except JWTError:
-        return None
-
-    return db.query(User).filter(User.id == int(user_id)).first()
+    return resolve_principal(request, db, token)
 
 # ======================
 # DÉCODAGE SIMPLE
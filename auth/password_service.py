@@ -0,0 +1,129 @@
+# auth/password_service.py
+"""
+Service de hachage des mots de passe.
+
+bcrypt est volontairement coûteux en CPU : exécuté directement dans une
+route async, un seul login bloque toute la boucle d'événements du worker.
+Toutes les opérations passent donc par un pool borné (threads par défaut,
+processus si PASSWORD_HASH_EXECUTOR=process) :
+
+- PASSWORD_HASH_WORKERS : nombre de hachages simultanés (plafond) ;
+- PASSWORD_HASH_MAX_QUEUE : nombre de demandes en attente au-delà duquel
+  on répond 503 plutôt que d'empiler les logins.
+
+Les routes async utilisent `await password_service.hash(...)` /
+`verify(...)`, les routes synchrones (déjà dans le threadpool FastAPI)
+`hash_sync(...)` / `verify_sync(...)`, qui respectent le même plafond.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from fastapi import HTTPException
+
+from auth import security
+
+
+def _hash(password: str) -> str:
+    return security.hash_password(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return security.verify_password(plain_password, hashed_password)
+
+
+class PasswordService:
+    def __init__(self, max_workers: int = 4, max_queue: int = 64, use_processes: bool = False):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.use_processes = use_processes
+        self._executor = None
+        self._lock = threading.Lock()
+        self.in_flight = 0        # demandes soumises et non terminées
+        self.completed = 0
+        self.rejected = 0
+        self.total_seconds = 0.0
+        self.max_queue_depth_seen = 0
+
+    # ===================== POOL =====================
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    pool = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+                    kwargs = {} if self.use_processes else {"thread_name_prefix": "password-hash"}
+                    self._executor = pool(max_workers=self.max_workers, **kwargs)
+        return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            queue_depth = max(0, self.in_flight - self.max_workers)
+            if queue_depth >= self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Service d'authentification surchargé, réessayez dans un instant",
+                    headers={"Retry-After": "1"},
+                )
+            self.in_flight += 1
+            self.max_queue_depth_seen = max(self.max_queue_depth_seen, self.in_flight - self.max_workers)
+
+        started = time.perf_counter()
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            self._done(started)
+            raise
+        future.add_done_callback(lambda _: self._done(started))
+        return future
+
+    def _done(self, started: float):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+            self.total_seconds += time.perf_counter() - started
+
+    # ===================== API ASYNC =====================
+    async def hash(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(_hash, password))
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(self._submit(_verify, plain_password, hashed_password))
+
+    # ===================== API SYNCHRONE =====================
+    def hash_sync(self, password: str) -> str:
+        return self._submit(_hash, password).result()
+
+    def verify_sync(self, plain_password: str, hashed_password: str) -> bool:
+        return self._submit(_verify, plain_password, hashed_password).result()
+
+    # ===================== MÉTRIQUES =====================
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "executor": "process" if self.use_processes else "thread",
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "queue_depth": max(0, self.in_flight - self.max_workers),
+                "max_queue_depth_seen": self.max_queue_depth_seen,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_ms": round(self.total_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+            }
+
+
+password_service = PasswordService(
+    max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1))),
+    max_queue=int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 64)),
+    use_processes=os.getenv("PASSWORD_HASH_EXECUTOR", "thread").lower() == "process",
+)
@@ -1,15 +1,38 @@
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy.orm import Session
+
+from database import get_db
 from models.user import User
+from models.audit import AuditAction
+from services.audit_writer import audit_writer
 from auth.jwt import get_current_user
 
-def require_role(*roles):
+
+def log_forbidden_attempt(db: Session, user: User, description: str, details: dict | None = None):
+    """Trace une tentative d'accès refusée (événement de sécurité : écrit immédiatement)"""
+    audit_writer.write_now(db, user.id, user.role, description, AuditAction.FORBIDDEN, details)
+
+
+def require_role(*roles, detail: str = "Accès interdit ❌", audit_message: str | None = None):
     """
     Vérifie que l'utilisateur connecté possède un rôle autorisé.
+    Le principal est résolu une seule fois par requête (request.state) :
+    combiner require_role et Depends(get_current_user) ne relit pas le token.
     Exemple :
         @router.get("/admin", dependencies=[Depends(require_role("admin", "super_admin"))])
     """
-    def wrapper(current_user: User = Depends(get_current_user)):
+    def wrapper(
+        request: Request,
+        current_user: User = Depends(get_current_user),
+        db: Session = Depends(get_db)
+    ):
         if current_user.role not in roles:
-            raise HTTPException(status_code=403, detail="Accès interdit ❌")
+            log_forbidden_attempt(
+                db,
+                current_user,
+                audit_message or f"Tentative d'accès non autorisée à {request.url.path}",
+                {"path": request.url.path, "method": request.method}
+            )
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
         return current_user
     return wrapper
@@ -0,0 +1,86 @@
+# auth/principal_cache.py
+"""
+Cache court (TTL) de l'utilisateur authentifié, par processus.
+
+La clé est (sub, iat) du JWT : un nouveau token produit une nouvelle entrée.
+On garde les valeurs des colonnes de User (pas l'objet ORM, lié à une
+session) et on reconstruit à chaque requête une instance rattachée à la
+session courante via merge(load=False), sans aller-retour en base.
+
+Toute écriture ORM sur un utilisateur (rôle, statut, suppression...)
+invalide ses entrées au commit.
+"""
+import os
+from itertools import chain
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from models.user import User
+from services.cache import TTLCache
+
+principal_cache = TTLCache(
+    maxsize=int(os.getenv("PRINCIPAL_CACHE_MAXSIZE", 1024)),
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", 30)),
+    name="user_principals",
+)
+
+USER_COLUMNS = tuple(column.key for column in inspect(User).column_attrs)
+
+
+def _snapshot(user: User) -> dict:
+    return {key: getattr(user, key) for key in USER_COLUMNS}
+
+
+def _attach(db: Session, values: dict) -> User:
+    """Instance User rattachée à la session, sans SELECT"""
+    user = User(**values)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
+def load_principal(db: Session, payload: dict) -> User | None:
+    """Utilisateur désigné par le JWT décodé (cache puis base)"""
+    user_id = payload.get("sub")
+    if not user_id:
+        return None
+    user_id = int(user_id)
+
+    iat = payload.get("iat")
+    cache_key = (user_id, iat)
+    if iat is not None:
+        values = principal_cache.get(cache_key)
+        if values is not None:
+            return _attach(db, values)
+
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is not None and iat is not None:
+        principal_cache.set(cache_key, _snapshot(user), tags=[f"user:{user_id}"])
+    return user
+
+
+# ====================== INVALIDATION ======================
+PENDING_TAGS_KEY = "principal_cache_tags"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_user_writes(session, flush_context):
+    tags = {
+        f"user:{obj.id}"
+        for obj in chain(session.dirty, session.deleted)
+        if isinstance(obj, User) and obj.id is not None
+    }
+    if tags:
+        session.info.setdefault(PENDING_TAGS_KEY, set()).update(tags)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    tags = session.info.pop(PENDING_TAGS_KEY, None)
+    if tags:
+        principal_cache.invalidate_tags(tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop(PENDING_TAGS_KEY, None)
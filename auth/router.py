@@ -2,19 +2,18 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta, timezone
-import resend
-import os
-import bcrypt
 from pydantic import BaseModel  # ✅ AJOUTÉ
 
-from database import get_db
+from database import get_db, unit_of_work
 from models.user import User
 from models.profile import Profile
-from models.audit import Audit
+from models.audit import Audit, AuditAction
 from models.refresh_token import RefreshToken
 
 from auth.schemas import UserCreate, UserLogin, Token
-from auth.security import hash_password, verify_password
+from auth.password_service import password_service
+from services.email_outbox import enqueue_email
+from services.audit_writer import audit_writer
 from auth.jwt import create_access_token, create_refresh_token, decode_access_token, create_activation_token, get_current_user
 
 router = APIRouter(
@@ -31,83 +30,76 @@ def register(user_data: UserCreate, request: Request, db: Session = Depends(get_
     if existing_user:
         raise HTTPException(status_code=400, detail="Email déjà utilisé")
 
-    # Créer l'utilisateur
-    user = User(
-        email=user_data.email,
-        password=hash_password(user_data.password),
-        role="researcher",
-        status="inactive",
-        is_active=False
-    )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-
-    # Créer le profil
-    profile = Profile(
-        user_id=user.id,
-        first_name=user_data.first_name,
-        last_name=user_data.last_name,
-        grade="Non spécifié"
-    )
-    db.add(profile)
-    db.commit()
+    hashed_password = password_service.hash_sync(user_data.password)
+
+    # Une seule transaction : utilisateur, profil, audit, email et refresh token
+    with unit_of_work(db):
+        # Créer l'utilisateur
+        user = User(
+            email=user_data.email,
+            password=hashed_password,
+            role="researcher",
+            status="inactive",
+            is_active=False
+        )
+        db.add(user)
+        db.flush()  # ID de l'utilisateur
+
+        # Créer le profil
+        profile = Profile(
+            user_id=user.id,
+            first_name=user_data.first_name,
+            last_name=user_data.last_name,
+            grade="Non spécifié"
+        )
+        db.add(profile)
 
-    # Audit
-    audit_log = Audit(
-        user_id=user.id,
-        user_role=user.role,
-        action_description="Nouvel utilisateur inscrit"
-    )
-    db.add(audit_log)
-    db.commit()
+        # Audit
+        audit_log = Audit(
+            user_id=user.id,
+            user_role=user.role,
+            action_description="Nouvel utilisateur inscrit"
+        )
+        db.add(audit_log)
 
-    # Générer le token JWT d'activation
-    activation_token = create_activation_token(user.email)
-    activation_link = f"http://localhost:3000/auth/activate?token={activation_token}"
-    print(f"\n🔗 LIEN D'ACTIVATION JWT : {activation_link}\n")
-
-    # Envoi de l'email d'activation via Resend
-    resend.api_key = os.getenv("RESEND_API_KEY")
-    try:
-        resend.Emails.send(
-            {
-                "from": "Activation <onboarding@resend.dev>",
-                "to": [user.email],
-                "subject": "Active ton compte chercheur",
-                "html": f"""
-                <h2>Bienvenue sur InchTechs</h2>
-                <p>Clique sur le lien ci-dessous pour activer ton compte :</p>
-                <a href="{activation_link}">{activation_link}</a>
-                <p>Ce lien expire dans 24h.</p>
-                """
-            }
+        # Générer le token JWT d'activation
+        activation_token = create_activation_token(user.email)
+        activation_link = f"http://localhost:3000/auth/activate?token={activation_token}"
+        print(f"\n🔗 LIEN D'ACTIVATION JWT : {activation_link}\n")
+
+        # Email d'activation : mis en outbox, envoyé par le worker après le commit
+        enqueue_email(
+            db,
+            to_email=user.email,
+            subject="Active ton compte chercheur",
+            html=f"""
+            <h2>Bienvenue sur InchTechs</h2>
+            <p>Clique sur le lien ci-dessous pour activer ton compte :</p>
+            <a href="{activation_link}">{activation_link}</a>
+            <p>Ce lien expire dans 24h.</p>
+            """
         )
-        print(f"✅ Email d'activation envoyé à {user.email}")
-    except Exception as e:
-        print(f"❌ Erreur envoi email : {e}")
 
-    # Créer les tokens de session
-    access_token = create_access_token(
-        user_id=user.id,
-        role=user.role,
-        expires_delta=timedelta(minutes=15)
-    )
-    refresh_token = create_refresh_token(
-        user_id=user.id,
-        role=user.role,
-        expires_delta=timedelta(days=7)
-    )
+        # Créer les tokens de session
+        access_token = create_access_token(
+            user_id=user.id,
+            role=user.role,
+            expires_delta=timedelta(minutes=15)
+        )
+        refresh_token = create_refresh_token(
+            user_id=user.id,
+            role=user.role,
+            expires_delta=timedelta(days=7)
+        )
 
-    # Stocker refresh token
-    db_refresh = RefreshToken(
-        user_id=user.id,
-        token=refresh_token,
-        expires_at=datetime.now(timezone.utc) + timedelta(days=7),
-        revoked=False
-    )
-    db.add(db_refresh)
-    db.commit()
+        # Stocker refresh token
+        db_refresh = RefreshToken(
+            user_id=user.id,
+            token=refresh_token,
+            expires_at=datetime.now(timezone.utc) + timedelta(days=7),
+            revoked=False
+        )
+        db.add(db_refresh)
 
     response = JSONResponse({
         "access_token": access_token,
@@ -126,7 +118,7 @@ def register(user_data: UserCreate, request: Request, db: Session = Depends(get_
 def login(user_data: UserLogin, request: Request, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.email == user_data.email).first()
 
-    if not user or not verify_password(user_data.password, user.password):
+    if not user or not password_service.verify_sync(user_data.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Identifiants incorrects")
 
     if user.status != "active":
@@ -147,14 +139,6 @@ def login(user_data: UserLogin, request: Request, db: Session = Depends(get_db))
         expires_delta=timedelta(days=7)
     )
 
-    # Audit
-    audit_log = Audit(
-        user_id=user.id,
-        user_role=user.role,
-        action_description="Connexion réussie"
-    )
-    db.add(audit_log)
-
     # Stocker refresh token
     db_refresh = RefreshToken(
         user_id=user.id,
@@ -165,6 +149,8 @@ def login(user_data: UserLogin, request: Request, db: Session = Depends(get_db))
     db.add(db_refresh)
     db.commit()
 
+    audit_writer.enqueue(db, user.id, user.role, "Connexion réussie", AuditAction.LOGIN)
+
     response = JSONResponse({
         "access_token": access_token,
         "refresh_token": refresh_token,
@@ -240,13 +226,7 @@ def logout(request: Request, db: Session = Depends(get_db)):
             db.commit()
 
     if user_id is not None:
-        audit_log = Audit(
-            user_id=user_id,
-            user_role=user_role,
-            action_description="Déconnexion"
-        )
-        db.add(audit_log)
-        db.commit()
+        audit_writer.enqueue(db, user_id, user_role, "Déconnexion", AuditAction.LOGOUT)
 
     response = JSONResponse({"message": "Déconnecté ✅"})
     response.delete_cookie("access_token")
@@ -268,11 +248,11 @@ def change_password(
     current_user: User = Depends(get_current_user)
 ):
     # Vérifier l'ancien mot de passe
-    if not verify_password(request.current_password, current_user.password):
+    if not password_service.verify_sync(request.current_password, current_user.password):
         raise HTTPException(status_code=401, detail="Mot de passe actuel incorrect")
     
     # Hacher le nouveau mot de passe
-    new_hashed = bcrypt.hashpw(request.new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    new_hashed = password_service.hash_sync(request.new_password)
     current_user.password = new_hashed
     db.commit()
     
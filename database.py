@@ -1,8 +1,13 @@
 import os
+from contextlib import contextmanager
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+from services.db_pool import PoolMetrics, engine_options
+from services.db_routing import RoutingSession, replica_health, routing_info
+
 load_dotenv()
 
 # Détecte l'environnement et choisit la bonne URL
@@ -19,21 +24,34 @@ else:
 if not DATABASE_URL:
     raise ValueError(f"Aucune DATABASE_URL trouvée pour ENV='{ENV}'. Vérifie ton .env")
 
-# Configuration SSL pour Render (PostgreSQL)
-if "onrender.com" in DATABASE_URL:
-    engine = create_engine(
-        DATABASE_URL,
-        pool_pre_ping=True,
-        pool_recycle=300,
-        connect_args={"sslmode": "require"}
-    )
-else:
-    engine = create_engine(DATABASE_URL)
+# Pool : défauts selon le déploiement, surchargés par DB_POOL_* (services/db_pool.py)
+def create_db_engine(url: str, name: str):
+    # Configuration SSL pour Render (PostgreSQL)
+    if "onrender.com" in url:
+        return create_engine(
+            url,
+            connect_args={"sslmode": "require"},
+            **engine_options(ENV, url, name)
+        )
+    return create_engine(url, **engine_options(ENV, url, name))
+
+engine = create_db_engine(DATABASE_URL, "primary")
+pool_metrics = {"primary": PoolMetrics("primary").attach(engine)}
+
+# Réplica en lecture (optionnel) : routes publiques en GET, voir services/db_routing.py
+REPLICA_URL = os.getenv("DATABASE_URL_REPLICA")
+replica_engine = None
+if REPLICA_URL:
+    replica_engine = create_db_engine(REPLICA_URL, "replica")
+    pool_metrics["replica"] = PoolMetrics("replica").attach(replica_engine)
+    replica_health.watch(replica_engine)
 
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
-    bind=engine
+    bind=engine,
+    class_=RoutingSession,
+    info=routing_info(engine, replica_engine)
 )
 
 Base = declarative_base()
@@ -43,4 +61,77 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# ===================== MOTEUR ASYNCHRONE =====================
+# Même base, pilote asynchrone (asyncpg pour PostgreSQL, aiosqlite pour
+# SQLite) : les lectures les plus sollicitées n'occupent plus de place dans
+# le threadpool pendant l'attente de la base.
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def async_database_url(url: str) -> str:
+    """URL synchrone -> URL du pilote asynchrone équivalent"""
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"Pas de pilote asynchrone pour {url.get_backend_name()}")
+    # sslmode est propre à libpq (asyncpg prend ssl=)
+    query = {k: v for k, v in url.query.items() if k != "sslmode"}
+    return url.set(drivername=driver, query=query).render_as_string(hide_password=False)
+
+def create_async_db_engine(url: str, name: str = "async"):
+    from sqlalchemy.ext.asyncio import create_async_engine
+    options = engine_options(ENV, url, name, is_async=True)
+    if "onrender.com" in url:
+        return create_async_engine(async_database_url(url), connect_args={"ssl": "require"}, **options)
+    return create_async_engine(async_database_url(url), **options)
+
+try:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+    async_engine = create_async_db_engine(DATABASE_URL)
+    pool_metrics["async"] = PoolMetrics("async").attach(async_engine)
+    async_replica_engine = None
+    if REPLICA_URL:
+        async_replica_engine = create_async_db_engine(REPLICA_URL, "async_replica")
+        pool_metrics["async_replica"] = PoolMetrics("async_replica").attach(async_replica_engine)
+        replica_health.watch(async_replica_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        info=routing_info(
+            async_engine.sync_engine,
+            async_replica_engine.sync_engine if async_replica_engine else None
+        ),
+        expire_on_commit=False
+    )
+except (ImportError, ValueError) as e:
+    print(f"⚠️  Moteur asynchrone indisponible ({e}) : installer asyncpg / aiosqlite")
+    async_engine = None
+    async_replica_engine = None
+    AsyncSessionLocal = None
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Moteur asynchrone indisponible : installer asyncpg / aiosqlite")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+@contextmanager
+def unit_of_work(db):
+    """
+    Une seule transaction par requête : à l'intérieur du bloc on utilise
+    db.flush() pour obtenir les IDs, le commit est fait une fois à la sortie.
+    Toute exception (y compris HTTPException) annule l'ensemble.
+
+        with unit_of_work(db):
+            db.add(user)
+            db.flush()
+            db.add(Profile(user_id=user.id))
+    """
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
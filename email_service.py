@@ -5,10 +5,31 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def build_activation_email(activation_link: str, first_name: str = "") -> tuple[str, str]:
+    """Sujet et contenu HTML de l'email d'activation"""
+    html_content = f"""
+    <!DOCTYPE html>
+    <html>
+    <body>
+        <h1>Bienvenue sur InchTechs !</h1>
+        <p>Bonjour {first_name if first_name else 'cher chercheur'},</p>
+        <p>Cliquez sur le lien ci-dessous pour activer votre compte :</p>
+        <a href="{activation_link}">Activer mon compte</a>
+        <p>Lien : {activation_link}</p>
+        <p>Ce lien expire dans 24 heures.</p>
+        <hr>
+        <p><small>InchTechs - Plateforme de portfolios pour chercheurs</small></p>
+    </body>
+    </html>
+    """
+    return "Activez votre compte chercheur InchTechs", html_content
+
+
 def send_activation_email_brevo(to_email: str, activation_link: str, first_name: str = "") -> bool:
     """
     Envoie un email d'activation via l'API REST de Brevo.
     Cette méthode ne dépend pas du SDK 'brevo-python' et évite les erreurs de compatibilité.
+    Envoi synchrone : les routes passent par l'outbox (services/email_outbox.py).
     """
     api_key = os.getenv("BREVO_API_KEY")
     if not api_key:
@@ -22,32 +43,17 @@ def send_activation_email_brevo(to_email: str, activation_link: str, first_name:
         "content-type": "application/json"
     }
 
-    # Construction du contenu de l'email
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <body>
-        <h1>Bienvenue sur InchTechs !</h1>
-        <p>Bonjour {first_name if first_name else 'cher chercheur'},</p>
-        <p>Cliquez sur le lien ci-dessous pour activer votre compte :</p>
-        <a href="{activation_link}">Activer mon compte</a>
-        <p>Lien : {activation_link}</p>
-        <p>Ce lien expire dans 24 heures.</p>
-        <hr>
-        <p><small>InchTechs - Plateforme de portfolios pour chercheurs</small></p>
-    </body>
-    </html>
-    """
+    subject, html_content = build_activation_email(activation_link, first_name)
 
     payload = {
         "sender": {"name": "InchTechs", "email": "noreply@inchtechs.xyz"},  # ✅ Changé de .com à .xyz
         "to": [{"email": to_email, "name": first_name if first_name else to_email}],
-        "subject": "Activez votre compte chercheur InchTechs",
+        "subject": subject,
         "htmlContent": html_content
     }
 
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        response = requests.post(url, json=payload, headers=headers, timeout=10)
         if response.status_code == 201:
             print(f"✅ Email d'activation envoyé avec succès à {to_email} via Brevo (API REST)")
             return True
@@ -56,4 +62,4 @@ def send_activation_email_brevo(to_email: str, activation_link: str, first_name:
             return False
     except Exception as e:
         print(f"❌ Erreur lors de l'envoi de l'email: {e}")
-        return False
\ No newline at end of file
+        return False
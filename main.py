@@ -11,12 +11,13 @@ try:
     # ===================== FASTAPI =====================
     from fastapi import (
         FastAPI, Request, Form, Depends,
-        HTTPException, status, Response
+        HTTPException, status, Response, Query
     )
     from fastapi.responses import (
         HTMLResponse, RedirectResponse,
         StreamingResponse, JSONResponse
     )
+    from fastapi.concurrency import run_in_threadpool
     from fastapi.staticfiles import StaticFiles
     from fastapi.templating import Jinja2Templates
     from starlette.middleware.sessions import SessionMiddleware
@@ -24,13 +25,13 @@ try:
 
     # ===================== CORE =====================
     from sqlalchemy.orm import Session
+    from sqlalchemy.ext.asyncio import AsyncSession
     from sqlalchemy import func, text
     from datetime import datetime, date, timedelta, timezone
-    import io, csv, os, time, sys
-    from collections import defaultdict
+    import io, csv, os, time, sys, asyncio
 
     # ===================== DATABASE =====================
-    from database import get_db
+    from database import get_db, get_async_db
     from init_db import init_db
 
     # ===================== MODELS =====================
@@ -49,13 +50,15 @@ try:
     import models.distinction
     import models.cours
     import models.subscription
+    import models.email_outbox
+    import models.stats_rollup
 
     from models.user import User
     from models.profile import Profile
     from models.publication import Publication
     from models.message_contact import MessageContact
     from models.comment import Comment
-    from models.audit import Audit
+    from models.audit import Audit, AuditAction
     from models.project import Project
     from models.academic_career import AcademicCareer
     from models.media_artefact import MediaArtefact
@@ -84,6 +87,24 @@ try:
     from routes.researcher_public import router as researcher_public_router
     from routes.payment import router as payment_router
     from routes.admin_audit import router as admin_audit_router
+    from routes.audits import router as audits_router
+
+    # ===================== SERVICES =====================
+    from services.researcher_profile import list_public_researchers_async, parse_fields, project
+    from services.rate_limiter import RateLimiter, RatePolicy, create_backend, client_ip
+    from auth.password_service import password_service
+    from services.pdf_jobs import pdf_jobs
+    from services.email_outbox import start_outbox_worker, stop_outbox_worker
+    from services.audit_writer import audit_writer
+    from services.audit_retention import ensure_partitions
+    from services.search import (
+        MAX_QUERY_LENGTH, SearchIndexBuilding, parse_types, search as run_search,
+        search_backend, search_index,
+    )
+    from services.loop_monitor import loop_monitor, LOOP_MONITOR_ENABLED
+    from services.db_pool import warm_pool, warm_async_pool
+    from services.db_routing import replica_health, replica_routing
+    from services.http_cache import conditional_get, content_last_modified, http_date
 
     # ===================== AUTH =====================
     from auth.jwt import (
@@ -153,6 +174,69 @@ try:
     # ===================== TEST CONFIG =====================
     TEST_MODE = "pytest" in sys.modules or os.getenv("ENV") == "test"
 
+    # ===================== CYCLE DE VIE =====================
+    def ensure_audit_partitions():
+        # Partitions mensuelles des audits à venir (PostgreSQL partitionné uniquement)
+        from database import engine
+        try:
+            with engine.begin() as conn:
+                created = ensure_partitions(conn)
+            if created:
+                print(f"✅ Partitions d'audit créées : {', '.join(created)}")
+        except Exception as e:
+            print(f"⚠️  Partitions d'audit : {e}")
+
+    def start_search_index():
+        # /search sur PostgreSQL : schéma tsvector/GIN créé par la migration add_search_vectors,
+        # seulement vérifié ici. Sinon index mémoire, construit dans un thread avec sa propre Session
+        from database import SessionLocal
+        search_index.session_factory = SessionLocal
+        try:
+            with SessionLocal() as db:
+                if search_backend(db) == "postgresql":
+                    print("✅ Index de recherche plein texte présent")
+                    return
+                if db.get_bind().dialect.name == "postgresql":
+                    print("⚠️  Index de recherche : lancer `alembic upgrade head` (add_search_vectors)")
+                search_index.build_in_background()
+        except Exception as e:
+            print(f"⚠️  Index de recherche : {e}")
+
+    async def warm_database_pools():
+        # Connexions ouvertes avant la première requête (DB_POOL_WARMUP)
+        from database import engine, async_engine
+        try:
+            warmed = await asyncio.to_thread(warm_pool, engine)
+            warmed_async = await warm_async_pool(async_engine) if async_engine is not None else 0
+            print(f"✅ Pools préchauffés : {warmed} connexions (sync), {warmed_async} (async)")
+        except Exception as e:
+            print(f"⚠️  Préchauffage des pools : {e}")
+
+    @app.on_event("startup")
+    async def startup_services():
+        # En test, l'outbox est vidée explicitement (process_outbox)
+        if not TEST_MODE and os.getenv("EMAIL_OUTBOX_WORKER", "1") == "1":
+            from database import SessionLocal
+            start_outbox_worker(SessionLocal)
+        if not TEST_MODE:
+            await asyncio.to_thread(ensure_audit_partitions)
+            await asyncio.to_thread(start_search_index)
+            await warm_database_pools()
+            from database import replica_engine
+            if replica_engine is not None:
+                replica_health.start(replica_engine)
+        if LOOP_MONITOR_ENABLED and not TEST_MODE:
+            loop_monitor.start()
+
+    @app.on_event("shutdown")
+    async def shutdown_services():
+        await stop_outbox_worker()
+        await loop_monitor.stop()
+        replica_health.stop()
+        audit_writer.stop()
+        password_service.shutdown()
+        pdf_jobs.shutdown()
+
     # ===================== MIDDLEWARE =====================
     app.add_middleware(
         SessionMiddleware,
@@ -189,7 +273,36 @@ try:
     # ===================== RATE LIMIT =====================
     RATE_LIMIT = 100
     WINDOW = 60
-    requests_counter = defaultdict(list)
+
+    # Politiques par route : pages publiques sans limite, authentification sur
+    # un compteur à part (la navigation n'épuise pas le quota de connexion,
+    # même plafond que l'ancien limiteur sauf AUTH_RATE_LIMIT), tout le reste
+    # partage le compteur par défaut.
+    PUBLIC_POLICY = RatePolicy(name="public", limit=None)
+    AUTH_POLICY = RatePolicy(name="auth", limit=int(os.getenv("AUTH_RATE_LIMIT", RATE_LIMIT)), window=WINDOW)
+    RATE_LIMIT_EXACT_POLICIES = {
+        path: PUBLIC_POLICY for path in (
+            "/", "/about", "/contact", "/legal", "/privacy",
+            "/portfolio", "/publications", "/distinctions",
+            "/academic-career", "/cours", "/media",
+            "/health", "/docs", "/redoc", "/openapi.json",
+            "/sitemap.xml", "/favicon.ico", "/api/info",
+            "/test/reset-rate-limiter"
+        )
+    }
+    RATE_LIMIT_EXACT_POLICIES["/login"] = AUTH_POLICY  # POST /login de compatibilité
+    RATE_LIMIT_PREFIX_POLICIES = [
+        ("/auth/login", AUTH_POLICY),
+        ("/auth/register", AUTH_POLICY),
+    ]
+
+    limiter = RateLimiter(
+        backend=create_backend(),
+        default_policy=RatePolicy(name="default", limit=RATE_LIMIT, window=WINDOW),
+        exact_policies=RATE_LIMIT_EXACT_POLICIES,
+        prefix_policies=RATE_LIMIT_PREFIX_POLICIES,
+    )
+    requests_counter = limiter  # compatibilité : les tests appellent requests_counter.clear()
 
     @app.get("/test/reset-rate-limiter")
     def reset_rate_limiter():
@@ -199,53 +312,43 @@ try:
 
     @app.middleware("http")
     async def rate_limiter(request: Request, call_next):
-        public_paths = [
-            "/", "/about", "/contact", "/legal", "/privacy",
-            "/portfolio", "/publications", "/distinctions",
-            "/academic-career", "/cours", "/media",
-            "/health", "/docs", "/redoc", "/openapi.json",
-            "/sitemap.xml", "/favicon.ico", "/api/info",
-            "/test/reset-rate-limiter"
-        ]
-
-        if request.url.path in public_paths:
+        result = await limiter.ahit(client_ip(request), request.url.path)
+        if result is None:
             return await call_next(request)
 
-        ip = request.headers.get("X-Forwarded-For", request.client.host)
-        now = time.time()
+        window = limiter.policy_for(request.url.path).window
+        retry_after = max(1, result.reset_at - int(time.time()))
 
-        if ip in requests_counter:
-            requests_counter[ip] = [t for t in requests_counter[ip] if now - t < WINDOW]
-
-        if ip in requests_counter and len(requests_counter[ip]) >= RATE_LIMIT:
+        if not result.allowed:
             return JSONResponse(
                 status_code=429,
                 content={
                     "error": "Trop de requêtes",
-                    "message": f"Limite de {RATE_LIMIT} requêtes par {WINDOW} secondes atteinte",
-                    "retry_after": WINDOW
+                    "message": f"Limite de {result.limit} requêtes par {window} secondes atteinte",
+                    "retry_after": retry_after
                 },
                 headers={
-                    "Retry-After": str(WINDOW),
-                    "X-RateLimit-Limit": str(RATE_LIMIT),
+                    "Retry-After": str(retry_after),
+                    "X-RateLimit-Limit": str(result.limit),
                     "X-RateLimit-Remaining": "0",
-                    "X-RateLimit-Reset": str(int(now + WINDOW))
+                    "X-RateLimit-Reset": str(result.reset_at)
                 }
             )
 
-        if ip not in requests_counter:
-            requests_counter[ip] = []
-        requests_counter[ip].append(now)
-
         response = await call_next(request)
 
-        remaining = RATE_LIMIT - len(requests_counter[ip])
-        response.headers["X-RateLimit-Limit"] = str(RATE_LIMIT)
-        response.headers["X-RateLimit-Remaining"] = str(max(0, remaining))
-        response.headers["X-RateLimit-Reset"] = str(int(now + WINDOW))
+        response.headers["X-RateLimit-Limit"] = str(result.limit)
+        response.headers["X-RateLimit-Remaining"] = str(result.remaining)
+        response.headers["X-RateLimit-Reset"] = str(result.reset_at)
 
         return response
 
+    # ===================== HTTP CACHE (ETag / 304) =====================
+    app.middleware("http")(conditional_get)
+
+    # ===================== RÉPLICA EN LECTURE =====================
+    app.middleware("http")(replica_routing)
+
     # ===================== ROUTERS =====================
     app.include_router(auth_router)
     app.include_router(user_router, prefix="/users", tags=["Users"])
@@ -265,6 +368,7 @@ try:
     app.include_router(researcher_messages_router)
     app.include_router(payment_router)
     app.include_router(admin_audit_router)
+    app.include_router(audits_router)
     print("🔧 Chargement du routeur CV...")
     app.include_router(cv_router)
     app.include_router(contact_router)
@@ -444,24 +548,32 @@ try:
         }
 
     # ===================== RESEARCHERS LIST =====================
+    RESEARCHERS_FIELDS = ("id", "email", "firstName", "lastName")
+
     @app.get("/researchers")
-    def list_researchers(db: Session = Depends(get_db)):
-        # ✅ CORRECTION: status == "active" au lieu de is_active == True
-        researchers = db.query(User).filter(
-            User.role == "researcher",
-            User.status == "active"
-        ).all()
+    async def list_researchers(
+        response: Response,
+        after_id: int | None = Query(None, ge=0),
+        limit: int | None = Query(None, ge=1, le=500),
+        fields: str | None = Query(None),
+        db: AsyncSession = Depends(get_async_db)
+    ):
+        selected = parse_fields(fields, RESEARCHERS_FIELDS)
+
+        # ✅ Une seule requête jointe User + Profile, paginée par clé
+        rows = await list_public_researchers_async(db, after_id=after_id, limit=limit)
 
         result = []
-        for r in researchers:
-            profile = db.query(Profile).filter(Profile.user_id == r.id).first()
-            result.append({
+        for r, profile in rows:
+            result.append(project({
                 "id": r.id,
                 "email": r.email,
                 "firstName": profile.first_name if profile and profile.first_name else "",
                 "lastName": profile.last_name if profile and profile.last_name else "",
-            })
-        # ✅ CORRECTION: return en dehors de la boucle for
+            }, selected))
+
+        if limit is not None and len(rows) == limit:
+            response.headers["X-Next-After-Id"] = str(rows[-1][0].id)
         return result
 
     # ===================== PAGES PUBLIQUES =====================
@@ -549,15 +661,18 @@ try:
                     content={"error": "Tous les champs sont requis"}
                 )
 
-            new_message = MessageContact(
-                profile_id=None,
-                sender_name=name,
-                sender_email=email,
-                message=message,
-                created_at=datetime.now(timezone.utc)
-            )
-            db.add(new_message)
-            db.commit()
+            def save_message():
+                db.add(MessageContact(
+                    profile_id=None,
+                    sender_name=name,
+                    sender_email=email,
+                    message=message,
+                    created_at=datetime.now(timezone.utc)
+                ))
+                db.commit()
+
+            # Session synchrone : hors de la boucle asyncio
+            await run_in_threadpool(save_message)
 
             return {"message": "Message envoyé avec succès", "status": "success"}
 
@@ -595,19 +710,22 @@ try:
                 return JSONResponse(status_code=400, content={"detail": "Email et mot de passe requis"})
 
             from auth.jwt import create_access_token, create_refresh_token
-            from auth.security import verify_password
             from models.refresh_token import RefreshToken
 
-            user = db.query(User).filter(User.email == email).first()
-
-            if not user or not verify_password(password, user.password):
-                audit = Audit(
-                    user_id=user.id if user else None,
-                    user_role=user.role if user else 'unknown',
-                    action_description=f"Tentative de login échouée pour {email}"
+            # Session synchrone : chaque accès base passe par le threadpool
+            user = await run_in_threadpool(lambda: db.query(User).filter(User.email == email).first())
+
+            if not user or not await password_service.verify(password, user.password):
+                # Événement de sécurité : écrit immédiatement
+                await run_in_threadpool(
+                    audit_writer.write_now,
+                    db,
+                    user.id if user else None,
+                    user.role if user else 'unknown',
+                    f"Tentative de login échouée pour {email}",
+                    AuditAction.LOGIN_FAILED,
+                    {"email": email}
                 )
-                db.add(audit)
-                db.commit()
                 return JSONResponse(status_code=401, content={"detail": "Email ou mot de passe incorrect"})
 
             if user.status != "active":
@@ -616,16 +734,15 @@ try:
             access_token = create_access_token(user_id=user.id, role=user.role, expires_delta=timedelta(minutes=15))
             refresh_token = create_refresh_token(user_id=user.id, role=user.role, expires_delta=timedelta(days=7))
 
-            db_refresh = RefreshToken(user_id=user.id, token=refresh_token, revoked=False)
-            db.add(db_refresh)
+            def open_session():
+                db.add(RefreshToken(user_id=user.id, token=refresh_token, revoked=False))
+                db.commit()
+                audit_writer.enqueue(
+                    db, user.id, user.role, "Login réussi via endpoint /login (compatibilité)",
+                    AuditAction.LOGIN, {"endpoint": "/login"}
+                )
 
-            audit = Audit(
-                user_id=user.id,
-                user_role=user.role,
-                action_description="Login réussi via endpoint /login (compatibilité)"
-            )
-            db.add(audit)
-            db.commit()
+            await run_in_threadpool(open_session)
 
             response = JSONResponse(content={
                 "access_token": access_token,
@@ -637,6 +754,8 @@ try:
             response.set_cookie(key="access_token", value=access_token, httponly=True, max_age=15*60, secure=False, samesite="lax")
             return response
 
+        except HTTPException:
+            raise
         except Exception as e:
             traceback.print_exc()
             return JSONResponse(status_code=500, content={"detail": f"Erreur interne: {str(e)}"})
@@ -767,9 +886,9 @@ try:
 
     # ===================== HEALTH CHECK =====================
     @app.get("/health")
-    def health_check(db: Session = Depends(get_db)):
+    async def health_check(db: AsyncSession = Depends(get_async_db)):
         try:
-            db.execute(text("SELECT 1"))
+            await db.execute(text("SELECT 1"))
             db_status = "connected"
         except Exception as e:
             db_status = f"error: {str(e)}"
@@ -817,7 +936,7 @@ try:
 
     # ===================== SITEMAP =====================
     @app.get("/sitemap.xml", include_in_schema=False)
-    def sitemap():
+    def sitemap(db: Session = Depends(get_db)):
         base_url = os.getenv("BASE_URL", "http://localhost:8000")
         urls = [
             f"{base_url}/", f"{base_url}/about", f"{base_url}/portfolio",
@@ -825,11 +944,20 @@ try:
             f"{base_url}/academic-career", f"{base_url}/cours", f"{base_url}/media",
             f"{base_url}/legal", f"{base_url}/privacy"
         ]
+        # ✅ lastmod = dernière écriture sur le contenu public (stable entre deux écritures)
+        last_modified = content_last_modified(db) or datetime.now(timezone.utc).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        lastmod = last_modified.strftime("%Y-%m-%d")
         sitemap_content = '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
         for url in urls:
-            sitemap_content += f'  <url>\n    <loc>{url}</loc>\n    <lastmod>{datetime.now(timezone.utc).strftime("%Y-%m-%d")}</lastmod>\n    <changefreq>monthly</changefreq>\n    <priority>0.8</priority>\n  </url>\n'
+            sitemap_content += f'  <url>\n    <loc>{url}</loc>\n    <lastmod>{lastmod}</lastmod>\n    <changefreq>monthly</changefreq>\n    <priority>0.8</priority>\n  </url>\n'
         sitemap_content += "</urlset>"
-        return Response(content=sitemap_content, media_type="application/xml")
+        return Response(
+            content=sitemap_content,
+            media_type="application/xml",
+            headers={"Last-Modified": http_date(last_modified)}
+        )
 
     # ===================== FAVICON =====================
     @app.get("/favicon.ico", include_in_schema=False)
@@ -870,55 +998,40 @@ try:
 
     # ===================== SEARCH =====================
     @app.get("/search")
-    def search(request: Request, q: str = "", db: Session = Depends(get_db), current_user=Depends(get_current_user_optional)):
+    async def search(
+        request: Request,
+        q: str = "",
+        types: str | None = Query(None, description="project,publication,cours,researcher"),
+        page: int = Query(1, ge=1),
+        per_page: int = Query(10, ge=1, le=50),
+        db: AsyncSession = Depends(get_async_db),
+        current_user=Depends(get_current_user_optional),
+    ):
+        q = q.strip()
         if not q:
             return {"results": []}
-
-        results = []
-
+        if len(q) > MAX_QUERY_LENGTH:
+            raise HTTPException(status_code=400, detail=f"Requête trop longue (max {MAX_QUERY_LENGTH} caractères)")
         try:
-            projects = db.query(Project).filter(Project.title.ilike(f"%{q}%")).limit(10).all()
-            for project in projects:
-                results.append({
-                    "type": "project", "id": project.id, "title": project.title,
-                    "description": (project.description[:100] + "...") if project.description and len(project.description) > 100 else (project.description or ""),
-                    "url": f"/portfolio?highlight={project.id}"
-                })
-        except:
-            pass
+            wanted = parse_types(types)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
+        # Index plein texte : PostgreSQL (tsvector/GIN) ou index mémoire (services/search.py)
         try:
-            publications = db.query(Publication).filter(
-                Publication.title.ilike(f"%{q}%") | Publication.journal.ilike(f"%{q}%")
-            ).limit(10).all()
-            for pub in publications:
-                authors_str = ", ".join(pub.coauthor) if pub.coauthor and isinstance(pub.coauthor, list) else ""
-                results.append({
-                    "type": "publication", "id": pub.id, "title": pub.title,
-                    "description": f"Auteurs: {authors_str} | Journal: {pub.journal or 'N/A'}",
-                    "url": f"/publications?highlight={pub.id}"
-                })
-        except:
-            pass
-
-        try:
-            cours = db.query(Cours).filter(Cours.title.ilike(f"%{q}%")).limit(10).all()
-            for c in cours:
-                results.append({
-                    "type": "cours", "id": c.id, "title": c.title,
-                    "description": (c.description[:100] + "...") if c.description and len(c.description) > 100 else (c.description or ""),
-                    "url": f"/cours?highlight={c.id}"
-                })
-        except:
-            pass
-
-        return {"query": q, "count": len(results), "results": results}
+            return await db.run_sync(run_search, q, wanted, page, per_page)
+        except SearchIndexBuilding:
+            raise HTTPException(status_code=503, detail="Index de recherche en construction, réessayez",
+                                headers={"Retry-After": "5"})
+        except Exception as e:
+            await db.rollback()
+            print(f"⚠️  Recherche « {q} » en échec : {e}")
+            raise HTTPException(status_code=503, detail="Recherche momentanément indisponible")
 
     # ===================== INIT DB (for Render) =====================
     @app.post("/admin/init-db")
     def init_database(db: Session = Depends(get_db)):
         try:
-            from auth.security import hash_password
             from models.user import User
             from database import Base, engine
 
@@ -928,7 +1041,7 @@ try:
             if not admin:
                 admin = User(
                     email='admin@test.com',
-                    password=hash_password('admin123'),
+                    password=password_service.hash_sync('admin123'),
                     role='admin',
                     status='active'
                 )
@@ -0,0 +1,28 @@
+"""add_audits_date_id_index
+
+Revision ID: b5c8e2f0a7d6
+Revises: f6a2d9c1b384
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5c8e2f0a7d6'
+down_revision: Union[str, Sequence[str], None] = 'f6a2d9c1b384'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Sur PostgreSQL partitionné, l'index est créé sur chaque partition mensuelle
+    op.create_index('ix_audits_date_id', 'audits', ['date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_audits_date_id', table_name='audits')
@@ -0,0 +1,53 @@
+"""add_stats_rollups
+
+Revision ID: c7d2e8a4b913
+Revises: a9c3e1f27b40
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7d2e8a4b913'
+down_revision: Union[str, Sequence[str], None] = 'a9c3e1f27b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'audit_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('granularity', sa.String(length=5), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('user_role', sa.String(length=20), nullable=False),
+        sa.Column('action_type', sa.String(length=30), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('granularity', 'bucket_start', 'user_role', 'action_type', name='uq_audit_rollups_bucket')
+    )
+    op.create_index(op.f('ix_audit_rollups_id'), 'audit_rollups', ['id'], unique=False)
+    op.create_table(
+        'message_rollups',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('bucket_start')
+    )
+    op.create_index(op.f('ix_message_rollups_id'), 'message_rollups', ['id'], unique=False)
+
+    # Remplissage initial : après la migration du type d'action (action_code)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_message_rollups_id'), table_name='message_rollups')
+    op.drop_table('message_rollups')
+    op.drop_index(op.f('ix_audit_rollups_id'), table_name='audit_rollups')
+    op.drop_table('audit_rollups')
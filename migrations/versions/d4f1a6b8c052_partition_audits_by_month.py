@@ -0,0 +1,92 @@
+"""partition_audits_by_month
+
+Revision ID: d4f1a6b8c052
+Revises: c7d2e8a4b913
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f1a6b8c052'
+down_revision: Union[str, Sequence[str], None] = 'c7d2e8a4b913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return  # SQLite : table unique, rétention par plage de dates
+
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('audits', 'id')")).scalar()
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+
+    # La clé de partition doit faire partie de la clé primaire
+    op.execute(f"""
+        CREATE TABLE audits_partitioned (
+            id INTEGER NOT NULL DEFAULT nextval('{sequence}'),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            user_role VARCHAR(20) NOT NULL,
+            action_description VARCHAR(500) NOT NULL,
+            date TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT (now() AT TIME ZONE 'utc'),
+            CONSTRAINT audits_partitioned_pkey PRIMARY KEY (id, date)
+        ) PARTITION BY RANGE (date)
+    """)
+    op.execute("CREATE TABLE audits_default PARTITION OF audits_partitioned DEFAULT")
+
+    # Une partition audits_AAAA_MM par mois déjà présent, puis le mois courant
+    # et les 3 suivants (mêmes noms que services/audit_retention.partition_name)
+    op.execute("""
+        DO $$
+        DECLARE
+            month timestamp := date_trunc('month', coalesce((SELECT min(date) FROM audits), now() AT TIME ZONE 'utc'));
+            last timestamp := date_trunc('month', now() AT TIME ZONE 'utc') + interval '3 months';
+        BEGIN
+            WHILE month <= last LOOP
+                EXECUTE format('CREATE TABLE %I PARTITION OF audits_partitioned FOR VALUES FROM (%L) TO (%L)',
+                               'audits_' || to_char(month, 'YYYY_MM'), month, month + interval '1 month');
+                month := month + interval '1 month';
+            END LOOP;
+        END $$
+    """)
+    op.execute("""
+        INSERT INTO audits_partitioned (id, user_id, user_role, action_description, date)
+        SELECT id, user_id, user_role, action_description, COALESCE(date, now() AT TIME ZONE 'utc') FROM audits
+    """)
+    op.execute("DROP TABLE audits")
+    op.execute("ALTER TABLE audits_partitioned RENAME TO audits")
+    op.execute("ALTER TABLE audits RENAME CONSTRAINT audits_partitioned_pkey TO audits_pkey")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY audits.id")
+    op.create_index(op.f('ix_audits_id'), 'audits', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence('audits', 'id')")).scalar()
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+    op.execute(f"""
+        CREATE TABLE audits_plain (
+            id INTEGER NOT NULL DEFAULT nextval('{sequence}'),
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            user_role VARCHAR(20) NOT NULL,
+            action_description VARCHAR(500) NOT NULL,
+            date TIMESTAMP WITHOUT TIME ZONE,
+            CONSTRAINT audits_plain_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute("INSERT INTO audits_plain SELECT id, user_id, user_role, action_description, date FROM audits")
+    op.execute("DROP TABLE audits CASCADE")
+    op.execute("ALTER TABLE audits_plain RENAME TO audits")
+    op.execute("ALTER TABLE audits RENAME CONSTRAINT audits_plain_pkey TO audits_pkey")
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY audits.id")
+    op.create_index(op.f('ix_audits_id'), 'audits', ['id'], unique=False)
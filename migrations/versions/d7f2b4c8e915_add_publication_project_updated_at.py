@@ -0,0 +1,32 @@
+"""add_publication_project_updated_at
+
+Revision ID: d7f2b4c8e915
+Revises: c3e9a7f5d210
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f2b4c8e915'
+down_revision: Union[str, Sequence[str], None] = 'c3e9a7f5d210'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ("publications", "projects"):
+        op.add_column(table, sa.Column('updated_at', sa.TIMESTAMP(), server_default=sa.text('now()'), nullable=True))
+        # Lignes existantes : dernière écriture connue = création
+        op.execute(f"UPDATE {table} SET updated_at = created_at WHERE created_at IS NOT NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ("projects", "publications"):
+        op.drop_column(table, 'updated_at')
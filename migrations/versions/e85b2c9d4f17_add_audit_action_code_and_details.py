@@ -0,0 +1,105 @@
+"""add_audit_action_code_and_details
+
+Revision ID: e85b2c9d4f17
+Revises: d4f1a6b8c052
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e85b2c9d4f17'
+down_revision: Union[str, Sequence[str], None] = 'd4f1a6b8c052'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Classification des libellés existants (copie figée de models.audit.ACTION_PATTERNS)
+ACTION_PATTERNS = [
+    ("%tentative d'accès%", "forbidden"),
+    ("%tentative de login%", "login_failed"),
+    ("%déconnexion%", "logout"),
+    ("%connexion%", "login"),
+    ("%login réussi%", "login"),
+    ("%inscrit%", "register"),
+    ("%export%", "export"),
+    ("%consultation%", "read"),
+    ("%rôle%", "role_change"),
+    ("%supprim%", "delete"),
+    ("%révoqu%", "session_revoke"),
+    ("%à jour%", "update"),
+    ("%créé%", "create"),
+    ("%message%", "message"),
+    ("%commentaire%", "comment"),
+]
+
+# Début de période par dialecte (copie figée de services.rollups.bucket_expr ;
+# SQLite : même format texte que les DateTime écrits par SQLAlchemy)
+BUCKET_SQL = {
+    "postgresql": {g: f"date_trunc('{g}', {{column}})" for g in ("hour", "day", "month")},
+    "sqlite": {
+        "hour": "strftime('%Y-%m-%d %H:00:00.000000', {column})",
+        "day": "strftime('%Y-%m-%d 00:00:00.000000', {column})",
+        "month": "strftime('%Y-%m-01 00:00:00.000000', {column})",
+    },
+    "mysql": {
+        "hour": "date_format({column}, '%Y-%m-%d %H:00:00')",
+        "day": "date_format({column}, '%Y-%m-%d 00:00:00')",
+        "month": "date_format({column}, '%Y-%m-01 00:00:00')",
+    },
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    op.add_column('audits', sa.Column('action_code', sa.String(length=30), nullable=False, server_default='other'))
+    op.add_column('audits', sa.Column('details', sa.JSON().with_variant(postgresql.JSONB(), 'postgresql'), nullable=True))
+
+    audits = sa.table('audits', sa.column('action_code', sa.String), sa.column('action_description', sa.String))
+    lowered = sa.func.lower(audits.c.action_description)
+    op.execute(
+        audits.update().values(
+            action_code=sa.case(*[(lowered.like(pattern), code) for pattern, code in ACTION_PATTERNS], else_='other')
+        )
+    )
+    if bind.dialect.name != 'sqlite':
+        op.alter_column('audits', 'action_code', server_default=None)
+
+    op.create_index('ix_audits_action_code_date', 'audits', ['action_code', 'date'], unique=False)
+    op.create_index('ix_audits_user_id_date', 'audits', ['user_id', 'date'], unique=False)
+    op.create_index('ix_audits_user_role_date', 'audits', ['user_role', 'date'], unique=False)
+
+    # Remplissage des cumuls des graphiques (tables créées par c7d2e8a4b913)
+    bucket = BUCKET_SQL.get('mysql' if bind.dialect.name == 'mariadb' else bind.dialect.name)
+    if bucket is None:
+        return  # dialecte inconnu : python -m services.rollups
+    op.execute("DELETE FROM audit_rollups")
+    for granularity in ("hour", "day"):
+        period = bucket[granularity].format(column="date")
+        op.execute(f"""
+            INSERT INTO audit_rollups (granularity, bucket_start, user_role, action_type, count)
+            SELECT '{granularity}', {period}, user_role, action_code, count(*)
+            FROM audits WHERE date IS NOT NULL
+            GROUP BY {period}, user_role, action_code
+        """)
+    month = bucket["month"].format(column="created_at")
+    op.execute("DELETE FROM message_rollups")
+    op.execute(f"""
+        INSERT INTO message_rollups (bucket_start, count)
+        SELECT {month}, count(*) FROM messages WHERE created_at IS NOT NULL GROUP BY {month}
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_audits_user_role_date', table_name='audits')
+    op.drop_index('ix_audits_user_id_date', table_name='audits')
+    op.drop_index('ix_audits_action_code_date', table_name='audits')
+    with op.batch_alter_table('audits') as batch_op:
+        batch_op.drop_column('details')
+        batch_op.drop_column('action_code')
@@ -0,0 +1,163 @@
+"""add_search_vectors
+
+Revision ID: f6a2d9c1b384
+Revises: e85b2c9d4f17
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a2d9c1b384'
+down_revision: Union[str, Sequence[str], None] = 'e85b2c9d4f17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Schéma figé à cette révision (services/search.py peut évoluer depuis) :
+# table -> (colonnes surveillées par le trigger, vecteur pondéré de NEW)
+DOCUMENTS = {
+    "projects": (
+        "title, description, coauthor",
+        "portfolio_tsv(NEW.title, 'A') || portfolio_tsv(NEW.description, 'B')"
+        " || portfolio_tsv(portfolio_names(NEW.coauthor::json), 'C')",
+    ),
+    "publications": (
+        "title, journal, coauthor",
+        "portfolio_tsv(NEW.title, 'A') || portfolio_tsv(NEW.journal, 'B')"
+        " || portfolio_tsv(portfolio_names(NEW.coauthor::json), 'C')",
+    ),
+    "cours": (
+        "title, description, curricula",
+        "portfolio_tsv(NEW.title, 'A') || portfolio_tsv(NEW.description, 'B')"
+        " || portfolio_tsv(NEW.curricula, 'C')",
+    ),
+    "profiles": (
+        "first_name, last_name, grade, specialite, diplome, bio, description",
+        "portfolio_tsv(concat_ws(' ', NEW.first_name, NEW.last_name), 'A')"
+        " || portfolio_tsv(concat_ws(' ', NEW.specialite, NEW.grade, NEW.diplome), 'B')"
+        " || portfolio_tsv(concat_ws(' ',"
+        " (SELECT string_agg(skill_name, ' ') FROM technical_skills WHERE profile_id = NEW.id),"
+        " (SELECT string_agg(skill_name, ' ') FROM soft_skills WHERE profile_id = NEW.id)), 'B')"
+        " || portfolio_tsv(concat_ws(' ', NEW.bio, NEW.description), 'C')",
+    ),
+}
+SKILL_TABLES = ("technical_skills", "soft_skills")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return  # SQLite : index de recherche en mémoire (services/search.py)
+
+    try:
+        with bind.begin_nested():
+            bind.execute(sa.text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+        unaccent = True
+    except Exception as e:
+        # Extension indisponible (droits) : les accents restent discriminants
+        print(f"⚠️  Extension unaccent indisponible : {e}")
+        unaccent = False
+
+    for config, source, stemmer in (("portfolio_fr", "french", "french_stem"),
+                                    ("portfolio_en", "english", "english_stem")):
+        op.execute(f"""
+            DO $$ BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{config}') THEN
+                    CREATE TEXT SEARCH CONFIGURATION {config} (COPY = pg_catalog.{source});
+                END IF;
+            END $$
+        """)
+        if unaccent:
+            op.execute(f"ALTER TEXT SEARCH CONFIGURATION {config} "
+                       f"ALTER MAPPING FOR hword, hword_part, word WITH unaccent, {stemmer}")
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION portfolio_names(names json) RETURNS text
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT string_agg(value, ', ') FROM json_array_elements_text(
+                CASE WHEN json_typeof(names) = 'array' THEN names ELSE '[]'::json END)
+        $$
+    """)
+    # Radicaux français et anglais : « robotics » comme « robotique »
+    op.execute("""
+        CREATE OR REPLACE FUNCTION portfolio_tsv(doc text, weight "char") RETURNS tsvector
+        LANGUAGE sql STABLE AS $$
+            SELECT setweight(to_tsvector('portfolio_fr', coalesce(doc, '')), weight)
+                || setweight(to_tsvector('portfolio_en', coalesce(doc, '')), weight)
+        $$
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION portfolio_tsq(q text) RETURNS tsquery
+        LANGUAGE sql STABLE AS $$
+            SELECT websearch_to_tsquery('portfolio_fr', q) || websearch_to_tsquery('portfolio_en', q)
+        $$
+    """)
+
+    for table, (columns, vector) in DOCUMENTS.items():
+        op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector")
+        op.execute(f"""
+            CREATE OR REPLACE FUNCTION {table}_search_vector() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                NEW.search_vector := {vector};
+                RETURN NEW;
+            END $$
+        """)
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_search_vector ON {table}")
+        op.execute(f"""
+            CREATE TRIGGER {table}_search_vector BEFORE INSERT OR UPDATE OF {columns}, search_vector
+            ON {table} FOR EACH ROW EXECUTE FUNCTION {table}_search_vector()
+        """)
+        op.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING gin (search_vector)")
+
+    # Compétences : recalcul du vecteur du profil concerné
+    op.execute("""
+        CREATE OR REPLACE FUNCTION skills_search_vector() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE profiles SET search_vector = NULL WHERE id = NEW.profile_id;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE profiles SET search_vector = NULL WHERE id = OLD.profile_id;
+            END IF;
+            RETURN NULL;
+        END $$
+    """)
+    for table in SKILL_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_search_vector ON {table}")
+        op.execute(f"""
+            CREATE TRIGGER {table}_search_vector AFTER INSERT OR UPDATE OR DELETE
+            ON {table} FOR EACH ROW EXECUTE FUNCTION skills_search_vector()
+        """)
+
+    # Rattrapage : le trigger calcule le vecteur des lignes existantes
+    for table in DOCUMENTS:
+        op.execute(f"UPDATE {table} SET search_vector = NULL WHERE search_vector IS NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+
+    for table in SKILL_TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_search_vector ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS skills_search_vector()")
+    for table in DOCUMENTS:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_search_vector ON {table}")
+        op.execute(f"DROP FUNCTION IF EXISTS {table}_search_vector()")
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_search_vector")
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
+    op.execute("DROP FUNCTION IF EXISTS portfolio_tsq(text)")
+    op.execute('DROP FUNCTION IF EXISTS portfolio_tsv(text, "char")')
+    op.execute("DROP FUNCTION IF EXISTS portfolio_names(json)")
+    op.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS portfolio_fr")
+    op.execute("DROP TEXT SEARCH CONFIGURATION IF EXISTS portfolio_en")
@@ -15,6 +15,7 @@ from .message_contact import MessageContact
 from .audit import Audit
 from .subscription import Subscription
 from .refresh_token import RefreshToken
+from .stats_rollup import AuditRollup, MessageRollup
 
 __all__ = [
     'User',
@@ -29,5 +30,7 @@ __all__ = [
     'MessageContact',
     'Audit',
     'Subscription',
-    'RefreshToken'
+    'RefreshToken',
+    'AuditRollup',
+    'MessageRollup'
 ]
\ No newline at end of file
@@ -1,8 +1,70 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, TIMESTAMP
+from sqlalchemy import Column, Integer, String, ForeignKey, TIMESTAMP, Enum, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from datetime import datetime
+import enum
+import re
 from database import Base
 
+
+class AuditAction(str, enum.Enum):
+    """Type d'action auditée (colonne indexée, remplace la recherche dans le libellé)"""
+    LOGIN = "login"
+    LOGIN_FAILED = "login_failed"
+    LOGOUT = "logout"
+    FORBIDDEN = "forbidden"
+    REGISTER = "register"
+    READ = "read"
+    EXPORT = "export"
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+    ROLE_CHANGE = "role_change"
+    SESSION_REVOKE = "session_revoke"
+    MESSAGE = "message"
+    COMMENT = "comment"
+    OTHER = "other"
+
+
+# Déduction du type depuis le libellé pour les écritures qui ne le précisent
+# pas (motifs LIKE en minuscules, le premier qui correspond l'emporte)
+ACTION_PATTERNS = [
+    ("%tentative d'accès%", AuditAction.FORBIDDEN),
+    ("%tentative de login%", AuditAction.LOGIN_FAILED),
+    ("%déconnexion%", AuditAction.LOGOUT),
+    ("%connexion%", AuditAction.LOGIN),
+    ("%login réussi%", AuditAction.LOGIN),
+    ("%inscrit%", AuditAction.REGISTER),
+    ("%export%", AuditAction.EXPORT),
+    ("%consultation%", AuditAction.READ),
+    ("%rôle%", AuditAction.ROLE_CHANGE),
+    ("%supprim%", AuditAction.DELETE),
+    ("%révoqu%", AuditAction.SESSION_REVOKE),
+    ("%à jour%", AuditAction.UPDATE),
+    ("%créé%", AuditAction.CREATE),
+    ("%message%", AuditAction.MESSAGE),
+    ("%commentaire%", AuditAction.COMMENT),
+]
+
+_ACTION_REGEXES = [
+    (re.compile(".*".join(re.escape(part) for part in pattern.split("%")), re.DOTALL), action)
+    for pattern, action in ACTION_PATTERNS
+]
+
+
+def classify_action(description: str | None) -> AuditAction:
+    text = (description or "").lower()
+    for regex, action in _ACTION_REGEXES:
+        if regex.fullmatch(text):
+            return action
+    return AuditAction.OTHER
+
+
+def _default_action_code(context):
+    # Appliqué aux insertions ORM comme aux insertions par lots (Core)
+    return classify_action(context.get_current_parameters().get("action_description"))
+
+
 class Audit(Base):
     __tablename__ = "audits"
 
@@ -10,6 +72,21 @@ class Audit(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     user_role = Column(String(20), nullable=False)
     action_description = Column(String(500), nullable=False)
-    date = Column(TIMESTAMP, default=datetime.utcnow)  # ✅ conforme à ta base
+    action_code = Column(
+        Enum(AuditAction, name="audit_action", native_enum=False, length=30,
+             values_callable=lambda e: [m.value for m in e]),
+        nullable=False,
+        default=_default_action_code,
+    )
+    details = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
+    date = Column(TIMESTAMP, default=datetime.utcnow)  # ✅ conforme à ta base (clé de partition mensuelle sur PostgreSQL)
 
     user = relationship("User", back_populates="audits")
+
+    __table_args__ = (
+        Index("ix_audits_action_code_date", "action_code", "date"),
+        Index("ix_audits_user_id_date", "user_id", "date"),
+        Index("ix_audits_user_role_date", "user_role", "date"),
+        # Listes non filtrées (ORDER BY date DESC, id DESC) : lecture de l'index à l'envers
+        Index("ix_audits_date_id", "date", "id"),
+    )
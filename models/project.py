@@ -19,6 +19,7 @@ class Project(Base):
     budget = Column(Numeric(10, 2))
 
     created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
     # ======================
     # RELATIONS
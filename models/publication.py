@@ -19,6 +19,7 @@ class Publication(Base):
     doi = Column(String(100))
 
     created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
     # ======================
     # RELATIONS
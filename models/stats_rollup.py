@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, DateTime, UniqueConstraint
+from database import Base
+
+
+class AuditRollup(Base):
+    """Nombre d'audits par période (heure ou jour), rôle et type d'action"""
+    __tablename__ = "audit_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    granularity = Column(String(5), nullable=False)       # hour | day
+    bucket_start = Column(DateTime, nullable=False)       # début de période, UTC
+    user_role = Column(String(20), nullable=False)
+    action_type = Column(String(30), nullable=False)
+    count = Column(Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        # Sert aussi aux lectures par plage (granularity, bucket_start)
+        UniqueConstraint("granularity", "bucket_start", "user_role", "action_type", name="uq_audit_rollups_bucket"),
+    )
+
+
+class MessageRollup(Base):
+    """Nombre de messages de contact par mois"""
+    __tablename__ = "message_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    bucket_start = Column(DateTime, nullable=False, unique=True)  # 1er du mois, UTC
+    count = Column(Integer, default=0, nullable=False)
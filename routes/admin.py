@@ -1,20 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
 from fastapi.responses import HTMLResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from datetime import datetime
 from datetime import timezone
+from typing import Optional
 from fastapi.templating import Jinja2Templates
-from io import StringIO, BytesIO
-import csv
+from io import BytesIO
 from reportlab.lib.pagesizes import letter 
 from reportlab.pdfgen import canvas
 
-from database import get_db
+from database import get_db, pool_metrics, replica_engine
 from models.user import User
 from models.refresh_token import RefreshToken
-from models.audit import Audit
+from models.audit import Audit, AuditAction
 from auth.jwt import get_current_user
 from auth.permissions import require_role
+from services.researcher_profile import profile_cache
+from auth.principal_cache import principal_cache
+from auth.password_service import password_service
+from services.audit_writer import audit_writer
+from services.csv_export import accepts_gzip, csv_bytes
+from services.db_routing import replica_health
+from services.loop_monitor import loop_monitor
+from services.metrics import metrics_snapshot
+from services.pdf_jobs import pdf_jobs
+from services.report_cache import report_cache, report_response, report_version
+from services.pagination import keyset_page, estimate_count
+from services.search import search_index
+from services.rollups import BUCKETS, audit_series, format_bucket, rebuild_rollups
 
 # Initialisation du router et des templates
 admin_router = APIRouter(
@@ -29,14 +42,7 @@ def log_action(db: Session, current_user: User, request: Request, description: s
     """
     Enregistre une action dans la table Audit pour assurer la traçabilité.
     """
-    audit_log = Audit(
-        user_id=current_user.id,
-        user_role=current_user.role,
-        action_description=description,
-        date=datetime.now(timezone.utc)
-    )
-    db.add(audit_log)
-    db.commit()
+    audit_writer.enqueue(db, current_user.id, current_user.role, description)
 # ======================
 # LISTE DES SESSIONS (JSON)
 # ======================
@@ -84,14 +90,18 @@ def revoke_session(session_id: int, request: Request, db: Session = Depends(get_
 # STATISTIQUES AUDIT (JSON)
 # ======================
 @admin_router.get("/audit-stats", dependencies=[Depends(require_role("researcher", "admin", "super_admin"))])
-def audit_stats(db: Session = Depends(get_db)):
-    audits = db.query(Audit).all()
-    stats = {}
-    for a in audits:
-        day = a.date.strftime("%Y-%m-%d")
-        stats[day] = stats.get(day, 0) + 1
+def audit_stats(
+    db: Session = Depends(get_db),
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    bucket: str = "day",
+):
+    # Lu depuis audit_rollups : le coût ne dépend plus de la taille de la table audits
+    if bucket not in BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket doit valoir {', '.join(BUCKETS)}")
 
-    return [{"date": d, "count": stats[d]} for d in sorted(stats.keys())]
+    series = audit_series(db, date_from, date_to, bucket)
+    return [{"date": format_bucket(start, bucket), "count": count} for start, count in series]
 
 # ======================
 # PAGE HTML DES STATISTIQUES AUDIT
@@ -107,20 +117,17 @@ def audit_stats_page(request: Request, current_user: User = Depends(get_current_
 # ======================
 @admin_router.get("/dashboard", response_class=HTMLResponse, dependencies=[Depends(require_role("admin", "super_admin"))])
 def dashboard_page(request: Request, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    total_users = db.query(User).count()
-    active_users = db.query(User).filter(User.status == "active").count()
-    inactive_users = db.query(User).filter(User.status == "inactive").count()
-    active_sessions = db.query(RefreshToken).filter(RefreshToken.revoked == False).count()
-    total_audits = db.query(Audit).count()
+    metrics = metrics_snapshot.get(db)
 
     return templates.TemplateResponse("dashboard.html", {
         "request": request,
         "current_user": current_user,
-        "total_users": total_users,
-        "active_users": active_users,
-        "inactive_users": inactive_users,
-        "active_sessions": active_sessions,
-        "total_audits": total_audits
+        "total_users": metrics["total_users"],
+        "active_users": metrics["active_users"],
+        "inactive_users": metrics["inactive_users"],
+        "active_sessions": metrics["active_sessions"],
+        "total_audits": metrics["total_audits"],
+        "metrics_age": metrics["age_seconds"]
     })
 # ======================
 # EXPORT CSV DU DASHBOARD
@@ -134,21 +141,35 @@ def export_dashboard_csv(
     # ✅ Audit log automatique
     log_action(db, current_user, request, "Export CSV du dashboard")
 
-    total_users = db.query(User).count()
-    active_users = db.query(User).filter(User.status == "active").count()
-    inactive_users = db.query(User).filter(User.status == "inactive").count()
-    active_sessions = db.query(RefreshToken).filter(RefreshToken.revoked == False).count()
-    total_audits = db.query(Audit).count()
+    metrics = metrics_snapshot.get(db)
+    gzip = accepts_gzip(request)
 
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["Total utilisateurs", "Actifs", "Inactifs", "Sessions actives", "Total audits"])
-    writer.writerow([total_users, active_users, inactive_users, active_sessions, total_audits])
-    output.seek(0)
-
-    return StreamingResponse(output, media_type="text/csv", headers={
-        "Content-Disposition": "attachment; filename=dashboard_report.csv"
-    })
+    # Même instantané, même encodage : fichier déjà rendu
+    report, hit = report_cache.get_or_render(
+        "dashboard.csv", {"gzip": gzip}, report_version(db, "dashboard", metrics), "csv",
+        lambda: csv_bytes(
+            ["Total utilisateurs", "Actifs", "Inactifs", "Sessions actives", "Total audits", "Données du"],
+            [[metrics["total_users"], metrics["active_users"], metrics["inactive_users"],
+              metrics["active_sessions"], metrics["total_audits"], metrics["computed_at"].isoformat()]],
+            gzip
+        )
+    )
+    headers = {"Vary": "Accept-Encoding"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+    return report_response(report, "text/csv; charset=utf-8", "dashboard_report.csv", hit, headers)
+# ======================
+# COMPTEURS DU DASHBOARD DANS LES PDF
+# ======================
+def draw_metrics(p, metrics: dict):
+    p.setFont("Helvetica", 12)
+    p.drawString(100, 700, f"Total utilisateurs : {metrics['total_users']}")
+    p.drawString(100, 680, f"Utilisateurs actifs : {metrics['active_users']}")
+    p.drawString(100, 660, f"Utilisateurs inactifs : {metrics['inactive_users']}")
+    p.drawString(100, 640, f"Sessions actives : {metrics['active_sessions']}")
+    p.drawString(100, 620, f"Total audits : {metrics['total_audits']}")
+    p.setFont("Helvetica", 9)
+    p.drawString(100, 600, f"Données du {metrics['computed_at']:%d/%m/%Y %H:%M:%S} UTC")
 # ======================
 # EXPORT PDF DU DASHBOARD (stats seules)
 # ======================
@@ -161,31 +182,24 @@ def export_dashboard_pdf(
     # ✅ Audit log automatique
     log_action(db, current_user, request, "Export PDF du dashboard (stats seules)")
 
-    total_users = db.query(User).count()
-    active_users = db.query(User).filter(User.status == "active").count()
-    inactive_users = db.query(User).filter(User.status == "inactive").count()
-    active_sessions = db.query(RefreshToken).filter(RefreshToken.revoked == False).count()
-    total_audits = db.query(Audit).count()
+    metrics = metrics_snapshot.get(db)
 
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=letter)
-    p.setFont("Helvetica-Bold", 16)
-    p.drawString(200, 750, "Rapport Dashboard Admin")
+    def render() -> bytes:
+        buffer = BytesIO()
+        p = canvas.Canvas(buffer, pagesize=letter)
+        p.setFont("Helvetica-Bold", 16)
+        p.drawString(200, 750, "Rapport Dashboard Admin")
 
-    p.setFont("Helvetica", 12)
-    p.drawString(100, 700, f"Total utilisateurs : {total_users}")
-    p.drawString(100, 680, f"Utilisateurs actifs : {active_users}")
-    p.drawString(100, 660, f"Utilisateurs inactifs : {inactive_users}")
-    p.drawString(100, 640, f"Sessions actives : {active_sessions}")
-    p.drawString(100, 620, f"Total audits : {total_audits}")
+        draw_metrics(p, metrics)
 
-    p.showPage()
-    p.save()
-    buffer.seek(0)
+        p.showPage()
+        p.save()
+        return buffer.getvalue()
 
-    return StreamingResponse(buffer, media_type="application/pdf", headers={
-        "Content-Disposition": "attachment; filename=dashboard_report.pdf"
-    })
+    report, hit = report_cache.get_or_render(
+        "dashboard.pdf", {}, report_version(db, "dashboard", metrics), "pdf", render
+    )
+    return report_response(report, "application/pdf", "dashboard_report.pdf", hit)
 # ======================
 # EXPORT PDF DU DASHBOARD AVEC GRAPHIQUE
 # ======================
@@ -204,23 +218,14 @@ def export_dashboard_pdf_with_chart(
     log_action(db, current_user, request, "Export PDF du dashboard avec graphique")
 
     # Récupérer les stats
-    total_users = db.query(User).count()
-    active_users = db.query(User).filter(User.status == "active").count()
-    inactive_users = db.query(User).filter(User.status == "inactive").count()
-    active_sessions = db.query(RefreshToken).filter(RefreshToken.revoked == False).count()
-    total_audits = db.query(Audit).count()
+    metrics = metrics_snapshot.get(db)
 
     buffer = BytesIO()
     p = canvas.Canvas(buffer, pagesize=letter)
     p.setFont("Helvetica-Bold", 16)
     p.drawString(200, 750, "Rapport Dashboard Admin (avec graphique)")
 
-    p.setFont("Helvetica", 12)
-    p.drawString(100, 700, f"Total utilisateurs : {total_users}")
-    p.drawString(100, 680, f"Utilisateurs actifs : {active_users}")
-    p.drawString(100, 660, f"Utilisateurs inactifs : {inactive_users}")
-    p.drawString(100, 640, f"Sessions actives : {active_sessions}")
-    p.drawString(100, 620, f"Total audits : {total_audits}")
+    draw_metrics(p, metrics)
 
     # Ajouter le graphique
     try:
@@ -252,39 +257,113 @@ def export_dashboard_pdf_with_chart(
 # ======================
 @admin_router.get("/dashboard/audits", dependencies=[Depends(require_role("admin", "super_admin"))])
 def latest_audits(
-    page: int = 1,
     limit: int = 10,
+    cursor: str | None = None,
     user_id: int | None = None,
     role: str | None = None,
     action: str | None = None,
+    with_total: bool = False,
     db: Session = Depends(get_db)
 ):
-    # Construire la requête avec filtres
+    # Construire la requête avec filtres (colonnes indexées avec date)
     query = db.query(Audit)
     if user_id:
         query = query.filter(Audit.user_id == user_id)
     if role:
         query = query.filter(Audit.user_role == role)
     if action:
-        query = query.filter(Audit.action_description.ilike(f"%{action}%"))
+        try:
+            query = query.filter(Audit.action_code == AuditAction(action))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Action inconnue : {action}")
 
-    # Pagination
-    total = query.count()
-    audits = query.order_by(Audit.date.desc()).offset((page - 1) * limit).limit(limit).all()
+    # Pagination par curseur sur (date, id) : coût constant quelle que soit la page
+    try:
+        page = keyset_page(query, Audit.date, Audit.id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     # Retour JSON
-    return {
-        "total": total,
-        "page": page,
+    result = {
         "limit": limit,
+        "next": page["next"],
+        "prev": page["prev"],
         "audits": [
             {
                 "id": a.id,
                 "user_id": a.user_id,
                 "user_role": a.user_role,
                 "action": a.action_description,
+                "action_code": a.action_code.value,
+                "details": a.details,
                 "date": a.date.strftime("%Y-%m-%d %H:%M:%S")
             }
-            for a in audits
+            for a in page["items"]
         ]
     }
+    if with_total:
+        result["total"], result["total_is_estimate"] = estimate_count(query)
+    return result
+# ======================
+# MÉTRIQUES DES CACHES (JSON)
+# ======================
+@admin_router.get("/cache/stats", dependencies=[Depends(require_role("admin", "super_admin"))])
+def cache_stats():
+    return {"caches": [profile_cache.stats(), principal_cache.stats(), metrics_snapshot.stats(),
+                       report_cache.stats()]}
+
+# ======================
+# MÉTRIQUES DU POOL DE HACHAGE (JSON)
+# ======================
+@admin_router.get("/password-pool/stats", dependencies=[Depends(require_role("admin", "super_admin"))])
+def password_pool_stats():
+    return password_service.stats()
+
+# ======================
+# RAPPORTS PDF EN TÂCHE DE FOND (JSON)
+# ======================
+@admin_router.get("/pdf-jobs/stats", dependencies=[Depends(require_role("admin", "super_admin"))])
+def pdf_jobs_stats():
+    return pdf_jobs.stats()
+
+# ======================
+# INDEX DE RECHERCHE EN MÉMOIRE (JSON)
+# ======================
+@admin_router.get("/search-index/stats", dependencies=[Depends(require_role("admin", "super_admin"))])
+def search_index_stats():
+    return search_index.stats()
+
+# ======================
+# MÉTRIQUES DES POOLS DE CONNEXIONS (JSON)
+# ======================
+@admin_router.get("/db-pool/stats", dependencies=[Depends(require_role("admin", "super_admin"))])
+def db_pool_stats():
+    return {
+        "pools": [metrics.stats() for metrics in pool_metrics.values()],
+        "replica": replica_health.stats() if replica_engine is not None else None,
+    }
+
+# ======================
+# LATENCE DE LA BOUCLE ASYNCIO (JSON, LOOP_LAG_MONITOR=1)
+# ======================
+@admin_router.get("/loop-monitor/stats", dependencies=[Depends(require_role("admin", "super_admin"))])
+def loop_monitor_stats():
+    return loop_monitor.stats()
+
+# ======================
+# MÉTRIQUES DE L'ÉCRITURE DES AUDITS (JSON)
+# ======================
+@admin_router.get("/audit-writer/stats", dependencies=[Depends(require_role("admin", "super_admin"))])
+def audit_writer_stats():
+    return audit_writer.stats()
+
+# ======================
+# RECALCUL DES ROLLUPS (RATTRAPAGE)
+# ======================
+@admin_router.post("/rollups/rebuild", dependencies=[Depends(require_role("super_admin"))])
+def rollups_rebuild(
+    db: Session = Depends(get_db),
+    since: Optional[datetime] = None,
+):
+    audit_writer.flush()  # les audits en file doivent être en base avant le recalcul
+    return rebuild_rollups(db, since)
@@ -4,7 +4,8 @@ from database import get_db
 from models.user import User
 from auth.jwt import create_activation_token
 from pydantic import BaseModel
-from email_service import send_activation_email_brevo
+from email_service import build_activation_email
+from services.email_outbox import enqueue_email
 
 router = APIRouter(prefix="/admin/users", tags=["Admin Activation"])
 
@@ -20,11 +21,16 @@ def get_activation_link(payload: EmailRequest, db: Session = Depends(get_db)):
     token = create_activation_token(user.email)
     link = f"http://localhost:3000/auth/activate?token={token}"
     
-    # Utilisation de Brevo (au lieu de Resend)
-    email_sent = send_activation_email_brevo(payload.email, link, getattr(user, 'first_name', ''))
-    
+    # Mise en outbox : envoyé par le worker, toujours via Brevo (expéditeur InchTechs)
+    subject, html = build_activation_email(link, getattr(user, 'first_name', ''))
+    email = enqueue_email(db, to_email=payload.email, subject=subject, html=html, transport="brevo")
+    db.commit()
+
+    # Pas encore envoyé : l'état de l'envoi est celui de la ligne email_outbox
     return {
         "activation_link": link,
-        "email_sent": email_sent,
-        "message": "Email d'activation envoyé" if email_sent else "Erreur d'envoi"
-    }
\ No newline at end of file
+        "email_queued": True,
+        "outbox_id": email.id,
+        "email_status": email.status,
+        "message": "Email d'activation mis en file d'envoi"
+    }
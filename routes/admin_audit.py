@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import datetime, timezone
 from database import get_db
-from models.audit import Audit
+from models.audit import Audit, AuditAction
 from models.user import User
 from auth.jwt import get_current_user
+from services.pagination import keyset_page, estimate_count
+from services.audit_retention import apply_retention, iter_archive, list_archives, parse_month, archive_path
+import os
 
 router = APIRouter(prefix="/admin/audit", tags=["Admin Audit"])
 
@@ -13,25 +17,92 @@ router = APIRouter(prefix="/admin/audit", tags=["Admin Audit"])
 def get_audit_logs(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
-    limit: int = Query(100, ge=1, le=1000),
-    offset: int = Query(0, ge=0)
+    limit: int = Query(100, ge=1, le=200),
+    cursor: str = Query(None, description="Curseur opaque next/prev de la réponse précédente"),
+    with_total: bool = Query(False, description="Ajoute un total (estimé sur PostgreSQL)"),
+    user_id: int = Query(None),
+    role: str = Query(None),
+    action: str = Query(None)
 ):
     if current_user.role not in ["admin", "super_admin"]:
         raise HTTPException(status_code=403, detail="Accès réservé aux administrateurs")
     
-    logs = db.query(Audit).order_by(Audit.date.desc()).offset(offset).limit(limit).all()
-    total = db.query(Audit).count()
-    
-    return {
-        "total": total,
+    query = db.query(Audit)
+    if user_id:
+        query = query.filter(Audit.user_id == user_id)
+    if role:
+        query = query.filter(Audit.user_role == role)
+    if action:
+        try:
+            query = query.filter(Audit.action_code == AuditAction(action))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Action inconnue : {action}")
+
+    try:
+        page = keyset_page(query, Audit.date, Audit.id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    result = {
+        "next": page["next"],
+        "prev": page["prev"],
         "logs": [
             {
                 "id": log.id,
                 "user_id": log.user_id,
                 "user_role": log.user_role,
                 "action_description": log.action_description,
+                "action_code": log.action_code.value,
+                "details": log.details,
                 "date": log.date.isoformat() if log.date else None
             }
-            for log in logs
+            for log in page["items"]
         ]
-    }
\ No newline at end of file
+    }
+    if with_total:
+        result["total"], result["total_is_estimate"] = estimate_count(query)
+    return result
+
+
+@router.get("/archives")
+def get_audit_archives(current_user: User = Depends(get_current_user)):
+    if current_user.role not in ["admin", "super_admin"]:
+        raise HTTPException(status_code=403, detail="Accès réservé aux administrateurs")
+
+    return {"archives": list_archives()}
+
+
+@router.get("/archives/{month}")
+def stream_audit_archive(
+    month: str,
+    current_user: User = Depends(get_current_user),
+    user_id: int = Query(None)
+):
+    """Relit un mois archivé en NDJSON, ligne à ligne (filtre user_id optionnel)"""
+    if current_user.role not in ["admin", "super_admin"]:
+        raise HTTPException(status_code=403, detail="Accès réservé aux administrateurs")
+
+    try:
+        archived_month = parse_month(month)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Mois invalide (format AAAA-MM)")
+    if not os.path.exists(archive_path(archived_month)):
+        raise HTTPException(status_code=404, detail=f"Aucune archive pour {month}")
+
+    return StreamingResponse(
+        iter_archive(archived_month, user_id),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f"attachment; filename=audits_{month}.ndjson"}
+    )
+
+
+@router.post("/retention")
+def run_audit_retention(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Archive et supprime les mois hors de la fenêtre de rétention"""
+    if current_user.role != "super_admin":
+        raise HTTPException(status_code=403, detail="Accès réservé au super administrateur")
+
+    return {"archived": apply_retention(db)}
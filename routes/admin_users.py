@@ -1,18 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File, Form
-from fastapi.responses import StreamingResponse, HTMLResponse
-from sqlalchemy.orm import Session
-from io import StringIO
-import csv
+from fastapi.responses import HTMLResponse
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
 import json
 import os
 import shutil
 import requests
-import bcrypt
+from auth.password_service import password_service
 from datetime import datetime, timezone
 
-from database import get_db
+from database import get_db, unit_of_work
+from services.audit_writer import audit_writer
+from services.csv_export import csv_response, stream_rows
 from models.user import User
-from models.audit import Audit
+from models.audit import Audit, AuditAction
 from models.profile import Profile
 from auth.jwt import get_current_user, create_activation_token
 from fastapi.templating import Jinja2Templates
@@ -62,14 +63,11 @@ def list_users(
     total = query.count()
     users = query.offset((page - 1) * per_page).limit(per_page).all()
 
-    audit_log = Audit(
-        user_id=current_user.id,
-        user_role=current_user.role,
-        action_description=f"Consultation utilisateurs (role={role}, status={status}, page={page})",
-        date=datetime.now(timezone.utc)
+    audit_writer.enqueue(
+        db, current_user.id, current_user.role,
+        f"Consultation utilisateurs (role={role}, status={status}, page={page})",
+        AuditAction.READ, {"role": role, "status": status, "page": page}
     )
-    db.add(audit_log)
-    db.commit()
 
     return {
         "total": total,
@@ -107,7 +105,7 @@ def create_user(
         raise HTTPException(status_code=400, detail="Email déjà utilisé")
 
     # Hachage du mot de passe
-    hashed = bcrypt.hashpw(payload.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    hashed = password_service.hash_sync(payload.password)
 
     is_admin_role = payload.role in ["admin", "super_admin"]
     
@@ -143,6 +141,7 @@ def create_user(
 # ======================
 @admin_users_router.get("/export")
 def export_users(
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     role: str = Query(None),
@@ -151,41 +150,32 @@ def export_users(
     if current_user.role not in ["admin", "super_admin"]:
         raise HTTPException(status_code=403, detail="Accès réservé aux administrateurs")
 
-    query = db.query(User)
+    # Profils chargés par la même requête (jointure), lus par lots
+    stmt = select(User).options(joinedload(User.profile)).order_by(User.id)
     if role:
-        query = query.filter(User.role == role)
+        stmt = stmt.where(User.role == role)
     if status:
-        query = query.filter(User.status == status)
-
-    users = query.all()
+        stmt = stmt.where(User.status == status)
 
-    output = StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["ID", "Email", "Role", "Status", "Prénom", "Nom"])
-    for u in users:
-        writer.writerow([
-            u.id, 
-            u.email, 
-            u.role, 
+    rows = (
+        [
+            u.id,
+            u.email,
+            u.role,
             u.status,
             u.profile.first_name if u.profile else "",
             u.profile.last_name if u.profile else ""
-        ])
-
-    output.seek(0)
+        ]
+        for u in stream_rows(db, stmt)
+    )
 
-    audit_log = Audit(
-        user_id=current_user.id,
-        user_role=current_user.role,
-        action_description=f"Export CSV utilisateurs (role={role}, status={status})",
-        date=datetime.now(timezone.utc)
+    audit_writer.enqueue(
+        db, current_user.id, current_user.role,
+        f"Export CSV utilisateurs (role={role}, status={status})",
+        AuditAction.EXPORT, {"role": role, "status": status}
     )
-    db.add(audit_log)
-    db.commit()
 
-    return StreamingResponse(output, media_type="text/csv", headers={
-        "Content-Disposition": "attachment; filename=users_export.csv"
-    })
+    return csv_response(["ID", "Email", "Role", "Status", "Prénom", "Nom"], rows, "users_export.csv", request)
 
 # ======================
 # PAGE HTML
@@ -218,17 +208,16 @@ def change_user_role(
         raise HTTPException(status_code=400, detail="Rôle invalide")
     
     old_role = user.role
-    user.role = new_role
-    db.commit()
-    
-    audit_log = Audit(
-        user_id=current_user.id,
-        user_role=current_user.role,
-        action_description=f"Changement de rôle de {user.email} : {old_role} → {new_role}",
-        date=datetime.now(timezone.utc)
-    )
-    db.add(audit_log)
-    db.commit()
+    with unit_of_work(db):
+        user.role = new_role
+
+        audit_log = Audit(
+            user_id=current_user.id,
+            user_role=current_user.role,
+            action_description=f"Changement de rôle de {user.email} : {old_role} → {new_role}",
+            date=datetime.now(timezone.utc)
+        )
+        db.add(audit_log)
     
     return {
         "message": f"Rôle de {user.email} changé avec succès",
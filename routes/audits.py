@@ -1,43 +1,104 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
 from sqlalchemy.orm import Session
 from database import get_db
-from models.audit import Audit
-from schemas.audit import AuditOut
+from models.audit import Audit, AuditAction
+from schemas.audit import AuditPage
+from services.pagination import keyset_page, estimate_count
+from services.csv_export import csv_response, stream_rows
 from auth.dependencies import get_current_admin
-from datetime import datetime
-import csv
-import io
-from fastapi.responses import StreamingResponse
+from datetime import datetime, timedelta
+from fastapi.responses import HTMLResponse
+from fastapi.templating import Jinja2Templates
+from urllib.parse import urlencode
 
 router = APIRouter(prefix="/audits", tags=["Audits"])
+templates = Jinja2Templates(directory="templates")
+
+
+def filtered_audits(db: Session, role, action, start_date, end_date):
+    """Requête des audits filtrée sur les colonnes indexées"""
+    query = db.query(Audit)
+
+    if role:
+        query = query.filter(Audit.user_role == role)
+    if action:
+        try:
+            query = query.filter(Audit.action_code == AuditAction(action))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Action inconnue : {action}")
+    if start_date:
+        query = query.filter(Audit.date >= start_date)
+    if end_date:
+        query = query.filter(Audit.date <= end_date)
+    return query
+
+
+def audits_page(query, limit: int, cursor: str | None):
+    try:
+        return keyset_page(query, Audit.date, Audit.id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # ================== LISTER LES AUDITS AVEC FILTRES ET PAGINATION (ADMIN) ==================
 @router.get(
     "/", 
-    response_model=list[AuditOut], 
+    response_model=AuditPage, 
     summary="Lister les audits", 
-    description="Permet à un administrateur de consulter les logs d'audit avec filtres et pagination."
+    description="Permet à un administrateur de consulter les logs d'audit avec filtres et pagination par curseur."
 )
 def get_audits(
     db: Session = Depends(get_db),
     current_user = Depends(get_current_admin),
     role: str | None = Query(None, description="Filtrer par rôle utilisateur"),
+    action: str | None = Query(None, description="Filtrer par type d'action (login, export...)"),
     start_date: datetime | None = Query(None, description="Filtrer à partir de cette date"),
     end_date: datetime | None = Query(None, description="Filtrer jusqu’à cette date"),
-    skip: int = 0,
-    limit: int = 20
+    cursor: str | None = Query(None, description="Curseur next/prev de la page précédente"),
+    limit: int = Query(20, ge=1, le=200),
+    with_total: bool = Query(False, description="Ajoute un total (estimé sur PostgreSQL)")
 ):
-    query = db.query(Audit)
+    query = filtered_audits(db, role, action, start_date, end_date)
+    page = audits_page(query, limit, cursor)
 
-    if role:
-        query = query.filter(Audit.user_role == role)
-    if start_date:
-        query = query.filter(Audit.created_at >= start_date)
-    if end_date:
-        query = query.filter(Audit.created_at <= end_date)
+    result = {"items": page["items"], "next": page["next"], "prev": page["prev"]}
+    if with_total:
+        result["total"], result["total_is_estimate"] = estimate_count(query)
+    return result
 
-    audits = query.order_by(Audit.created_at.desc()).offset(skip).limit(limit).all()
-    return audits
+# ================== PAGE HTML DU JOURNAL (ADMIN) ==================
+@router.get("/page", response_class=HTMLResponse, summary="Journal des audits (HTML)")
+def audits_html(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_admin),
+    role: str | None = Query(None),
+    action: str | None = Query(None),
+    start_date: str | None = Query(None),
+    end_date: str | None = Query(None),
+    cursor: str | None = Query(None),
+    limit: int = Query(20, ge=1, le=200)
+):
+    # Le formulaire envoie des champs vides : on ne garde que les filtres renseignés
+    filters = {k: v for k, v in {
+        "role": role, "action": action, "start_date": start_date, "end_date": end_date
+    }.items() if v}
+    try:
+        start = datetime.fromisoformat(start_date) if start_date else None
+        end = datetime.fromisoformat(end_date) + timedelta(days=1) if end_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Date invalide (format AAAA-MM-JJ)")
+
+    page = audits_page(filtered_audits(db, role or None, action or None, start, end), limit, cursor)
+
+    return templates.TemplateResponse("audits.html", {
+        "request": request,
+        "t": {},  # base.html : libellés par défaut (traductions définies dans main.py)
+        "current_user": current_user,
+        "audits": page["items"],
+        "next_url": f"?{urlencode({**filters, 'cursor': page['next']})}" if page["next"] else None,
+        "prev_url": f"?{urlencode({**filters, 'cursor': page['prev']})}" if page["prev"] else None,
+        **filters,
+    })
 
 # ================== EXPORT CSV (ADMIN) ==================
 @router.get(
@@ -46,35 +107,20 @@ def get_audits(
     description="Permet à un administrateur d'exporter les logs d'audit filtrés en CSV."
 )
 def export_audits_csv(
+    request: Request,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_admin),
     role: str | None = Query(None, description="Filtrer par rôle utilisateur"),
+    action: str | None = Query(None, description="Filtrer par type d'action (login, export...)"),
     start_date: datetime | None = Query(None, description="Filtrer à partir de cette date"),
     end_date: datetime | None = Query(None, description="Filtrer jusqu’à cette date")
 ):
-    query = db.query(Audit)
-
-    if role:
-        query = query.filter(Audit.user_role == role)
-    if start_date:
-        query = query.filter(Audit.created_at >= start_date)
-    if end_date:
-        query = query.filter(Audit.created_at <= end_date)
-
-    audits = query.order_by(Audit.created_at.desc()).all()
-
-    if not audits:
+    query = filtered_audits(db, role, action, start_date, end_date)
+    if query.first() is None:
         raise HTTPException(status_code=404, detail="Aucun audit trouvé ❌")
 
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["ID", "User ID", "Role", "Action", "Date"])
-    for audit in audits:
-        writer.writerow([audit.id, audit.user_id, audit.user_role, audit.action_description, audit.created_at])
-
-    output.seek(0)
-    return StreamingResponse(
-        output, 
-        media_type="text/csv", 
-        headers={"Content-Disposition": "attachment; filename=audits.csv"}
+    rows = (
+        [audit.id, audit.user_id, audit.user_role, audit.action_description, audit.action_code.value, audit.date]
+        for audit in stream_rows(db, query.statement.order_by(Audit.date.desc(), Audit.id.desc()))
     )
+    return csv_response(["ID", "User ID", "Role", "Action", "Code", "Date"], rows, "audits.csv", request)
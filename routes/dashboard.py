@@ -1,26 +1,27 @@
 # routes/dashboard.py - VERSION FINALE CORRIGÉE
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from datetime import datetime, timedelta
 from datetime import timezone
+from typing import Optional
 import traceback
 
 from database import get_db
 from models.user import User
 from models.audit import Audit
 from models.message_contact import MessageContact
-from models.publication import Publication
-from models.project import Project
-from models.cours import Cours
-from models.comment import Comment
-from models.distinction import Distinction
-from models.academic_career import AcademicCareer
-from models.media_artefact import MediaArtefact
 from auth.jwt import get_current_user
+from services.metrics import metrics_snapshot
+from services.rollups import BUCKETS, audit_series, message_series, format_bucket
 
 router = APIRouter(prefix="/api/dashboard", tags=["Dashboard"])
 
+GENERAL_METRICS = (
+    "total_users", "total_audits", "total_messages", "total_publications", "total_projects",
+    "total_cours", "total_comments", "total_distinctions", "total_academic", "total_media",
+    "recent_audits_7d",
+)
+
 def reset_db_session(db: Session):
     """Réinitialise la session DB en cas d'erreur de transaction"""
     try:
@@ -30,7 +31,7 @@ def reset_db_session(db: Session):
 
 # ===================== STATISTIQUES DU DASHBOARD =====================
 @router.get("/stats")
-async def get_dashboard_stats(
+def get_dashboard_stats(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -38,178 +39,61 @@ async def get_dashboard_stats(
     if current_user.role not in ["admin", "super_admin"]:
         raise HTTPException(status_code=403, detail="Accès refusé")
     
-    try:
-        # Réinitialiser la session au cas où
-        reset_db_session(db)
-        
-        # Statistiques générales - version SÉCURISÉE
-        stats = {
-            "general": {
-                "total_users": 0,
-                "total_audits": 0,
-                "total_messages": 0,
-                "total_publications": 0,
-                "total_projects": 0,
-                "total_cours": 0,
-                "total_comments": 0,
-                "total_distinctions": 0,
-                "total_academic": 0,
-                "total_media": 0,
-                "recent_audits_7d": 0,
-            },
-            "users_by_role": {},
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
-        
-        # Essayer chaque requête séparément
-        try:
-            stats["general"]["total_users"] = db.query(User).count()
-        except Exception as e:
-            print(f"⚠️  Erreur comptage users: {e}")
-            db.rollback()
-        
-        try:
-            stats["general"]["total_audits"] = db.query(Audit).count()
-        except Exception as e:
-            print(f"⚠️  Erreur comptage audits: {e}")
-            db.rollback()
-        
-        try:
-            stats["general"]["total_messages"] = db.query(MessageContact).count()
-        except Exception as e:
-            print(f"⚠️  Erreur comptage messages: {e}")
-            db.rollback()
-        
-        # Compter les autres modèles avec try/except
-        models_to_count = [
-            (Publication, "total_publications"),
-            (Project, "total_projects"),
-            (Cours, "total_cours"),
-            (Comment, "total_comments"),
-            (Distinction, "total_distinctions"),
-            (AcademicCareer, "total_academic"),
-            (MediaArtefact, "total_media")
-        ]
-        
-        for model, key in models_to_count:
-            try:
-                count = db.query(model).count()
-                stats["general"][key] = count
-            except Exception as e:
-                print(f"⚠️  Erreur comptage {key}: {e}")
-                db.rollback()
-                stats["general"][key] = 0
-        
-        # Utilisateurs par rôle - version sécurisée
-        try:
-            users_by_role = db.query(User.role, func.count(User.id)).group_by(User.role).all()
-            stats["users_by_role"] = {role: count for role, count in users_by_role if role}
-        except Exception as e:
-            print(f"⚠️  Erreur users par rôle: {e}")
-            db.rollback()
-            stats["users_by_role"] = {}
-        
-        # Audits récents (7 derniers jours)
-        try:
-            week_ago = datetime.now(timezone.utc) - timedelta(days=7)
-            recent_audits = db.query(Audit).filter(Audit.date >= week_ago).count()
-            stats["general"]["recent_audits_7d"] = recent_audits
-        except Exception as e:
-            print(f"⚠️  Erreur audits récents: {e}")
-            db.rollback()
-        
-        return stats
-        
-    except Exception as e:
-        traceback.print_exc()
-        # Retourner des données minimales plutôt qu'une erreur 500
-        return {
-            "general": {
-                "total_users": 0,
-                "total_audits": 0,
-                "total_messages": 0,
-                "total_publications": 0,
-                "total_projects": 0,
-                "total_cours": 0,
-                "total_comments": 0,
-                "total_distinctions": 0,
-                "total_academic": 0,
-                "total_media": 0,
-                "recent_audits_7d": 0,
-            },
-            "users_by_role": {},
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "note": "Données limitées en raison d'une erreur technique"
-        }
+    # Instantané partagé (services/metrics.py) : une requête, mis en cache
+    snapshot = metrics_snapshot.get(db)
+    stats = {
+        "general": {key: snapshot[key] for key in GENERAL_METRICS},
+        "users_by_role": snapshot["users_by_role"],
+        "timestamp": snapshot["computed_at"].isoformat(),
+        "age_seconds": snapshot["age_seconds"],
+        "stale": snapshot["stale"],
+    }
+    if "note" in snapshot:
+        stats["note"] = snapshot["note"]
+    return stats
 
 # ===================== DONNÉES POUR GRAPHIQUES =====================
 @router.get("/charts")
-async def get_chart_data(
+def get_chart_data(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
-    days: int = 30
+    days: int = 30,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    bucket: str = "day"
 ):
-    """Données pour les graphiques du dashboard"""
+    """Données pour les graphiques du dashboard (lues depuis les rollups)"""
     if current_user.role not in ["admin", "super_admin"]:
         raise HTTPException(status_code=403, detail="Accès refusé")
+    if bucket not in BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket doit valoir {', '.join(BUCKETS)}")
     
     try:
-        # Audits par jour (30 derniers jours)
-        start_date = datetime.now(timezone.utc).date() - timedelta(days=days)
-        
-        audit_stats = db.query(
-            func.date(Audit.date).label('date'),
-            func.count(Audit.id).label('count')
-        ).filter(
-            Audit.date >= start_date
-        ).group_by(
-            func.date(Audit.date)
-        ).order_by('date').all()
-        
-        # Formater pour le graphique
+        # Audits par période (par défaut : jours des `days` derniers jours)
+        start = date_from or datetime.now(timezone.utc) - timedelta(days=days)
         audit_dates = []
         audit_counts = []
-        for stat in audit_stats:
-            if stat.date:
-                audit_dates.append(str(stat.date))
-                audit_counts.append(stat.count or 0)
-        
-        # Messages par mois (version compatible)
-        message_stats = []
-        try:
-            # Essayer PostgreSQL
-            message_stats = db.query(
-                func.date_trunc('month', MessageContact.created_at).label('month'),
-                func.count(MessageContact.id).label('count')
-            ).group_by(
-                func.date_trunc('month', MessageContact.created_at)
-            ).order_by('month').all()
-        except:
-            try:
-                # Essayer SQLite
-                message_stats = db.query(
-                    func.strftime('%Y-%m', MessageContact.created_at).label('month'),
-                    func.count(MessageContact.id).label('count')
-                ).group_by(
-                    func.strftime('%Y-%m', MessageContact.created_at)
-                ).order_by('month').all()
-            except Exception as e:
-                print(f"⚠️  Erreur messages par mois: {e}")
+        for period, count in audit_series(db, start, date_to, bucket):
+            audit_dates.append(format_bucket(period, bucket))
+            audit_counts.append(count)
         
+        # Messages par mois (tout l'historique sauf bornes explicites)
         message_months = []
         message_counts = []
-        for stat in message_stats:
-            if hasattr(stat.month, 'strftime'):
-                message_months.append(stat.month.strftime('%Y-%m'))
-            else:
-                message_months.append(str(stat.month))
-            message_counts.append(stat.count or 0)
+        for month, count in message_series(db, date_from, date_to):
+            message_months.append(format_bucket(month, "month"))
+            message_counts.append(count)
+        
+        if date_from or date_to:
+            audit_title = "Audits"
+        else:
+            audit_title = f"Audits ({days} derniers jours)"
         
         return {
             "audits": {
                 "labels": audit_dates,
                 "data": audit_counts,
-                "title": f"Audits ({days} derniers jours)"
+                "title": audit_title
             },
             "messages": {
                 "labels": message_months,
@@ -227,7 +111,7 @@ async def get_chart_data(
 
 # ===================== ACTIVITÉS RÉCENTES =====================
 @router.get("/recent-activities")
-async def get_recent_activities(
+def get_recent_activities(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     limit: int = 10
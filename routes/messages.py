@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from database import get_db
 from models.message_contact import MessageContact
@@ -6,9 +7,7 @@ from models.audit import Audit
 from models.user import User
 from schemas.message import MessageCreate, MessageOut, MessageUpdate
 from auth.dependencies import get_current_normal_user, get_current_admin
-import csv
-import io
-from fastapi.responses import StreamingResponse
+from services.csv_export import csv_response, stream_rows
 
 router = APIRouter(prefix="/messages", tags=["Messages"])
 
@@ -64,14 +63,10 @@ def update_message_status(message_id: int, data: MessageUpdate, db: Session = De
 
 # ================== EXPORT CSV (ADMIN) ==================
 @router.get("/export/csv", summary="Exporter les messages en CSV", description="Permet à un administrateur d'exporter tous les messages en CSV.")
-def export_messages_csv(db: Session = Depends(get_db), current_user: User = Depends(get_current_admin)):
-    messages = db.query(MessageContact).all()
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["ID", "Subject", "Content", "User ID", "Status", "Created At"])
-    for msg in messages:
-        writer.writerow([msg.id, msg.subject, msg.content, msg.user_id, msg.status, msg.created_at])
-
-    output.seek(0)
-    return StreamingResponse(output, media_type="text/csv", headers={"Content-Disposition": "attachment; filename=messages.csv"})
+def export_messages_csv(request: Request, db: Session = Depends(get_db), current_user: User = Depends(get_current_admin)):
+    stmt = select(MessageContact).order_by(MessageContact.id)
+    rows = (
+        [msg.id, msg.profile_id, msg.sender_name, msg.sender_email, msg.message, msg.created_at]
+        for msg in stream_rows(db, stmt)
+    )
+    return csv_response(["ID", "Profile ID", "Sender", "Email", "Message", "Created At"], rows, "messages.csv", request)
@@ -4,9 +4,9 @@ from schemas.user import UserCreate, UserOut
 from models.user import User
 from models.profile import Profile
 from models.audit import Audit
-from database import get_db
+from database import get_db, unit_of_work
 from auth.dependencies import get_current_admin
-import bcrypt
+from auth.password_service import password_service
 import re  # ✅ AJOUTÉ pour générer les slugs
 
 router = APIRouter(
@@ -29,38 +29,39 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     if existing_user:
         raise HTTPException(status_code=400, detail="Email déjà utilisé ❌")
 
-    hashed_pw = bcrypt.hashpw(user.password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    hashed_pw = password_service.hash_sync(user.password)
 
-    # Création de l'utilisateur avec slug généré automatiquement
-    new_user = User(
-        email=user.email,
-        password=hashed_pw,
-        role=user.role or "researcher",
-        status=user.status or "pending",
-        slug=generate_slug(user.email)  # ✅ SLUG GÉNÉRÉ AUTOMATIQUEMENT
-    )
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    # Une seule transaction : utilisateur, profil et audit
+    with unit_of_work(db):
+        # Création de l'utilisateur avec slug généré automatiquement
+        new_user = User(
+            email=user.email,
+            password=hashed_pw,
+            role=user.role or "researcher",
+            status=user.status or "pending",
+            slug=generate_slug(user.email)  # ✅ SLUG GÉNÉRÉ AUTOMATIQUEMENT
+        )
+        db.add(new_user)
+        db.flush()  # ID de l'utilisateur
 
-    # Création automatique du profil pour ce chercheur
-    new_profile = Profile(
-        user_id=new_user.id,
-        email=user.email,
-        first_name=user.first_name if hasattr(user, 'first_name') else "",
-        last_name=user.last_name if hasattr(user, 'last_name') else ""
-    )
-    db.add(new_profile)
-    db.commit()
+        # Création automatique du profil pour ce chercheur
+        new_profile = Profile(
+            user_id=new_user.id,
+            email=user.email,
+            first_name=user.first_name if hasattr(user, 'first_name') else "",
+            last_name=user.last_name if hasattr(user, 'last_name') else "",
+            grade="Non spécifié"
+        )
+        db.add(new_profile)
 
-    audit_log = Audit(
-        user_id=new_user.id,
-        user_role=new_user.role,
-        action_description=f"Nouvel utilisateur créé: {new_user.email}"
-    )
-    db.add(audit_log)
-    db.commit()
+        audit_log = Audit(
+            user_id=new_user.id,
+            user_role=new_user.role,
+            action_description=f"Nouvel utilisateur créé: {new_user.email}"
+        )
+        db.add(audit_log)
 
+    db.refresh(new_user)
     return new_user
 
 # ================== LISTER TOUS LES UTILISATEURS (ADMIN) ==================
@@ -74,20 +75,19 @@ def update_user(user_id: int, data: dict, db: Session = Depends(get_db), current
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="Utilisateur introuvable ❌")
-    for key, value in data.items():
-        if hasattr(user, key):
-            setattr(user, key, value)
-    db.commit()
-    db.refresh(user)
+    with unit_of_work(db):
+        for key, value in data.items():
+            if hasattr(user, key):
+                setattr(user, key, value)
 
-    audit_log = Audit(
-        user_id=current_user.id,
-        user_role=current_user.role,
-        action_description=f"Utilisateur {user.email} mis à jour par admin"
-    )
-    db.add(audit_log)
-    db.commit()
+        audit_log = Audit(
+            user_id=current_user.id,
+            user_role=current_user.role,
+            action_description=f"Utilisateur {user.email} mis à jour par admin"
+        )
+        db.add(audit_log)
 
+    db.refresh(user)
     return user
 
 # ================== SUPPRIMER UN UTILISATEUR (ADMIN) ==================
@@ -96,15 +96,13 @@ def delete_user(user_id: int, db: Session = Depends(get_db), current_user = Depe
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="Utilisateur introuvable ❌")
-    db.delete(user)
-    db.commit()
-
-    audit_log = Audit(
-        user_id=current_user.id,
-        user_role=current_user.role,
-        action_description=f"Utilisateur {user.email} supprimé par admin"
-    )
-    db.add(audit_log)
-    db.commit()
+    with unit_of_work(db):
+        audit_log = Audit(
+            user_id=current_user.id,
+            user_role=current_user.role,
+            action_description=f"Utilisateur {user.email} supprimé par admin"
+        )
+        db.add(audit_log)
+        db.delete(user)
 
-    return {"message": "Utilisateur supprimé ✅"}
\ No newline at end of file
+    return {"message": "Utilisateur supprimé ✅"}
@@ -1,5 +1,5 @@
 # schemas/audit.py
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 
 class AuditOut(BaseModel):
@@ -7,7 +7,18 @@ class AuditOut(BaseModel):
     user_id: int
     user_role: str
     action_description: str
-    created_at: datetime
+    action_code: str
+    details: dict | None = None
+    created_at: datetime = Field(validation_alias="date")
     
     # ✅ Syntaxe Pydantic v2
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+class AuditPage(BaseModel):
+    """Page d'audits paginée par curseur (next/prev opaques)"""
+    items: list[AuditOut]
+    next: str | None = None
+    prev: str | None = None
+    total: int | None = None
+    total_is_estimate: bool | None = None
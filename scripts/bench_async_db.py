@@ -0,0 +1,113 @@
+# scripts/bench_async_db.py
+"""
+Banc d'essai : lecture de l'annuaire via la Session synchrone (threadpool
+Starlette, 40 threads par défaut) et via l'AsyncSession.
+
+    python scripts/bench_async_db.py --requests 2000 --concurrency 200 --sleep-ms 20
+
+--sleep-ms ajoute un pg_sleep() à chaque lecture (PostgreSQL uniquement) pour
+simuler la latence réseau d'une base distante : c'est là que le plafond du
+threadpool se voit. Les deux moteurs ont le même pool (--pool-size).
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import anyio
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import DATABASE_URL, async_database_url  # noqa: E402
+from services.researcher_profile import public_researchers_stmt  # noqa: E402
+
+
+def report(label: str, latencies: list, elapsed: float):
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    print(f"{label:<8} {len(latencies) / elapsed:8.1f} req/s   "
+          f"médiane {statistics.median(latencies) * 1000:7.1f} ms   p95 {p95:7.1f} ms")
+
+
+async def bench_sync(args, sleep_sql):
+    engine = create_engine(args.url, pool_size=args.pool_size, max_overflow=0)
+    SessionLocal = sessionmaker(bind=engine)
+    limiter = anyio.CapacityLimiter(args.threads)
+    stmt = public_researchers_stmt(limit=20)
+
+    def read():
+        with SessionLocal() as db:
+            if sleep_sql is not None:
+                db.execute(sleep_sql)
+            db.execute(stmt).all()
+
+    async def one(latencies):
+        started = time.perf_counter()
+        await anyio.to_thread.run_sync(read, limiter=limiter)
+        latencies.append(time.perf_counter() - started)
+
+    elapsed, latencies = await run(args, one)
+    engine.dispose()
+    report("sync", latencies, elapsed)
+
+
+async def bench_async(args, sleep_sql):
+    engine = create_async_engine(async_database_url(args.url), pool_size=args.pool_size, max_overflow=0)
+    AsyncSessionLocal = async_sessionmaker(engine)
+    stmt = public_researchers_stmt(limit=20)
+
+    async def one(latencies):
+        started = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            if sleep_sql is not None:
+                await db.execute(sleep_sql)
+            (await db.execute(stmt)).all()
+        latencies.append(time.perf_counter() - started)
+
+    elapsed, latencies = await run(args, one)
+    await engine.dispose()
+    report("async", latencies, elapsed)
+
+
+async def run(args, one):
+    latencies = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def bounded():
+        async with semaphore:
+            await one(latencies)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(bounded() for _ in range(args.requests)))
+    return time.perf_counter() - started, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session synchrone (threadpool) vs AsyncSession")
+    parser.add_argument("--url", default=DATABASE_URL)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=40, help="taille du threadpool (Starlette : 40)")
+    parser.add_argument("--pool-size", type=int, default=100)
+    parser.add_argument("--sleep-ms", type=int, default=0, help="latence simulée (PostgreSQL)")
+    args = parser.parse_args()
+
+    sleep_sql = None
+    if args.sleep_ms:
+        if not args.url.startswith("postgresql"):
+            parser.error("--sleep-ms nécessite PostgreSQL (pg_sleep)")
+        sleep_sql = text(f"SELECT pg_sleep({args.sleep_ms / 1000})")
+
+    print(f"{args.requests} lectures, {args.concurrency} en parallèle, "
+          f"{args.threads} threads, pool {args.pool_size}, latence {args.sleep_ms} ms")
+    asyncio.run(bench_sync(args, sleep_sql))
+    asyncio.run(bench_async(args, sleep_sql))
+
+
+if __name__ == "__main__":
+    main()
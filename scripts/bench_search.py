@@ -0,0 +1,125 @@
+# scripts/bench_search.py
+"""
+Banc d'essai de /search : ancienne recherche (trois ILIKE '%q%' sur les
+titres, balayage complet des tables) contre l'index plein texte
+(services/search.py : tsvector/GIN sur PostgreSQL, index mémoire sinon).
+
+    python scripts/bench_search.py --seed 20000 --queries 500
+    python scripts/bench_search.py --url postgresql+psycopg2://... --terms "robotique,données"
+
+--seed N insère N projets, publications et cours synthétiques dans une base
+SQLite temporaire (sauf si --url est donné : la base existante est lue telle
+quelle). Les deux moteurs reçoivent les mêmes requêtes, en série.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Base  # noqa: E402
+from models.cours import Cours  # noqa: E402
+from models.profile import Profile  # noqa: E402
+from models.project import Project  # noqa: E402
+from models.publication import Publication  # noqa: E402
+from models.user import User  # noqa: E402
+from services.search import ensure_search_schema, search, search_backend, search_index  # noqa: E402
+
+WORDS = ("robotique", "marine", "apprentissage", "données", "réseaux", "capteurs", "énergie",
+         "climat", "algèbre", "optimisation", "imagerie", "médicale", "sécurité", "logiciel")
+VOCABULARY = 20000  # mots synthétiques, fréquences en loi de Zipf comme un vrai corpus
+DEFAULT_TERMS = "robotique,données marines,apprentissage,sécurité logiciel,imagerie médicale,climatologie"
+
+
+def ilike_search(db, q: str) -> int:
+    """Recherche d'origine de GET /search (titres seulement, 10 résultats par type)"""
+    found = db.scalars(select(Project.id).where(Project.title.ilike(f"%{q}%")).limit(10)).all()
+    found += db.scalars(select(Publication.id).where(
+        Publication.title.ilike(f"%{q}%") | Publication.journal.ilike(f"%{q}%")
+    ).limit(10)).all()
+    found += db.scalars(select(Cours.id).where(Cours.title.ilike(f"%{q}%")).limit(10)).all()
+    return len(found)
+
+
+def seed(db, n: int):
+    rng = random.Random(42)
+    vocabulary = [
+        "".join(rng.choice("abcdefghijlmnoprstuvé") for _ in range(rng.randint(4, 10)))
+        for _ in range(VOCABULARY)
+    ]
+    # Mots du domaine : fréquence moyenne (ni mots vides, ni hapax)
+    for i, word in enumerate(WORDS):
+        vocabulary.insert(200 + i * 150, word)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+
+    def phrase(k):
+        return " ".join(rng.choices(vocabulary, weights, k=k)).capitalize()
+
+    user = User(email="bench@search.local", password="x", role="researcher", status="active", slug="bench")
+    db.add(user)
+    db.flush()
+    profile = Profile(user_id=user.id, first_name="Banc", last_name="Essai", grade="MCF")
+    db.add(profile)
+    db.flush()
+    for _ in range(n):
+        db.add(Project(profile_id=profile.id, year=2024, title=phrase(4), description=phrase(40), coauthor=[]))
+        db.add(Publication(profile_id=profile.id, year=2024, title=phrase(6), journal=phrase(2), coauthor=[]))
+        db.add(Cours(profile_id=profile.id, title=phrase(3), description=phrase(20)))
+    db.commit()
+
+
+def timed(label: str, run, terms: list, n: int) -> float:
+    latencies = []
+    for i in range(n):
+        started = time.perf_counter()
+        run(terms[i % len(terms)])
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+    median = statistics.median(latencies) * 1000
+    print(f"{label:<10} médiane {median:7.2f} ms   p95 {p95:7.2f} ms")
+    return median
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recherche ILIKE vs index plein texte")
+    parser.add_argument("--url", default=None, help="base existante (défaut : SQLite temporaire)")
+    parser.add_argument("--seed", type=int, default=5000, help="lignes synthétiques par table")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--per-page", type=int, default=10)
+    parser.add_argument("--terms", default=DEFAULT_TERMS, help="requêtes séparées par des virgules")
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_search.db')}"
+    engine = create_engine(url)
+    SessionLocal = sessionmaker(bind=engine)
+    if args.url is None:
+        Base.metadata.create_all(bind=engine)
+        with SessionLocal() as db:
+            seed(db, args.seed)
+    with engine.begin() as conn:
+        ensure_search_schema(conn)
+
+    terms = [t.strip() for t in args.terms.split(",") if t.strip()]
+    with SessionLocal() as db:
+        backend = search_backend(db)
+        started = time.perf_counter()
+        search(db, terms[0], per_page=args.per_page)
+        print(f"{url.split('@')[-1]} — moteur {backend}, première recherche "
+              f"{(time.perf_counter() - started) * 1000:.0f} ms {search_index.stats() if backend == 'memory' else ''}")
+
+        ilike = timed("ilike", lambda q: ilike_search(db, q), terms, args.queries)
+        indexed = timed(backend, lambda q: search(db, q, per_page=args.per_page), terms, args.queries)
+    print(f"gain ×{ilike / indexed:.1f}" if indexed else "")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
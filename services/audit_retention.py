@@ -0,0 +1,233 @@
+# services/audit_retention.py
+"""
+Partitionnement, rétention et archivage des audits.
+
+Sur PostgreSQL, `audits` est partitionnée par mois sur `date`
+(audits_AAAA_MM, plus audits_default pour les lignes hors plage).
+ensure_partitions() crée les partitions du mois courant et des
+AUDIT_PARTITIONS_AHEAD mois suivants ; les lignes déjà tombées dans
+audits_default sont déplacées dans la nouvelle partition. Sur SQLite la
+table reste unique et les mêmes opérations travaillent par plage de dates.
+
+Rétention (AUDIT_RETENTION_MONTHS, 12 par défaut) : chaque mois échu est
+exporté en NDJSON gzip dans AUDIT_ARCHIVE_DIR, puis sa partition est
+supprimée (DELETE sur la plage en SQLite). Les cumuls des graphiques
+(audit_rollups) ne sont pas touchés.
+
+Les archives se relisent en flux via GET /admin/audit/archives/{mois} ou
+`python -m services.audit_retention show 2025-01`.
+"""
+import gzip
+import json
+import os
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, select, text
+from sqlalchemy.orm import Session
+
+from models.audit import Audit
+from services.rollups import bucket_expr, bucket_start
+
+RETENTION_MONTHS = int(os.getenv("AUDIT_RETENTION_MONTHS", 12))
+PARTITIONS_AHEAD = int(os.getenv("AUDIT_PARTITIONS_AHEAD", 3))
+ARCHIVE_DIR = os.getenv("AUDIT_ARCHIVE_DIR", "archives/audits")
+EXPORT_BATCH_SIZE = 1000
+DEFAULT_PARTITION = "audits_default"
+
+
+# ===================== MOIS =====================
+def month_start(value: datetime) -> datetime:
+    return bucket_start(value, "month")
+
+
+def add_months(month: datetime, n: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + n
+    return month.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+
+def parse_month(value: str) -> datetime:
+    """'AAAA-MM' -> 1er du mois ; ValueError si le format est invalide"""
+    return datetime.strptime(value, "%Y-%m")
+
+
+def partition_name(month: datetime) -> str:
+    return f"audits_{month:%Y_%m}"
+
+
+# ===================== PARTITIONS (POSTGRESQL) =====================
+def is_partitioned(conn) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+        "WHERE c.relname = 'audits' AND pg_table_is_visible(c.oid)"
+    )).first() is not None
+
+
+def list_partitions(conn) -> list:
+    """Mois couverts par une partition (hors audits_default)"""
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'audits' AND pg_table_is_visible(p.oid)"
+    )).scalars().all()
+    return sorted(datetime.strptime(name, "audits_%Y_%m") for name in names if name != DEFAULT_PARTITION)
+
+
+def create_partition(conn, month: datetime):
+    """Crée la partition du mois en y déplaçant les lignes tombées dans audits_default"""
+    name = partition_name(month)
+    bounds = {"start": month, "end": add_months(month, 1)}
+    conn.execute(text(f"CREATE TABLE {name} (LIKE audits INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    conn.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE date >= :start AND date < :end RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), bounds)
+    conn.execute(text(
+        f"ALTER TABLE audits ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{bounds['start']:%Y-%m-%d}') TO ('{bounds['end']:%Y-%m-%d}')"
+    ))
+
+
+def ensure_partitions(conn, now: datetime | None = None, ahead: int = PARTITIONS_AHEAD) -> list:
+    """Crée les partitions manquantes du mois courant à +ahead ; no-op hors PostgreSQL partitionné"""
+    if not is_partitioned(conn):
+        return []
+    current = month_start(now or datetime.now(timezone.utc))
+    existing = set(list_partitions(conn))
+    created = []
+    for n in range(ahead + 1):
+        month = add_months(current, n)
+        if month not in existing:
+            create_partition(conn, month)
+            created.append(partition_name(month))
+    return created
+
+
+# ===================== RÉTENTION =====================
+def stored_months(db: Session) -> list:
+    """Mois présents en base (partitions sur PostgreSQL, dates distinctes ailleurs)"""
+    conn = db.connection()
+    if is_partitioned(conn):
+        return list_partitions(conn)
+    month = bucket_expr(Audit.date, "month", db.get_bind().dialect.name)
+    values = db.execute(select(month).where(Audit.date.is_not(None)).group_by(month)).scalars().all()
+    return sorted(v if isinstance(v, datetime) else datetime.fromisoformat(v) for v in values)
+
+
+def archive_path(month: datetime) -> str:
+    return os.path.join(ARCHIVE_DIR, f"audits_{month:%Y_%m}.ndjson.gz")
+
+
+def _serialize(audit: Audit) -> dict:
+    return {
+        "id": audit.id,
+        "user_id": audit.user_id,
+        "user_role": audit.user_role,
+        "action_description": audit.action_description,
+        "action_code": audit.action_code.value,
+        "details": audit.details,
+        "date": audit.date.isoformat() if audit.date else None,
+    }
+
+
+def export_month(db: Session, month: datetime) -> int:
+    """Écrit le mois en NDJSON gzip (fichier temporaire puis renommage) ; retourne le nombre de lignes"""
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    path = archive_path(month)
+    tmp_path = path + ".tmp"
+    stmt = (
+        select(Audit)
+        .where(Audit.date >= month, Audit.date < add_months(month, 1))
+        .order_by(Audit.date, Audit.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    rows = 0
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        for audit in db.execute(stmt).scalars():
+            f.write(json.dumps(_serialize(audit), ensure_ascii=False) + "\n")
+            rows += 1
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return rows
+
+
+def drop_month(db: Session, month: datetime):
+    conn = db.connection()
+    if is_partitioned(conn):
+        name = partition_name(month)
+        conn.execute(text(f"ALTER TABLE audits DETACH PARTITION {name}"))
+        conn.execute(text(f"DROP TABLE {name}"))
+    else:
+        db.execute(delete(Audit).where(Audit.date >= month, Audit.date < add_months(month, 1)))
+
+
+def apply_retention(db: Session, now: datetime | None = None, retention_months: int = RETENTION_MONTHS) -> list:
+    """Archive puis supprime les mois antérieurs à la fenêtre de rétention"""
+    cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -retention_months)
+    archived = []
+    for month in stored_months(db):
+        if month >= cutoff:
+            continue
+        rows = export_month(db, month)
+        drop_month(db, month)
+        db.commit()  # un mois à la fois : une reprise après erreur repart du mois suivant
+        archived.append({"month": f"{month:%Y-%m}", "rows": rows, "path": archive_path(month)})
+        print(f"📦 Audits {month:%Y-%m} archivés ({rows} lignes)")
+    db.rollback()
+    return archived
+
+
+# ===================== ARCHIVES =====================
+def list_archives() -> list:
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    archives = []
+    for name in sorted(os.listdir(ARCHIVE_DIR)):
+        if name.startswith("audits_") and name.endswith(".ndjson.gz"):
+            month = datetime.strptime(name, "audits_%Y_%m.ndjson.gz")
+            archives.append({
+                "month": f"{month:%Y-%m}",
+                "size": os.path.getsize(os.path.join(ARCHIVE_DIR, name)),
+            })
+    return archives
+
+
+def iter_archive(month: datetime, user_id: int | None = None):
+    """Relit une archive ligne à ligne (FileNotFoundError si absente)"""
+    with gzip.open(archive_path(month), "rt", encoding="utf-8") as f:
+        for line in f:
+            if user_id is not None and json.loads(line)["user_id"] != user_id:
+                continue
+            yield line
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintenance des audits (partitions, rétention, archives)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("maintain", help="crée les partitions à venir puis applique la rétention")
+    commands.add_parser("list", help="liste les archives")
+    show = commands.add_parser("show", help="affiche un mois archivé (NDJSON)")
+    show.add_argument("month", type=parse_month, help="AAAA-MM")
+    show.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == "show":
+        sys.stdout.writelines(iter_archive(args.month, args.user_id))
+    elif args.command == "list":
+        for archive in list_archives():
+            print(f"{archive['month']}  {archive['size']} octets")
+    else:
+        db = SessionLocal()
+        try:
+            created = ensure_partitions(db.connection())
+            db.commit()
+            print(f"✅ Partitions créées : {created or 'aucune'}")
+            print(f"✅ Mois archivés : {apply_retention(db)}")
+        finally:
+            db.close()
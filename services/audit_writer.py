@@ -0,0 +1,247 @@
+# services/audit_writer.py
+"""
+Écriture des journaux d'audit.
+
+Deux chemins :
+- enqueue() : événements courants (consultations, connexions réussies,
+  exports...) mis en file en mémoire et insérés par lots (executemany) par
+  un thread dédié, toutes les AUDIT_FLUSH_INTERVAL_MS ou dès
+  AUDIT_BATCH_SIZE événements ;
+- write_now() : événements de sécurité (accès refusé, échec de login...)
+  écrits immédiatement dans la transaction de la requête.
+
+Quand la file est pleine (AUDIT_MAX_QUEUE), l'appelant attend brièvement
+puis vide lui-même la file : on ralentit les producteurs plutôt que de
+perdre des événements. La file est vidée à l'arrêt de l'application.
+
+Un lot refusé par la base est réécrit ligne par ligne : une ligne invalide
+(contrainte violée, details non sérialisable...) n'empêche pas les autres
+d'être écrites. Elle est retentée au lot suivant, puis mise de côté
+(dead_letters) après AUDIT_MAX_ATTEMPTS échecs. Les lignes remises en file
+ne dépassent jamais AUDIT_MAX_QUEUE.
+"""
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from models.audit import Audit, AuditAction, classify_action
+from services.rollups import record_audits
+
+
+class AuditWriter:
+    def __init__(self, flush_interval_ms: int = 500, batch_size: int = 100,
+                 max_queue: int = 10000, put_timeout: float = 0.2, buffered: bool = True,
+                 max_attempts: int = 3):
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+        self.max_queue = max_queue
+        self.put_timeout = put_timeout
+        self.buffered = buffered
+        self.max_attempts = max_attempts
+
+        self._queue = deque()         # (engine, ligne, tentatives échouées)
+        self.dead_letters = deque(maxlen=1000)  # (ligne, erreur) abandonnées
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopping = False
+
+        self.enqueued = 0
+        self.written = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.retried = 0
+        self.dropped = 0
+        self.backpressure_waits = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    # ===================== ÉCRITURE =====================
+    def enqueue(self, db: Session, user_id: int, user_role: str, description: str,
+                action_code: AuditAction | None = None, details: dict | None = None):
+        """Événement non critique : inséré au prochain lot"""
+        row = {
+            "user_id": user_id,
+            "user_role": user_role,
+            "action_description": description,
+            "action_code": action_code or classify_action(description),
+            "details": details,
+            "date": datetime.now(timezone.utc),
+        }
+        if not self.buffered:
+            db.add(Audit(**row))
+            db.commit()
+            return
+
+        self._ensure_started()
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self.backpressure_waits += 1
+                self._cond.notify_all()
+                self._cond.wait_for(lambda: len(self._queue) < self.max_queue, timeout=self.put_timeout)
+            full = len(self._queue) >= self.max_queue
+            if not full:
+                self._queue.append((db.get_bind(), row, 0))
+                self.enqueued += 1
+                if len(self._queue) >= self.batch_size:
+                    self._cond.notify_all()
+
+        if full:
+            # Le thread ne suit pas : l'appelant vide la file lui-même
+            self.flush()
+            with self._cond:
+                self._queue.append((db.get_bind(), row, 0))
+                self.enqueued += 1
+
+    def write_now(self, db: Session, user_id: int, user_role: str, description: str,
+                  action_code: AuditAction | None = None, details: dict | None = None):
+        """Événement de sécurité : écrit et commité immédiatement"""
+        db.add(Audit(
+            user_id=user_id,
+            user_role=user_role,
+            action_description=description,
+            action_code=action_code or classify_action(description),
+            details=details,
+            date=datetime.now(timezone.utc),
+        ))
+        db.commit()
+
+    # ===================== VIDAGE =====================
+    def flush(self) -> int:
+        """Insère tous les événements en attente ; retourne le nombre écrit"""
+        with self._flush_lock:
+            with self._cond:
+                pending = list(self._queue)
+                self._queue.clear()
+                self._cond.notify_all()
+            if not pending:
+                return 0
+
+            by_engine = {}
+            for engine, row, attempts in pending:
+                by_engine.setdefault(engine, []).append((row, attempts))
+
+            started = time.perf_counter()
+            written = 0
+            for engine, entries in by_engine.items():
+                try:
+                    self._insert(engine, [row for row, _ in entries])  # executemany
+                    written += len(entries)
+                except Exception as e:
+                    self.flush_errors += 1
+                    print(f"⚠️  Lot d'audits refusé ({len(entries)} lignes), écriture ligne par ligne : {e}")
+                    written += self._write_one_by_one(engine, entries)
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.written += written
+            self.last_flush_ms = round(elapsed_ms, 2)
+            self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+            self.total_flush_ms += elapsed_ms
+            return written
+
+    @staticmethod
+    def _insert(engine, rows: list):
+        with engine.begin() as conn:
+            conn.execute(insert(Audit.__table__), rows)
+            record_audits(conn, rows)  # cumuls dans la même transaction
+
+    def _write_one_by_one(self, engine, entries: list) -> int:
+        """Isole les lignes invalides ; les autres sont écrites"""
+        written = 0
+        failed = []
+        for row, attempts in entries:
+            try:
+                self._insert(engine, [row])
+                written += 1
+            except Exception as e:
+                failed.append((row, attempts + 1, e))
+
+        retry = []
+        for row, attempts, error in failed:
+            if attempts < self.max_attempts:
+                retry.append((engine, row, attempts))
+            else:
+                self._drop(row, error)
+        with self._cond:
+            room = max(0, self.max_queue - len(self._queue))
+            for engine, row, attempts in retry[room:]:
+                self._drop(row, "file d'attente pleine")
+            self._queue.extendleft(reversed(retry[:room]))
+            self.retried += min(room, len(retry))
+        return written
+
+    def _drop(self, row: dict, error):
+        self.dropped += 1
+        self.dead_letters.append((row, str(error)[:200]))
+        print(f"⚠️  Audit abandonné (user {row.get('user_id')}, « {row.get('action_description')} ») : "
+              f"{str(error)[:200]}")
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._stopping or len(self._queue) >= self.batch_size,
+                    timeout=self.flush_interval,
+                )
+                stopping = self._stopping
+            self.flush()
+            if stopping:
+                return
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Vide la file et arrête le thread (arrêt de l'application)"""
+        thread = self._thread
+        if thread is not None:
+            with self._cond:
+                self._stopping = True
+                self._cond.notify_all()
+            thread.join(timeout=10)
+            self._thread = None
+        self.flush()
+
+    # ===================== MÉTRIQUES =====================
+    def stats(self) -> dict:
+        with self._cond:
+            depth = len(self._queue)
+        return {
+            "buffered": self.buffered,
+            "queue_depth": depth,
+            "max_queue": self.max_queue,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": int(self.flush_interval * 1000),
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "backpressure_waits": self.backpressure_waits,
+            "last_flush_ms": self.last_flush_ms,
+            "max_flush_ms": round(self.max_flush_ms, 2),
+            "avg_flush_ms": round(self.total_flush_ms / self.flushes, 2) if self.flushes else 0.0,
+        }
+
+
+audit_writer = AuditWriter(
+    flush_interval_ms=int(os.getenv("AUDIT_FLUSH_INTERVAL_MS", 500)),
+    batch_size=int(os.getenv("AUDIT_BATCH_SIZE", 100)),
+    max_queue=int(os.getenv("AUDIT_MAX_QUEUE", 10000)),
+    buffered=os.getenv("AUDIT_BUFFERED", "1") == "1",
+    max_attempts=int(os.getenv("AUDIT_MAX_ATTEMPTS", 3)),
+)
@@ -0,0 +1,78 @@
+# services/csv_export.py
+"""
+Exports CSV en flux.
+
+Les exports ne construisent plus tout le fichier en mémoire :
+- stream_rows() lit la requête par lots (yield_per : curseur côté serveur
+  sur PostgreSQL) ; les relations à afficher sont chargées par la requête
+  elle-même (joinedload / selectinload), jamais ligne par ligne ;
+- csv_chunks() encode le CSV par blocs de CHUNK_ROWS lignes ;
+- gzip_chunks() compresse le flux à la volée quand le client accepte
+  `Content-Encoding: gzip`.
+
+La mémoire utilisée est bornée par la taille d'un lot, quel que soit le
+nombre de lignes, et le premier octet part dès le premier lot lu.
+"""
+import csv
+import io
+import zlib
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+BATCH_SIZE = 1000
+CHUNK_ROWS = 500
+
+
+def stream_rows(db: Session, stmt, batch_size: int = BATCH_SIZE):
+    """Itère sur les objets de `stmt` lot par lot"""
+    result = db.execute(stmt.execution_options(yield_per=batch_size))
+    for row in result.scalars():
+        yield row
+
+
+def csv_chunks(header: list, rows, chunk_rows: int = CHUNK_ROWS):
+    """Encode `rows` (itérable de listes) en CSV, bloc par bloc"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % chunk_rows == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)  # 31 : en-tête gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def accepts_gzip(request: Request | None) -> bool:
+    return request is not None and "gzip" in request.headers.get("accept-encoding", "").lower()
+
+
+def csv_bytes(header: list, rows, gzip: bool = False) -> bytes:
+    """Fichier CSV complet (rapports courts mis en cache, services/report_cache.py)"""
+    chunks = csv_chunks(header, rows)
+    return b"".join(gzip_chunks(chunks) if gzip else chunks)
+
+
+def csv_response(header: list, rows, filename: str, request: Request | None = None) -> StreamingResponse:
+    """StreamingResponse CSV, compressée en gzip si le client l'accepte"""
+    chunks = csv_chunks(header, rows)
+    headers = {"Content-Disposition": f"attachment; filename={filename}", "Vary": "Accept-Encoding"}
+    if accepts_gzip(request):
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type="text/csv; charset=utf-8", headers=headers)
@@ -0,0 +1,220 @@
+# services/db_pool.py
+"""
+Pool de connexions : réglages par environnement et métriques.
+
+Réglages (variables d'environnement, défauts selon le déploiement) :
+DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT (s), DB_POOL_RECYCLE (s),
+DB_POOL_PRE_PING (1/0) et DB_POOL_WARMUP (connexions ouvertes au démarrage).
+
+Métriques : les événements du pool (checkout, checkin, connect, invalidate)
+alimentent un PoolMetrics par moteur ; le temps d'attente d'une connexion
+et les dépassements de DB_POOL_TIMEOUT sont mesurés par TimedQueuePool,
+sous-classe de QueuePool. Lecture : GET /admin/db-pool/stats.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event, exc, text
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Défauts par déploiement (ENV ou URL Render)
+POOL_DEFAULTS = {
+    "local":  {"pool_size": 5,  "max_overflow": 10, "pool_timeout": 30, "pool_recycle": 1800, "pool_pre_ping": False},
+    "docker": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 30, "pool_recycle": 1800, "pool_pre_ping": True},
+    # Offre Render : peu de connexions autorisées, coupures réseau fréquentes
+    "render": {"pool_size": 5,  "max_overflow": 5,  "pool_timeout": 10, "pool_recycle": 300,  "pool_pre_ping": True},
+}
+POOL_ENV_VARS = {
+    "pool_size": ("DB_POOL_SIZE", int),
+    "max_overflow": ("DB_MAX_OVERFLOW", int),
+    "pool_timeout": ("DB_POOL_TIMEOUT", float),
+    "pool_recycle": ("DB_POOL_RECYCLE", int),
+    "pool_pre_ping": ("DB_POOL_PRE_PING", lambda value: value == "1"),
+}
+WARMUP_CONNECTIONS = int(os.getenv("DB_POOL_WARMUP", 2))
+
+
+def deployment(env: str, url: str) -> str:
+    if "onrender.com" in url or env == "render":
+        return "render"
+    return env if env in POOL_DEFAULTS else "local"
+
+
+def pool_settings(env: str, url: str) -> dict:
+    """Défauts du déploiement, surchargés par les variables DB_POOL_*"""
+    settings = dict(POOL_DEFAULTS[deployment(env, url)])
+    for key, (var, cast) in POOL_ENV_VARS.items():
+        value = os.getenv(var)
+        if value not in (None, ""):
+            settings[key] = cast(value)
+    return settings
+
+
+def uses_queue_pool(url: str) -> bool:
+    # SQLite en mémoire : une connexion unique (StaticPool / SingletonThreadPool)
+    return not (url.startswith("sqlite") and (":memory:" in url or "mode=memory" in url))
+
+
+# ===================== MÉTRIQUES =====================
+class PoolMetrics:
+    def __init__(self, name: str, slow_wait_ms: float = 100.0):
+        self.name = name
+        self.slow_wait_ms = slow_wait_ms
+        self.engine = None
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=1000)  # derniers temps d'attente (ms)
+
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.overflow_checkouts = 0
+        self.timeouts = 0
+        self.slow_waits = 0
+        self.max_wait_ms = 0.0
+
+    @property
+    def pool(self):
+        return self.engine.pool if self.engine is not None else None
+
+    def attach(self, engine):
+        self.engine = getattr(engine, "sync_engine", engine)
+        pool = self.engine.pool
+        if isinstance(pool, TIMED_POOLS):
+            METRICS_BY_POOL[pool._orig_logging_name] = self
+        event.listen(pool, "connect", self._on_connect)
+        event.listen(pool, "checkout", self._on_checkout)
+        event.listen(pool, "checkin", self._on_checkin)
+        event.listen(pool, "invalidate", self._on_invalidate)
+        return self
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+        overflow = getattr(self.pool, "overflow", None)
+        if overflow is not None and overflow() > 0:
+            self.overflow_checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.checkins += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidations += 1
+
+    def record_wait(self, wait_ms: float, timed_out: bool = False):
+        with self._lock:
+            self._waits.append(wait_ms)
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            if wait_ms >= self.slow_wait_ms:
+                self.slow_waits += 1
+            if timed_out:
+                self.timeouts += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+        pool = self.pool
+        state = {}
+        if isinstance(pool, QueuePool):
+            state = {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+                "timeout": pool.timeout(),
+            }
+        return {
+            "name": self.name,
+            "pool": type(pool).__name__ if pool is not None else None,
+            **state,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+            "overflow_checkouts": self.overflow_checkouts,
+            "timeouts": self.timeouts,
+            "slow_waits": self.slow_waits,
+            "avg_wait_ms": round(sum(waits) / len(waits), 2) if waits else 0.0,
+            "p95_wait_ms": round(waits[int(len(waits) * 0.95) - 1], 2) if len(waits) >= 20 else None,
+            "max_wait_ms": round(self.max_wait_ms, 2),
+        }
+
+
+# Pools chronométrés, retrouvés par leur nom de journalisation (conservé par recreate())
+METRICS_BY_POOL = {}
+
+
+class _TimedPoolMixin:
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            metrics = METRICS_BY_POOL.get(self._orig_logging_name)
+            if metrics is not None:
+                metrics.record_wait((time.perf_counter() - started) * 1000, timed_out)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+TIMED_POOLS = (TimedQueuePool, TimedAsyncQueuePool)
+
+
+def engine_options(env: str, url: str, name: str, is_async: bool = False) -> dict:
+    """Arguments de create_engine / create_async_engine pour le pool"""
+    if not uses_queue_pool(url):
+        return {}
+    return {
+        **pool_settings(env, url),
+        "poolclass": TimedAsyncQueuePool if is_async else TimedQueuePool,
+        "pool_logging_name": name,
+    }
+
+
+# ===================== PRÉCHAUFFAGE =====================
+def warm_pool(engine, connections: int = WARMUP_CONNECTIONS) -> int:
+    """Ouvre `connections` connexions à la fois (bornées par pool_size) puis les rend au pool"""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool) or connections <= 0:
+        return 0
+    opened = []
+    try:
+        for _ in range(min(connections, pool.size())):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
+
+async def warm_async_pool(engine, connections: int = WARMUP_CONNECTIONS) -> int:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool) or connections <= 0:
+        return 0
+    opened = []
+    try:
+        for _ in range(min(connections, pool.size())):
+            conn = await engine.connect()
+            opened.append(conn)
+            await conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            await conn.close()
+    return len(opened)
@@ -0,0 +1,180 @@
+# services/db_routing.py
+"""
+Routage des lectures vers un réplica (DATABASE_URL_REPLICA).
+
+- RoutingSession : les SELECT vont au réplica quand la requête HTTP en
+  cours l'autorise ; tout le reste (écritures, flush, SQL brut) et toute
+  lecture qui suit une écriture dans la même session vont au primaire.
+- replica_routing (middleware) : autorise le réplica pour les GET/HEAD des
+  routes publiques en lecture (REPLICA_READ_PATHS). Après une écriture
+  (POST/PUT/PATCH/DELETE réussi), le cookie `db_primary_until` épingle les
+  lectures du client sur le primaire pendant REPLICA_PIN_SECONDS : il relit
+  ses propres écritures même si le réplica est en retard.
+- ReplicaHealth : un thread vérifie le réplica (SELECT 1) toutes les
+  REPLICA_HEALTH_INTERVAL secondes ; une erreur de connexion sur le réplica
+  le marque indisponible immédiatement. Indisponible -> tout va au primaire.
+
+Sans DATABASE_URL_REPLICA, rien ne change : une seule base.
+"""
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from fastapi import Request
+from sqlalchemy import event, exc, text
+from sqlalchemy.orm import Session
+
+REPLICA_READ_PATHS = tuple(
+    p.strip() for p in os.getenv(
+        "REPLICA_READ_PATHS", "/researcher/public/,/researchers,/publications,/portfolio,/search"
+    ).split(",") if p.strip()
+)
+# Routes d'écriture sous un préfixe public en lecture
+REPLICA_EXCLUDED_PATHS = ("/portfolio/comment",)
+PIN_COOKIE = "db_primary_until"
+PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 10))
+SAFE_METHODS = ("GET", "HEAD")
+
+# Vrai pendant une requête dont les lectures peuvent aller au réplica
+replica_reads: ContextVar[bool] = ContextVar("replica_reads", default=False)
+
+
+# ===================== SANTÉ DU RÉPLICA =====================
+class ReplicaHealth:
+    def __init__(self, interval: float = 5.0):
+        self.interval = interval
+        self.up = True
+        self.last_error = None
+        self.down_since = None
+        self.replica_reads = 0
+        self.fallback_reads = 0
+        self.checks = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    def mark_down(self, error):
+        if self.up:
+            print(f"⚠️  Réplica indisponible, lectures sur le primaire : {error}")
+            self.down_since = time.time()
+        self.up = False
+        self.last_error = str(error)[:200]
+
+    def mark_up(self):
+        if not self.up:
+            print("✅ Réplica de nouveau disponible")
+        self.up = True
+        self.down_since = None
+
+    def check(self, engine) -> bool:
+        self.checks += 1
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            self.mark_up()
+        except Exception as e:
+            self.mark_down(e)
+        return self.up
+
+    def watch(self, engine):
+        """Coupe le réplica dès qu'une erreur de connexion y survient"""
+        @event.listens_for(engine, "handle_error")
+        def _on_error(context):
+            if context.is_disconnect or isinstance(context.sqlalchemy_exception, exc.OperationalError):
+                self.mark_down(context.original_exception)
+
+    def start(self, engine):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(self.interval):
+                self.check(engine)
+
+        self._thread = threading.Thread(target=run, name="replica-health", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def stats(self) -> dict:
+        return {
+            "up": self.up,
+            "down_since": self.down_since,
+            "last_error": self.last_error,
+            "checks": self.checks,
+            "replica_reads": self.replica_reads,
+            "fallback_reads": self.fallback_reads,
+        }
+
+
+replica_health = ReplicaHealth(interval=float(os.getenv("REPLICA_HEALTH_INTERVAL", 5)))
+
+
+# ===================== SESSION =====================
+class RoutingSession(Session):
+    """
+    Session à deux moteurs : info["primary"] et info["replica"] (Engine
+    synchrones ; pour une AsyncSession, les sync_engine des moteurs async).
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        primary = self.info["primary"]
+        replica = self.info.get("replica")
+        if replica is None or not replica_reads.get():
+            return primary
+        if self._flushing or (clause is not None and not getattr(clause, "is_select", False)):
+            # Lire ses propres écritures : la suite de la session reste sur le primaire
+            self.info["wrote"] = True
+            return primary
+        if clause is None or self.info.get("wrote"):
+            # Sans requête (db.get_bind().dialect, db.connection()...) : primaire, sans épingler
+            return primary
+        if not replica_health.up:
+            replica_health.fallback_reads += 1
+            return primary
+        replica_health.replica_reads += 1
+        return replica
+
+
+def routing_info(primary, replica) -> dict:
+    return {"primary": primary, "replica": replica}
+
+
+# ===================== MIDDLEWARE =====================
+def is_replica_path(path: str) -> bool:
+    if path in REPLICA_EXCLUDED_PATHS:
+        return False
+    return any(path == p.rstrip("/") or path.startswith(p) for p in REPLICA_READ_PATHS)
+
+
+def is_pinned(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+async def replica_routing(request: Request, call_next):
+    """Middleware HTTP : lectures publiques sur le réplica, épinglage après écriture"""
+    if request.method not in SAFE_METHODS:
+        response = await call_next(request)
+        if response.status_code < 400:
+            response.set_cookie(
+                PIN_COOKIE, f"{time.time() + PIN_SECONDS:.0f}",
+                max_age=PIN_SECONDS, httponly=True, samesite="lax"
+            )
+        return response
+
+    if not is_replica_path(request.url.path) or is_pinned(request):
+        return await call_next(request)
+
+    token = replica_reads.set(True)
+    try:
+        return await call_next(request)
+    finally:
+        replica_reads.reset(token)
@@ -0,0 +1,319 @@
+# services/email_outbox.py
+"""
+Envoi des emails via une outbox persistante.
+
+Les routes n'appellent plus le fournisseur d'email : elles ajoutent une
+ligne dans email_outbox (enqueue_email) qui est commitée avec le reste de la
+transaction. Un worker asynchrone relève l'outbox par lots, envoie via un
+transport interchangeable et replanifie les échecs avec un backoff
+exponentiel jusqu'à max_attempts.
+
+Transports (EMAIL_TRANSPORT) : resend, brevo, console, fake (tests).
+Une ligne peut imposer son transport (colonne transport, PINNED_TRANSPORTS) :
+le lien d'activation envoyé par un admin part toujours par Brevo, avec son
+expéditeur historique.
+"""
+import asyncio
+import os
+import random
+import threading
+from datetime import datetime, timedelta
+
+import requests
+from sqlalchemy import event, or_, select
+from sqlalchemy.orm import Session
+
+from models.email_outbox import EmailOutbox
+
+BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", 20))
+POLL_INTERVAL = float(os.getenv("EMAIL_OUTBOX_POLL_INTERVAL", 5))
+MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", 5))
+RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", 30))
+RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", 3600))
+# Durée de réservation d'une ligne en cours d'envoi : si le worker meurt,
+# la ligne redevient éligible après ce délai.
+SENDING_LEASE_SECONDS = 300
+
+
+# ===================== TRANSPORTS =====================
+class EmailTransport:
+    """Interface : send() lève une exception en cas d'échec"""
+    name = "base"
+
+    def send(self, to_email: str, subject: str, html: str) -> None:
+        raise NotImplementedError
+
+
+class ResendTransport(EmailTransport):
+    name = "resend"
+
+    def __init__(self, api_key: str, sender: str):
+        self.api_key = api_key
+        self.sender = sender
+
+    def send(self, to_email, subject, html):
+        import resend
+        resend.api_key = self.api_key
+        resend.Emails.send({"from": self.sender, "to": [to_email], "subject": subject, "html": html})
+
+
+class BrevoTransport(EmailTransport):
+    name = "brevo"
+    URL = "https://api.brevo.com/v3/smtp/email"
+
+    def __init__(self, api_key: str, sender_email: str, sender_name: str = "InchTechs", timeout: float = 10):
+        self.api_key = api_key
+        self.sender_email = sender_email
+        self.sender_name = sender_name
+        self.timeout = timeout
+
+    def send(self, to_email, subject, html):
+        response = requests.post(
+            self.URL,
+            json={
+                "sender": {"name": self.sender_name, "email": self.sender_email},
+                "to": [{"email": to_email}],
+                "subject": subject,
+                "htmlContent": html,
+            },
+            headers={"accept": "application/json", "api-key": self.api_key, "content-type": "application/json"},
+            timeout=self.timeout,
+        )
+        if response.status_code != 201:
+            raise RuntimeError(f"Brevo {response.status_code}: {response.text[:200]}")
+
+
+class ConsoleTransport(EmailTransport):
+    """Développement local : affiche l'email au lieu de l'envoyer"""
+    name = "console"
+
+    def send(self, to_email, subject, html):
+        print(f"📧 [console] À: {to_email} | Sujet: {subject}")
+
+
+class FakeTransport(EmailTransport):
+    """Transport de test : garde les emails en mémoire, peut simuler des échecs"""
+    name = "fake"
+
+    def __init__(self, fail_times: int = 0):
+        self.sent = []
+        self.fail_times = fail_times
+        self.calls = 0
+
+    def send(self, to_email, subject, html):
+        self.calls += 1
+        if self.calls <= self.fail_times:
+            raise RuntimeError("Échec simulé")
+        self.sent.append({"to": to_email, "subject": subject, "html": html})
+
+
+BREVO_SENDER = "noreply@inchtechs.xyz"
+PINNED_TRANSPORTS = ("brevo",)
+
+
+def create_transport(kind: str | None = None) -> EmailTransport:
+    """Transport du worker (EMAIL_TRANSPORT...) ou, si `kind` est donné, transport imposé"""
+    pinned = kind is not None
+    kind = kind or os.getenv("EMAIL_TRANSPORT")
+    if kind is None:
+        if os.getenv("RESEND_API_KEY"):
+            kind = "resend"
+        elif os.getenv("BREVO_API_KEY"):
+            kind = "brevo"
+        else:
+            kind = "console"
+
+    if kind == "resend":
+        return ResendTransport(os.getenv("RESEND_API_KEY"), os.getenv("EMAIL_FROM", "Activation <onboarding@resend.dev>"))
+    if kind == "brevo":
+        # Imposé : EMAIL_FROM vise le transport par défaut (ex. adresse Resend)
+        sender = os.getenv("BREVO_SENDER_EMAIL") or (BREVO_SENDER if pinned else os.getenv("EMAIL_FROM", BREVO_SENDER))
+        return BrevoTransport(os.getenv("BREVO_API_KEY"), sender)
+    if kind == "fake":
+        return FakeTransport()
+    return ConsoleTransport()
+
+
+# ===================== OUTBOX =====================
+PENDING_KEY = "email_outbox_pending"
+
+
+def enqueue_email(db: Session, to_email: str, subject: str, html: str,
+                  transport: str | None = None) -> EmailOutbox:
+    """Ajoute un email à l'outbox ; il part quand la transaction est commitée"""
+    email = EmailOutbox(
+        to_email=to_email,
+        subject=subject,
+        html=html,
+        transport=transport,
+        status="pending",
+        attempts=0,
+        max_attempts=MAX_ATTEMPTS,
+        next_attempt_at=datetime.utcnow(),
+    )
+    db.add(email)
+    db.info[PENDING_KEY] = True
+    return email
+
+
+def retry_delay(attempts: int) -> float:
+    """Backoff exponentiel plafonné, avec un peu d'aléa pour étaler les reprises"""
+    delay = min(RETRY_BASE_SECONDS * (2 ** (attempts - 1)), RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _claim_batch(db: Session, now: datetime, batch_size: int) -> list:
+    """Réserve un lot d'emails à envoyer (SKIP LOCKED sur PostgreSQL)"""
+    stmt = (
+        select(EmailOutbox)
+        .where(
+            or_(EmailOutbox.status == "pending", EmailOutbox.status == "sending"),
+            EmailOutbox.next_attempt_at <= now,
+        )
+        .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+        .limit(batch_size)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        stmt = stmt.with_for_update(skip_locked=True)
+
+    batch = db.execute(stmt).scalars().all()
+    if not batch:
+        db.rollback()
+        return []
+
+    lease_until = now + timedelta(seconds=SENDING_LEASE_SECONDS)
+    for email in batch:
+        email.status = "sending"
+        email.next_attempt_at = lease_until
+    db.commit()
+
+    # Un seul SELECT pour recharger le lot expiré par le commit
+    ids = [email.id for email in batch]
+    return db.execute(
+        select(EmailOutbox).where(EmailOutbox.id.in_(ids)).order_by(EmailOutbox.id)
+    ).scalars().all()
+
+
+def process_outbox(db: Session, transport: EmailTransport, batch_size: int = BATCH_SIZE,
+                   now: datetime | None = None, transports: dict | None = None) -> dict:
+    """
+    Envoie un lot d'emails dus ; retourne les compteurs du lot. `transports`
+    (nom -> transport) sert les lignes au transport imposé ; sinon `transport`.
+    """
+    now = now or datetime.utcnow()
+    batch = _claim_batch(db, now, batch_size)
+    result = {"sent": 0, "retried": 0, "failed": 0}
+
+    for email in batch:
+        email.attempts += 1
+        try:
+            (transports or {}).get(email.transport, transport).send(email.to_email, email.subject, email.html)
+        except Exception as e:
+            email.last_error = str(e)[:500]
+            if email.attempts >= email.max_attempts:
+                email.status = "failed"
+                result["failed"] += 1
+                print(f"❌ Email {email.id} abandonné après {email.attempts} tentatives : {e}")
+            else:
+                email.status = "pending"
+                email.next_attempt_at = now + timedelta(seconds=retry_delay(email.attempts))
+                result["retried"] += 1
+        else:
+            email.status = "sent"
+            email.sent_at = datetime.utcnow()
+            email.last_error = None
+            result["sent"] += 1
+
+    if batch:
+        db.commit()
+    return result
+
+
+# ===================== WORKER =====================
+class OutboxWorker:
+    """Tâche asyncio qui vide l'outbox ; l'envoi tourne dans un thread"""
+
+    def __init__(self, session_factory, transport: EmailTransport,
+                 poll_interval: float = POLL_INTERVAL, batch_size: int = BATCH_SIZE,
+                 transports: dict | None = None):
+        self.session_factory = session_factory
+        self.transport = transport
+        self.transports = transports or {}
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._task = None
+        self._loop = None
+        self._wake = None
+        self._stopping = False
+
+    def drain_once(self) -> dict:
+        db = self.session_factory()
+        try:
+            return process_outbox(db, self.transport, self.batch_size, transports=self.transports)
+        finally:
+            db.close()
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                result = await asyncio.to_thread(self.drain_once)
+            except Exception as e:
+                print(f"⚠️  Worker outbox : {e}")
+                result = {}
+            if sum(result.values()) >= self.batch_size:
+                continue  # lot plein : il en reste probablement
+
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopping = False
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopping = True
+        self.notify()
+        await self._task
+        self._task = None
+
+    def notify(self):
+        """Réveille le worker (appelable depuis n'importe quel thread)"""
+        if self._loop is not None and self._wake is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+
+outbox_worker = None
+_worker_lock = threading.Lock()
+
+
+def start_outbox_worker(session_factory):
+    global outbox_worker
+    with _worker_lock:
+        if outbox_worker is None:
+            outbox_worker = OutboxWorker(session_factory, create_transport(),
+                                         transports={kind: create_transport(kind) for kind in PINNED_TRANSPORTS})
+    outbox_worker.start()
+    return outbox_worker
+
+
+async def stop_outbox_worker():
+    if outbox_worker is not None:
+        await outbox_worker.stop()
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_worker_on_commit(session):
+    if session.info.pop(PENDING_KEY, False) and outbox_worker is not None:
+        outbox_worker.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,150 @@
+# services/http_cache.py
+"""
+Requêtes conditionnelles (ETag / If-None-Match, Last-Modified /
+If-Modified-Since) pour les pages et API publiques en lecture.
+
+Le middleware calcule un ETag fort (SHA-256 du corps sérialisé) sur les
+routes déclarées dans CACHE_POLICIES, pose le Cache-Control de la route et
+renvoie 304 sans corps quand le client possède déjà la bonne version.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy import event, func, select, update
+from sqlalchemy.orm import Session
+
+from models.profile import Profile
+from models.publication import Publication
+from models.project import Project
+
+# ===================== POLITIQUES PAR ROUTE =====================
+# (préfixe de chemin, Cache-Control) - la première correspondance l'emporte.
+# Les pages HTML dépendent du cookie de session : "private, no-cache" force
+# une revalidation (304) à chaque visite sans partage par les CDN.
+CACHE_POLICIES = [
+    ("/researcher/public/", "public, max-age=60, stale-while-revalidate=300"),
+    ("/researchers", "public, max-age=60, stale-while-revalidate=300"),
+    ("/publications", "private, no-cache"),
+    ("/portfolio", "private, no-cache"),
+    ("/sitemap.xml", "public, max-age=3600"),
+]
+
+# Routes d'API sous un préfixe public qui ne doivent pas être mises en cache
+EXCLUDED_PATHS = ("/portfolio/comment",)
+
+# En-têtes repris sur une réponse 304 (RFC 9110 §15.4.5)
+NOT_MODIFIED_HEADERS = ("cache-control", "content-location", "date", "etag", "expires", "last-modified", "vary")
+
+
+def cache_policy(path: str) -> str | None:
+    if path in EXCLUDED_PATHS:
+        return None
+    for prefix, cache_control in CACHE_POLICIES:
+        if path == prefix or path.startswith(prefix if prefix.endswith("/") else prefix + "/"):
+            return cache_control
+    return None
+
+
+# ===================== VALIDATEURS =====================
+def compute_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Comparaison faible (RFC 9110 §13.1.2) : on ignore le préfixe W/"""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def not_modified_since(if_modified_since: str, last_modified: str) -> bool:
+    try:
+        return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+
+def content_last_modified(db: Session) -> datetime | None:
+    """
+    Vecteur de version du contenu public : date de la dernière écriture sur
+    les profils, publications et projets, en une seule requête. Les
+    suppressions de publications et projets datent le profil concerné
+    (_touch_profiles_on_delete).
+    """
+    row = db.execute(select(
+        select(func.max(Profile.updated_at)).scalar_subquery(),
+        select(func.max(Publication.updated_at)).scalar_subquery(),
+        select(func.max(Project.updated_at)).scalar_subquery(),
+    )).first()
+    stamps = [value for value in row if value is not None] if row else []
+    return max(stamps, key=lambda d: d.replace(tzinfo=None)) if stamps else None
+
+
+@event.listens_for(Session, "before_flush")
+def _touch_profiles_on_delete(session, flush_context, instances):
+    # Une ligne supprimée n'a plus de date : celle du profil avance à sa place
+    profile_ids = {obj.profile_id for obj in session.deleted if isinstance(obj, (Publication, Project))}
+    if profile_ids:
+        session.execute(
+            update(Profile).where(Profile.id.in_(profile_ids)).values(updated_at=datetime.utcnow()),
+            execution_options={"synchronize_session": False},
+        )
+
+
+# ===================== MIDDLEWARE =====================
+async def conditional_get(request: Request, call_next):
+    """Middleware HTTP : ETag fort, Cache-Control par route et réponses 304"""
+    if request.method not in ("GET", "HEAD"):
+        return await call_next(request)
+
+    cache_control = cache_policy(request.url.path)
+    if cache_control is None:
+        return await call_next(request)
+
+    response = await call_next(request)
+    if response.status_code != 200:
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+
+    # On repart des en-têtes bruts pour conserver les Set-Cookie multiples
+    result = Response(content=body, status_code=response.status_code, background=response.background)
+    result.raw_headers = [
+        (name, value) for name, value in response.raw_headers if name != b"content-length"
+    ] + [(b"content-length", str(len(body)).encode())]
+
+    headers = result.headers
+    headers["etag"] = compute_etag(body)
+    headers["cache-control"] = cache_control
+    if cache_control.startswith("private"):
+        vary = headers.get("vary")
+        headers["vary"] = f"{vary}, Cookie" if vary else "Cookie"
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+    last_modified = headers.get("last-modified")
+
+    if if_none_match is not None:
+        is_fresh = etag_matches(if_none_match, headers["etag"])
+    elif if_modified_since and last_modified:
+        is_fresh = not_modified_since(if_modified_since, last_modified)
+    else:
+        is_fresh = False
+
+    if is_fresh:
+        return Response(
+            status_code=304,
+            headers={k: v for k, v in headers.items() if k in NOT_MODIFIED_HEADERS},
+        )
+
+    return result
@@ -0,0 +1,120 @@
+# services/loop_monitor.py
+"""
+Surveillance de la latence de la boucle asyncio (développement).
+
+Une tâche asyncio note un battement toutes les LOOP_LAG_INTERVAL_MS ; un
+thread de garde vérifie ces battements. Si la boucle ne bat plus depuis
+plus de LOOP_LAG_THRESHOLD_MS, le thread capture la pile du thread de la
+boucle (sys._current_frames) et la route en cours d'exécution, puis les
+journalise : c'est le code qui bloque la boucle (requête SQL synchrone,
+rendu PDF... dans un handler `async def`).
+
+Activé par LOOP_LAG_MONITOR=1 (désactivé par défaut et en production).
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+
+class LoopLagMonitor:
+    def __init__(self, threshold_ms: int = 100, interval_ms: int = 20, max_reports: int = 50):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+
+        self._last_beat = time.monotonic()
+        self._loop_thread_id = None
+        self._task = None
+        self._thread = None
+        self._stop = threading.Event()
+
+        self.blocks = 0
+        self.max_lag_ms = 0.0
+        self.reports = deque(maxlen=max_reports)
+
+    # ===================== DÉMARRAGE / ARRÊT =====================
+    def start(self):
+        """À appeler depuis la boucle (startup de l'application)"""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-lag-monitor", daemon=True)
+        self._thread.start()
+        print(f"✅ Surveillance de la boucle asyncio (seuil {int(self.threshold * 1000)} ms)")
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+
+    # ===================== DÉTECTION =====================
+    def _watch(self):
+        reported_beat = None
+        while not self._stop.wait(self.interval):
+            beat = self._last_beat
+            lag = time.monotonic() - beat - self.interval
+            if lag > self.threshold and beat != reported_beat:
+                # Un seul rapport par blocage, pris pendant qu'il a lieu
+                reported_beat = beat
+                self.report(lag)
+
+    def report(self, lag: float):
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return
+        lag_ms = round(lag * 1000, 1)
+        route = current_route(frame)
+        stack = "".join(traceback.format_stack(frame))
+
+        self.blocks += 1
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        self.reports.append({"route": route, "lag_ms": lag_ms, "stack": stack})
+        print(f"⚠️  Boucle asyncio bloquée depuis {lag_ms} ms ({route or 'hors requête'})\n{stack}")
+
+    # ===================== MÉTRIQUES =====================
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "threshold_ms": int(self.threshold * 1000),
+            "blocks": self.blocks,
+            "max_lag_ms": self.max_lag_ms,
+            "recent": [{"route": r["route"], "lag_ms": r["lag_ms"]} for r in self.reports],
+        }
+
+
+def current_route(frame) -> str | None:
+    """Route HTTP de la pile : premier `scope` ASGI trouvé en remontant les frames"""
+    while frame is not None:
+        scope = frame.f_locals.get("scope")
+        if isinstance(scope, dict) and scope.get("type") == "http":
+            route = scope.get("route")
+            path = getattr(route, "path", None) or scope.get("path")
+            return f"{scope.get('method')} {path}"
+        frame = frame.f_back
+    return None
+
+
+loop_monitor = LoopLagMonitor(
+    threshold_ms=int(os.getenv("LOOP_LAG_THRESHOLD_MS", 100)),
+    interval_ms=int(os.getenv("LOOP_LAG_INTERVAL_MS", 20)),
+)
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_LAG_MONITOR", "0") == "1"
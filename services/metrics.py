@@ -0,0 +1,197 @@
+# services/metrics.py
+"""
+Instantané des métriques de la plateforme (dashboard, exports CSV et PDF).
+
+Tous les compteurs sont lus en un seul aller-retour : un SELECT de
+sous-requêtes scalaires, joint (LEFT JOIN) à la répartition des
+utilisateurs par rôle.
+
+L'instantané est gardé METRICS_TTL_S secondes (30 par défaut). Passé ce
+délai, l'ancien instantané est encore servi (jusqu'à METRICS_MAX_STALE_S)
+pendant qu'un thread le recalcule ; au-delà, il est recalculé dans la
+requête. Chaque lecture indique l'âge des données (`age_seconds`).
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, literal, select, true
+from sqlalchemy.orm import Session
+
+from models.academic_career import AcademicCareer
+from models.audit import Audit
+from models.comment import Comment
+from models.cours import Cours
+from models.distinction import Distinction
+from models.media_artefact import MediaArtefact
+from models.message_contact import MessageContact
+from models.project import Project
+from models.publication import Publication
+from models.refresh_token import RefreshToken
+from models.user import User
+
+
+def _count(model, *where):
+    return select(func.count(model.id)).where(*where).scalar_subquery()
+
+
+def metric_queries(now: datetime) -> dict:
+    week_ago = now - timedelta(days=7)
+    return {
+        "total_users": _count(User),
+        "active_users": _count(User, User.status == "active"),
+        "inactive_users": _count(User, User.status == "inactive"),
+        "active_sessions": _count(RefreshToken, RefreshToken.revoked == False),
+        "total_audits": _count(Audit),
+        "recent_audits_7d": _count(Audit, Audit.date >= week_ago),
+        "total_messages": _count(MessageContact),
+        "total_publications": _count(Publication),
+        "total_projects": _count(Project),
+        "total_cours": _count(Cours),
+        "total_comments": _count(Comment),
+        "total_distinctions": _count(Distinction),
+        "total_academic": _count(AcademicCareer),
+        "total_media": _count(MediaArtefact),
+    }
+
+
+def compute_metrics(db: Session) -> dict:
+    """Tous les compteurs en une requête"""
+    now = datetime.now(timezone.utc)
+    queries = metric_queries(now)
+    one_row = select(literal(1).label("one")).subquery()
+    roles = select(User.role, func.count(User.id).label("count")).group_by(User.role).subquery()
+    stmt = (
+        select(*[q.label(key) for key, q in queries.items()], roles.c.role, roles.c.count)
+        .select_from(one_row.outerjoin(roles, true()))
+    )
+    rows = db.execute(stmt).all()
+
+    metrics = {key: int(getattr(rows[0], key) or 0) for key in queries}
+    metrics["users_by_role"] = {row.role: row.count for row in rows if row.role}
+    metrics["computed_at"] = now
+    return metrics
+
+
+def empty_metrics() -> dict:
+    now = datetime.now(timezone.utc)
+    metrics = dict.fromkeys(metric_queries(now), 0)
+    metrics["users_by_role"] = {}
+    metrics["computed_at"] = now
+    return metrics
+
+
+class MetricsSnapshot:
+    def __init__(self, ttl: float = 30.0, max_stale: float = 300.0, background: bool = True):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.background = background
+
+        self._entries = {}      # engine -> (instant monotonic, métriques)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.background_refreshes = 0
+        self.errors = 0
+        self.last_refresh_ms = 0.0
+
+    # ===================== LECTURE =====================
+    def get(self, db: Session) -> dict:
+        """Instantané courant, avec son âge (`age_seconds`) et `stale`"""
+        engine = db.get_bind()
+        with self._lock:
+            entry = self._entries.get(engine)
+
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl:
+                self.hits += 1
+                return self._view(entry[1], age)
+            if age < self.max_stale and self.background:
+                self.stale_hits += 1
+                self._refresh_in_background(engine)
+                return self._view(entry[1], age)
+
+        try:
+            return self._view(self.refresh(db), 0.0)
+        except Exception as e:
+            print(f"⚠️  Calcul des métriques impossible : {e}")
+            db.rollback()
+            if entry is not None:
+                return self._view(entry[1], time.monotonic() - entry[0])
+            view = self._view(empty_metrics(), 0.0)
+            view["note"] = "Données limitées en raison d'une erreur technique"
+            return view
+
+    def _view(self, metrics: dict, age: float) -> dict:
+        view = dict(metrics, users_by_role=dict(metrics["users_by_role"]))
+        view["age_seconds"] = round(age, 1)
+        view["stale"] = age >= self.ttl
+        return view
+
+    # ===================== RAFRAÎCHISSEMENT =====================
+    def refresh(self, db: Session) -> dict:
+        started = time.perf_counter()
+        try:
+            metrics = compute_metrics(db)
+        except Exception:
+            self.errors += 1
+            raise
+        self.last_refresh_ms = round((time.perf_counter() - started) * 1000, 2)
+        self.refreshes += 1
+        with self._lock:
+            self._entries[db.get_bind()] = (time.monotonic(), metrics)
+        return metrics
+
+    def _refresh_in_background(self, engine):
+        with self._lock:
+            if engine in self._refreshing:
+                return
+            self._refreshing.add(engine)
+        threading.Thread(target=self._background_refresh, args=(engine,),
+                         name="metrics-refresh", daemon=True).start()
+
+    def _background_refresh(self, engine):
+        db = Session(bind=engine)
+        try:
+            self.refresh(db)
+            self.background_refreshes += 1
+        except Exception as e:
+            print(f"⚠️  Rafraîchissement des métriques impossible : {e}")
+        finally:
+            db.close()
+            with self._lock:
+                self._refreshing.discard(engine)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # ===================== MÉTRIQUES =====================
+    def stats(self) -> dict:
+        with self._lock:
+            ages = [time.monotonic() - at for at, _ in self._entries.values()]
+        return {
+            "name": "metrics_snapshot",
+            "ttl": self.ttl,
+            "max_stale": self.max_stale,
+            "background": self.background,
+            "age_seconds": round(min(ages), 1) if ages else None,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "refreshes": self.refreshes,
+            "background_refreshes": self.background_refreshes,
+            "errors": self.errors,
+            "last_refresh_ms": self.last_refresh_ms,
+        }
+
+
+metrics_snapshot = MetricsSnapshot(
+    ttl=float(os.getenv("METRICS_TTL_S", 30)),
+    max_stale=float(os.getenv("METRICS_MAX_STALE_S", 300)),
+    background=os.getenv("METRICS_BACKGROUND_REFRESH", "1") == "1",
+)
@@ -0,0 +1,134 @@
+# services/pagination.py
+"""
+Pagination par clé (keyset) pour les listes triées par date décroissante.
+
+Chaque page est lue avec `WHERE (date, id) < (:date, :id) ORDER BY date
+DESC, id DESC LIMIT n` : le coût ne dépend pas de la profondeur de la page
+(index (date, id) sans filtre, index composites (…, date) avec filtre),
+contrairement à OFFSET.
+
+Les curseurs `next` / `prev` sont opaques (JSON encodé en base64 URL) : le
+client les renvoie tels quels dans `?cursor=`.
+
+Le total n'est calculé que sur demande : estimation du planificateur sur
+PostgreSQL (EXPLAIN), comptage exact sur les autres bases.
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import text, tuple_
+from sqlalchemy.orm import Query
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 200
+
+
+# ===================== CURSEURS =====================
+def encode_cursor(date: datetime, row_id: int, direction: str) -> str:
+    payload = json.dumps({"d": date.isoformat(), "i": row_id, "dir": direction}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """-> (date, id, direction) ; ValueError si le curseur est invalide"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        direction = payload["dir"]
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return datetime.fromisoformat(payload["d"]), int(payload["i"]), direction
+    except Exception as e:
+        raise ValueError(f"Curseur invalide : {e}")
+
+
+# ===================== PAGE =====================
+def keyset_page(query: Query, date_col, id_col, limit: int = DEFAULT_LIMIT, cursor: str | None = None) -> dict:
+    """
+    Une page de `query` du plus récent au plus ancien.
+    Retourne {"items": [...], "next": curseur | None, "prev": curseur | None}.
+    """
+    limit = max(1, min(limit, MAX_LIMIT))
+    query = query.filter(date_col.is_not(None))
+    key = tuple_(date_col, id_col)
+
+    direction = "next"
+    if cursor:
+        date, row_id, direction = decode_cursor(cursor)
+        if direction == "next":
+            query = query.filter(key < tuple_(date, row_id))
+        else:
+            query = query.filter(key > tuple_(date, row_id))
+
+    if direction == "next":
+        rows = query.order_by(date_col.desc(), id_col.desc()).limit(limit + 1).all()
+    else:
+        # Page précédente : lue à l'envers puis remise dans l'ordre d'affichage
+        rows = query.order_by(date_col.asc(), id_col.asc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == "prev":
+        rows.reverse()
+
+    def key_of(row):
+        return getattr(row, date_col.key), getattr(row, id_col.key)
+
+    next_cursor = prev_cursor = None
+    if rows:
+        if direction == "next":
+            older, newer = has_more, cursor is not None
+        else:
+            older, newer = True, has_more
+        if older:
+            next_cursor = encode_cursor(*key_of(rows[-1]), "next")
+        if newer:
+            prev_cursor = encode_cursor(*key_of(rows[0]), "prev")
+    elif cursor:
+        # Page vide (ex : lignes purgées entre-temps) : on peut toujours revenir en arrière
+        prev_cursor = encode_cursor(date, row_id, "prev") if direction == "next" else None
+
+    return {"items": rows, "next": next_cursor, "prev": prev_cursor}
+
+
+# ===================== PARCOURS COMPLET =====================
+def iter_keyset(session, stmt, date_col, id_col, batch_size: int = 500, limit: int | None = None):
+    """
+    Lots de lignes de `stmt` (SELECT de colonnes), du plus récent au plus
+    ancien, lus par clé (date, id) : exports longs sans OFFSET ni curseur
+    serveur ouvert pendant tout le rendu. `stmt` doit sélectionner date_col
+    et id_col.
+    """
+    stmt = stmt.where(date_col.is_not(None)).order_by(date_col.desc(), id_col.desc())
+    key = tuple_(date_col, id_col)
+    last = None
+    remaining = limit
+    while remaining is None or remaining > 0:
+        size = batch_size if remaining is None else min(batch_size, remaining)
+        page = stmt if last is None else stmt.where(key < tuple_(*last))
+        rows = session.execute(page.limit(size)).all()
+        if not rows:
+            return
+        yield rows
+        last = (rows[-1]._mapping[date_col], rows[-1]._mapping[id_col])
+        if remaining is not None:
+            remaining -= len(rows)
+        if len(rows) < size:
+            return
+
+
+# ===================== TOTAL =====================
+def estimate_count(query: Query) -> tuple:
+    """-> (total, estimé ?) : estimation du planificateur sur PostgreSQL, COUNT ailleurs"""
+    session = query.session
+    if session.get_bind().dialect.name == "postgresql":
+        try:
+            sql = query.statement.compile(session.get_bind(), compile_kwargs={"literal_binds": True})
+            plan = session.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]["Plan"]["Plan Rows"]), True
+        except Exception as e:
+            print(f"⚠️  Estimation du total impossible, comptage exact : {e}")
+            session.rollback()
+    return query.count(), False
@@ -0,0 +1,272 @@
+# services/pdf_jobs.py
+"""
+Rapports PDF en tâche de fond (POST /api/pdf/jobs).
+
+La route lit les données (pdf_reports.collect_report) puis soumet le rendu
+à un pool de processus : un gros rapport n'occupe plus le worker HTTP. Le
+journal des audits, sans plafond de lignes, est lu par le processus de
+rendu lui-même (pdf_reports.render_audit_report).
+Chaque processus du pool précharge styles et polices une seule fois
+(pdf_reports.init_worker). Le PDF est écrit dans PDF_JOBS_DIR ; le client
+suit la tâche (GET /api/pdf/jobs/{id}/status ou l'événement SSE de
+/api/pdf/jobs/{id}/events) puis télécharge le fichier (GET /api/pdf/jobs/{id}).
+
+- PDF_JOB_WORKERS : processus de rendu ;
+- PDF_JOB_MAX_PENDING : tâches en cours au-delà desquelles on répond 503 ;
+- PDF_JOB_RETENTION_S : durée de conservation d'un PDF terminé (1 h) ;
+- PDF_JOB_EXECUTOR=thread : pool de threads (développement).
+
+État partagé entre processus uvicorn : chaque tâche a, à côté de son PDF,
+un fichier {id}.json (statut, propriétaire, taille...) réécrit à chaque
+changement. Un worker qui ne connaît pas la tâche (soumise à un autre) la
+relit depuis PDF_JOBS_DIR, qui doit donc être commun à tous les workers.
+"""
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+
+from fastapi import HTTPException
+
+from services.pdf_reports import init_worker
+
+PENDING, DONE, FAILED = "pending", "done", "failed"
+JOB_ID_RE = re.compile(r"[0-9a-f]{32}")
+JOB_FIELDS = ("id", "owner_id", "filename", "status", "created_at", "finished_at", "expires_at", "size", "error")
+
+
+@dataclass
+class PDFJob:
+    id: str
+    owner_id: int
+    filename: str
+    path: str
+    future: Future | None = None           # None : tâche d'un autre processus uvicorn
+    status: str = PENDING
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    expires_at: float | None = None
+    size: int | None = None
+    error: str | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def public(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "filename": self.filename,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "expires_at": self.expires_at,
+            "size": self.size,
+            "error": self.error,
+        }
+
+
+class PDFJobService:
+    def __init__(self, directory: str, retention: float = 3600.0, max_workers: int = 2,
+                 max_pending: int = 32, use_processes: bool = True):
+        self.directory = directory
+        self.retention = retention
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.use_processes = use_processes
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.expired = 0
+        self.total_seconds = 0.0
+
+    # ===================== POOL =====================
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.use_processes:
+                        # spawn : pas de fork d'un processus qui a des threads (audits, outbox...)
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.max_workers, initializer=init_worker,
+                            mp_context=multiprocessing.get_context("spawn"),
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.max_workers, initializer=init_worker,
+                            thread_name_prefix="pdf-render",
+                        )
+        return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    # ===================== TÂCHES =====================
+    def submit(self, task, args: tuple, owner_id: int, filename: str) -> PDFJob:
+        """`task(*args, path)` écrit le PDF dans `path` et renvoie sa taille"""
+        self.purge_expired()
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            if pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail="Trop de rapports en cours de génération, réessayez dans un instant",
+                    headers={"Retry-After": "5"},
+                )
+
+        os.makedirs(self.directory, exist_ok=True)
+        job_id = uuid.uuid4().hex
+        job = PDFJob(id=job_id, owner_id=owner_id, filename=filename,
+                     path=os.path.join(self.directory, f"{job_id}.pdf"))
+        # Future posée avant l'enregistrement : /events peut toujours l'attendre
+        self._save(job)
+        job.future = self.executor.submit(task, *args, job.path)
+        with self._lock:
+            self._jobs[job_id] = job
+            self.submitted += 1
+        job.future.add_done_callback(lambda future: self._finish(job, future))
+        return job
+
+    def _finish(self, job: PDFJob, future: Future):
+        now = time.time()
+        if future.cancelled():
+            update = {"status": FAILED, "error": "Annulé"}
+        elif future.exception() is not None:
+            update = {"status": FAILED, "error": str(future.exception())[:200]}
+        else:
+            update = {"status": DONE, "size": future.result()}
+        update.update(finished_at=now, expires_at=now + self.retention)
+        # État partagé écrit avant que la tâche ne passe à terminée ici
+        self._save(replace(job, **update))
+        with self._lock:
+            for name, value in update.items():
+                setattr(job, name, value)
+            if update["status"] == DONE:
+                self.completed += 1
+            elif not future.cancelled():
+                self.failed += 1
+            self.total_seconds += now - job.created_at
+        if job.status == FAILED:
+            print(f"⚠️  Rapport PDF {job.id} en échec : {job.error}")
+
+    def get(self, job_id: str) -> PDFJob | None:
+        """Tâche de ce processus, sinon relue depuis le répertoire partagé"""
+        self.purge_expired()
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        job = self._load(job_id)
+        if job is None or (job.expires_at is not None and job.expires_at <= time.time()):
+            return None
+        return job
+
+    # ===================== ÉTAT PARTAGÉ =====================
+    def _meta_path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def _save(self, job: PDFJob):
+        path = self._meta_path(job.id)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({name: getattr(job, name) for name in JOB_FIELDS}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️  État du rapport {job.id} non enregistré : {e}")
+            _remove(tmp_path)
+
+    def _load(self, job_id: str) -> PDFJob | None:
+        if not JOB_ID_RE.fullmatch(job_id):
+            return None
+        try:
+            with open(self._meta_path(job_id), encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return PDFJob(path=os.path.join(self.directory, f"{job_id}.pdf"),
+                      **{name: state.get(name) for name in JOB_FIELDS})
+
+    # ===================== RÉTENTION =====================
+    def purge_expired(self, now: float | None = None) -> int:
+        """Supprime les tâches terminées depuis plus de `retention` et leurs fichiers"""
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [job for job in self._jobs.values()
+                       if job.expires_at is not None and job.expires_at <= now]
+            for job in expired:
+                del self._jobs[job.id]
+            known = {name for job in self._jobs.values() for name in (f"{job.id}.pdf", f"{job.id}.json")}
+            self.expired += len(expired)
+
+        for job in expired:
+            _remove(job.path)
+            _remove(self._meta_path(job.id))
+        # Fichiers orphelins (redémarrage, autre worker) : âge du fichier
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if name not in known and _mtime(path) + self.retention <= now:
+                    _remove(path)
+        return len(expired)
+
+    # ===================== MÉTRIQUES =====================
+    def stats(self) -> dict:
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            finished = self.completed + self.failed
+            return {
+                "executor": "process" if self.use_processes else "thread",
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "retention_s": self.retention,
+                "pending": pending,
+                "stored": len(self._jobs) - pending,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "expired": self.expired,
+                "avg_ms": round(self.total_seconds / finished * 1000, 2) if finished else 0.0,
+            }
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return float("inf")
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"⚠️  Suppression du rapport {path} impossible : {e}")
+
+
+pdf_jobs = PDFJobService(
+    directory=os.getenv("PDF_JOBS_DIR") or os.path.join(tempfile.gettempdir(), "portfolio_pdf_jobs"),
+    retention=float(os.getenv("PDF_JOB_RETENTION_S", 3600)),
+    max_workers=int(os.getenv("PDF_JOB_WORKERS", min(2, os.cpu_count() or 1))),
+    max_pending=int(os.getenv("PDF_JOB_MAX_PENDING", 32)),
+    use_processes=os.getenv("PDF_JOB_EXECUTOR", "process").lower() == "process",
+)
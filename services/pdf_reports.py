@@ -0,0 +1,411 @@
+# services/pdf_reports.py
+"""
+Rapports PDF (POST /api/pdf/generate et /api/pdf/jobs).
+
+La génération est coupée en deux :
+- collect_report(db, ...) lit la base et renvoie un dict de données simples
+  (str, int, listes) : il peut être envoyé à un autre processus ;
+- render_report(report) construit le PDF avec ReportLab, sans base.
+
+Les styles (feuille de styles + ParagraphStyle) sont créés une fois par
+processus (report_styles) ; init_worker les précharge, avec les polices,
+au démarrage de chaque processus du pool de rendu (services/pdf_jobs.py).
+
+Journal des audits : pas de plafond de lignes. Les audits sont lus par lots
+(clé date/id, iter_keyset) pendant le rendu ; chaque lot devient un Table
+(en-tête répété sur chaque page) ajouté au fil de la construction
+(LazyStory) et le PDF est écrit directement dans un fichier. Seuls un lot
+et les pages déjà produites (compressées) sont en mémoire. Les pages sont
+numérotées « Page n/N » : N est un formulaire PDF rempli à la fin.
+Les modèles ne sont importés que dans les fonctions de lecture. Un
+processus du pool n'importe donc SQLAlchemy, les modèles et database.py
+qu'au premier journal des audits (render_audit_report), qui lit lui-même
+la base avec un moteur créé comme ceux de l'application
+(database.create_db_engine : SSL Render, réglages DB_POOL_*).
+"""
+import io
+import os
+import traceback
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from itertools import chain
+
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfgen import canvas
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+REPORT_FONTS = ("Helvetica", "Helvetica-Bold", "Helvetica-Oblique")
+AUDIT_BATCH_ROWS = 500
+AUDIT_DEFAULT_LIMIT = 50  # sans période ni limite : dernières actions, comme avant
+AUDIT_HEADER = ["Date", "Utilisateur (Rôle)", "Action"]
+PAGE_TOTAL_FORM = "page_total"
+DASHBOARD_ROWS = (
+    ("Nombre d'utilisateurs", "total_users"),
+    ("Nombre d'audits", "total_audits"),
+    ("Nombre de messages", "total_messages"),
+    ("Nombre de publications", "total_publications"),
+    ("Nombre de projets", "total_projects"),
+    ("Nombre de cours", "total_cours"),
+)
+
+
+# ===================== STYLES (une fois par processus) =====================
+@lru_cache(maxsize=1)
+def report_styles() -> dict:
+    styles = getSampleStyleSheet()
+    return {
+        "title": ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            textColor=colors.HexColor('#2c3e50')
+        ),
+        "subtitle": ParagraphStyle(
+            'CustomSubtitle',
+            parent=styles['Heading2'],
+            fontSize=16,
+            spaceAfter=20,
+            spaceBefore=20,
+            textColor=colors.HexColor('#34495e')
+        ),
+        "normal": ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontSize=11,
+            spaceAfter=12
+        ),
+        "footer": ParagraphStyle(
+            'Footer',
+            parent=styles['Italic'],
+            fontSize=9,
+            textColor=colors.grey,
+            alignment=TA_CENTER
+        ),
+    }
+
+
+def init_worker():
+    """Initialiseur des processus de rendu : styles et métriques des polices"""
+    if PDF_AVAILABLE:
+        report_styles()
+        for font in REPORT_FONTS:
+            pdfmetrics.getFont(font)
+
+
+# ===================== LECTURE DES DONNÉES =====================
+def collect_report(db, title: str, data_type: str, generated_by: str,
+                   content: str = "", filters: dict | None = None) -> dict:
+    """Données du rapport, sans objet ORM ni ReportLab"""
+    report = {
+        "title": title,
+        "data_type": data_type,
+        "content": content,
+        "generated_by": generated_by,
+        "generated_at": datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
+    }
+    try:
+        if data_type == "dashboard":
+            from services.metrics import metrics_snapshot
+            metrics = metrics_snapshot.get(db)
+            report["rows"] = [[label, str(metrics[key])] for label, key in DASHBOARD_ROWS]
+            report["roles"] = [[role, str(count)] for role, count in metrics["users_by_role"].items()]
+            report["computed_at"] = f"{metrics['computed_at']:%d/%m/%Y %H:%M:%S}"
+        elif data_type == "audits":
+            # Lignes lues pendant le rendu (audit_batches)
+            report["filters"] = audit_filters(filters or {})
+        elif data_type == "users":
+            report["rows"] = collect_users(db)
+    except Exception as e:
+        traceback.print_exc()
+        db.rollback()
+        report["error"] = str(e)[:200]
+    return report
+
+
+def audit_filters(filters: dict) -> dict:
+    """date_from / date_to (AAAA-MM-JJ, inclus) et limit ; ValueError si invalides"""
+    date_from = date.fromisoformat(filters["date_from"]) if filters.get("date_from") else None
+    date_to = date.fromisoformat(filters["date_to"]) if filters.get("date_to") else None
+    limit = int(filters["limit"]) if filters.get("limit") else None
+    if limit is None and date_from is None and date_to is None:
+        limit = AUDIT_DEFAULT_LIMIT
+    return {
+        "date_from": date_from.isoformat() if date_from else None,
+        "date_to": date_to.isoformat() if date_to else None,
+        "limit": limit,
+    }
+
+
+def audit_batches(db, filters: dict, batch_size: int = AUDIT_BATCH_ROWS):
+    """Lignes du journal (plus récentes d'abord), lot par lot"""
+    from sqlalchemy import select
+    from models.audit import Audit
+    from services.pagination import iter_keyset
+
+    stmt = select(Audit.date, Audit.id, Audit.user_id, Audit.user_role, Audit.action_description)
+    if filters.get("date_from"):
+        stmt = stmt.where(Audit.date >= datetime.fromisoformat(filters["date_from"]))
+    if filters.get("date_to"):
+        stmt = stmt.where(Audit.date < datetime.fromisoformat(filters["date_to"]) + timedelta(days=1))
+
+    for rows in iter_keyset(db, stmt, Audit.date, Audit.id, batch_size, filters.get("limit")):
+        yield [
+            [
+                row.date.strftime('%d/%m/%Y %H:%M'),
+                f"ID: {row.user_id} ({row.user_role})",
+                row.action_description[:100] if row.action_description else "N/A",
+            ]
+            for row in rows
+        ]
+
+
+def collect_users(db) -> list:
+    from models.user import User
+    users = db.query(User).order_by(User.created_at.desc()).limit(100).all()
+    return [
+        [
+            str(user.id),
+            user.email,
+            user.role or "N/A",
+            user.status or "N/A",
+            user.created_at.strftime('%d/%m/%Y') if user.created_at else "N/A",
+        ]
+        for user in users
+    ]
+
+
+# ===================== RENDU =====================
+class LazyStory(list):
+    """
+    Flowables produits à la demande : build() consomme la liste par le début
+    (len, [0], del [0]) ; elle est réalimentée lot par lot quand elle se vide.
+    """
+
+    def __init__(self, chunks):
+        super().__init__()
+        self._chunks = iter(chunks)
+
+    def __len__(self):
+        while not list.__len__(self):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self.extend(chunk)
+        return list.__len__(self)
+
+
+if PDF_AVAILABLE:
+    class NumberedCanvas(canvas.Canvas):
+        """« Page n/N » : N est un formulaire PDF défini à la sauvegarde, une fois le total connu"""
+
+        def draw_page_number(self):
+            self.saveState()
+            self.setFont("Helvetica", 8)
+            self.setFillColor(colors.grey)
+            x, y = self._pagesize[0] - 72, 30
+            self.drawRightString(x, y, f"Page {self.getPageNumber()}/")
+            self.translate(x, y)
+            self.doForm(PAGE_TOTAL_FORM)
+            self.restoreState()
+
+        def save(self):
+            # Après le dernier showPage, le compteur est déjà sur la page suivante
+            total = self.getPageNumber() - (0 if self._code else 1)
+            self.beginForm(PAGE_TOTAL_FORM)
+            self.setFont("Helvetica", 8)
+            self.setFillColor(colors.grey)
+            self.drawString(0, 0, str(total))
+            self.endForm()
+            super().save()
+
+
+def number_page(canv, doc):
+    canv.draw_page_number()
+
+
+def write_report(report: dict, out, batches=None):
+    """
+    Écrit le PDF dans `out` (chemin ou fichier). `batches` : lots de lignes
+    d'audit (audit_batches), consommés pendant le rendu.
+    """
+    styles = report_styles()
+    doc = SimpleDocTemplate(out, pagesize=A4, pageCompression=1)
+
+    # 1. Titre et 2. Métadonnées
+    meta_text = f"""
+    <b>Généré le:</b> {report['generated_at']}<br/>
+    <b>Généré par:</b> {report['generated_by']}<br/>
+    <b>Type de rapport:</b> {report['data_type']}
+    """
+    header = [
+        Paragraph(report["title"], styles["title"]),
+        Spacer(1, 20),
+        Paragraph(meta_text, styles["normal"]),
+        Spacer(1, 30),
+    ]
+
+    # 3. Contenu selon le type
+    data_type = report["data_type"]
+    if report.get("error"):
+        body = [[
+            Paragraph("Erreur lors de la récupération des données", styles["subtitle"]),
+            Paragraph(report["error"], styles["normal"]),
+        ]]
+    elif data_type == "dashboard":
+        body = [dashboard_elements(report, styles)]
+    elif data_type == "audits":
+        body = audits_elements(batches if batches is not None else [report.get("rows", [])], styles)
+    elif data_type == "users":
+        body = [users_elements(report, styles)]
+    elif report.get("content"):
+        # Contenu personnalisé
+        body = [[Paragraph("Contenu:", styles["subtitle"]), Paragraph(report["content"], styles["normal"])]]
+    else:
+        body = []
+
+    # 4. Pied de page (numéros de page : NumberedCanvas)
+    footer_text = f"""
+    <i>Document généré automatiquement par le système Portfolio FastAPI<br/>
+    {report['generated_at'][:10]}</i>
+    """
+    footer = [Spacer(1, 50), Paragraph(footer_text, styles["footer"])]
+
+    doc.build(LazyStory(chain([header], body, [footer])),
+              onFirstPage=number_page, onLaterPages=number_page, canvasmaker=NumberedCanvas)
+
+
+def render_report(report: dict, batches=None) -> bytes:
+    """PDF du rapport en mémoire (rapports courts)"""
+    buffer = io.BytesIO()
+    write_report(report, buffer, batches)
+    return buffer.getvalue()
+
+
+def dashboard_elements(report: dict, styles: dict) -> list:
+    elements = [Paragraph("Statistiques du Dashboard", styles["subtitle"])]
+
+    table = Table([["Statistique", "Valeur"], *report["rows"]], colWidths=[3*inch, 2*inch])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495e')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f8f9fa')),
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')])
+    ]))
+    elements.append(table)
+    elements.append(Paragraph(f"Données du {report['computed_at']} UTC", styles["normal"]))
+    elements.append(Spacer(1, 30))
+
+    # Utilisateurs par rôle
+    elements.append(Paragraph("Utilisateurs par rôle", styles["subtitle"]))
+    if report["roles"]:
+        role_table = Table([["Rôle", "Nombre"], *report["roles"]], colWidths=[2.5*inch, 2.5*inch])
+        role_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2c3e50')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+        ]))
+        elements.append(role_table)
+    else:
+        elements.append(Paragraph("Aucune donnée disponible", styles["normal"]))
+    return elements
+
+
+def audits_elements(batches, styles: dict):
+    """Un Table par lot, en-tête répété à chaque page ; le total arrive en fin de journal"""
+    yield [Paragraph("Journal des audits", styles["subtitle"]), Spacer(1, 15)]
+    total = 0
+    for rows in batches:
+        if not rows:
+            continue
+        total += len(rows)
+        audit_table = Table([AUDIT_HEADER, *rows], colWidths=[1.5*inch, 2*inch, 3*inch], repeatRows=1)
+        audit_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495e')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ]))
+        yield [audit_table]
+
+    if total:
+        yield [Spacer(1, 15), Paragraph(f"Total d'audits: {total}", styles["normal"])]
+    else:
+        yield [Paragraph("Aucun audit trouvé", styles["normal"])]
+
+
+def users_elements(report: dict, styles: dict) -> list:
+    rows = report["rows"]
+    elements = [
+        Paragraph("Liste des utilisateurs", styles["subtitle"]),
+        Paragraph(f"Total d'utilisateurs: {len(rows)}", styles["normal"]),
+        Spacer(1, 15),
+    ]
+    if not rows:
+        elements.append(Paragraph("Aucun utilisateur trouvé", styles["normal"]))
+        return elements
+
+    user_table = Table([["ID", "Email", "Rôle", "Statut", "Créé le"], *rows],
+                       colWidths=[0.5*inch, 2.5*inch, 1*inch, 1*inch, 1*inch])
+    user_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#34495e')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ]))
+    elements.append(user_table)
+    return elements
+
+
+def report_filename(title: str) -> str:
+    return f"{title.lower().replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+
+
+def render_to_file(report: dict, path: str, batches=None) -> int:
+    """Rendu vers un fichier (écrit puis renommé : jamais de PDF partiel) ; renvoie sa taille"""
+    tmp_path = f"{path}.tmp"
+    try:
+        write_report(report, tmp_path, batches)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return os.path.getsize(path)
+
+
+# ===================== TÂCHES DU POOL =====================
+@lru_cache(maxsize=4)
+def _worker_engine(database_url: str):
+    from database import create_db_engine
+    return create_db_engine(database_url, "pdf_worker")
+
+
+def render_audit_report(report: dict, database_url: str, path: str) -> int:
+    """Journal des audits rendu dans le pool : le processus lit lui-même la base"""
+    from sqlalchemy.orm import Session
+    with Session(_worker_engine(database_url)) as db:
+        return render_to_file(report, path, audit_batches(db, report["filters"]))
@@ -0,0 +1,268 @@
+# services/rate_limiter.py
+"""
+Rate limiter à fenêtre glissante (sliding window counter).
+
+Pour chaque clé (politique + IP) on ne garde que trois nombres : le début de
+la fenêtre courante, le compteur de la fenêtre précédente et celui de la
+fenêtre courante. L'estimation est :
+
+    prev_count * (1 - écoulé / fenêtre) + curr_count
+
+soit une mémoire O(1) par client, quel que soit le nombre de requêtes.
+
+Deux backends sont fournis :
+- MemoryBackend : dictionnaire en mémoire (un seul worker) ;
+- SQLiteBackend : fichier SQLite partagé, pour que plusieurs workers uvicorn
+  d'une même machine appliquent une limite commune.
+Les clés inactives sont purgées périodiquement. Le backend SQLite est
+bloquant (verrou d'écriture, fsync) : depuis le middleware asynchrone, il
+est appelé dans un thread (RateLimiter.ahit).
+"""
+import asyncio
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+
+# ===================== POLITIQUES =====================
+@dataclass(frozen=True)
+class RatePolicy:
+    name: str
+    limit: int | None      # None = pas de limite
+    window: int = 60       # secondes
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_at: int
+
+
+def _window_state(window_start: int, prev_count: int, curr_count: int, now: float, window: int):
+    """Fait glisser l'état stocké jusqu'à la fenêtre courante"""
+    current_start = int(now // window) * window
+    if window_start == current_start:
+        return current_start, prev_count, curr_count
+    if window_start == current_start - window:
+        return current_start, curr_count, 0
+    return current_start, 0, 0
+
+
+def _estimate(prev_count: int, curr_count: int, window_start: int, now: float, window: int) -> float:
+    elapsed = now - window_start
+    return prev_count * (1 - elapsed / window) + curr_count
+
+
+# ===================== BACKENDS =====================
+class RateLimitBackend(ABC):
+    """Interface commune des backends de stockage (backend incomplet : erreur à la construction)"""
+
+    blocking = False  # True : E/S bloquantes, hors de la boucle d'événements
+
+    @abstractmethod
+    def hit(self, key: str, limit: int, window: int, now: float) -> RateLimitResult:
+        ...
+
+    @abstractmethod
+    def evict_idle(self, now: float) -> int:
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+
+class MemoryBackend(RateLimitBackend):
+    def __init__(self):
+        self._state = {}  # clé -> (window_start, prev_count, curr_count, window)
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, window, now):
+        with self._lock:
+            window_start, prev_count, curr_count, _ = self._state.get(key, (0, 0, 0, window))
+            window_start, prev_count, curr_count = _window_state(window_start, prev_count, curr_count, now, window)
+
+            estimate = _estimate(prev_count, curr_count, window_start, now, window)
+            allowed = estimate + 1 <= limit
+            if allowed:
+                curr_count += 1
+                estimate += 1
+            self._state[key] = (window_start, prev_count, curr_count, window)
+
+        return RateLimitResult(
+            allowed=allowed,
+            limit=limit,
+            remaining=max(0, math.floor(limit - estimate)),
+            reset_at=window_start + window,
+        )
+
+    def evict_idle(self, now):
+        with self._lock:
+            idle = [
+                key for key, (window_start, _, _, window) in self._state.items()
+                if window_start + 2 * window <= now
+            ]
+            for key in idle:
+                del self._state[key]
+        return len(idle)
+
+    def clear(self):
+        with self._lock:
+            self._state.clear()
+
+    def __len__(self):
+        return len(self._state)
+
+
+class SQLiteBackend(RateLimitBackend):
+    """
+    État partagé entre processus via un fichier SQLite (mode WAL).
+    Chaque mise à jour se fait dans une transaction BEGIN IMMEDIATE, ce qui
+    sérialise les écritures concurrentes des différents workers.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits ("
+                " key TEXT PRIMARY KEY,"
+                " window_start INTEGER NOT NULL,"
+                " prev_count INTEGER NOT NULL,"
+                " curr_count INTEGER NOT NULL,"
+                " window INTEGER NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key, limit, window, now):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT window_start, prev_count, curr_count FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            window_start, prev_count, curr_count = row if row else (0, 0, 0)
+            window_start, prev_count, curr_count = _window_state(window_start, prev_count, curr_count, now, window)
+
+            estimate = _estimate(prev_count, curr_count, window_start, now, window)
+            allowed = estimate + 1 <= limit
+            if allowed:
+                curr_count += 1
+                estimate += 1
+
+            conn.execute(
+                "INSERT INTO rate_limits (key, window_start, prev_count, curr_count, window) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET window_start = excluded.window_start, "
+                "prev_count = excluded.prev_count, curr_count = excluded.curr_count, window = excluded.window",
+                (key, window_start, prev_count, curr_count, window),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        return RateLimitResult(
+            allowed=allowed,
+            limit=limit,
+            remaining=max(0, math.floor(limit - estimate)),
+            reset_at=window_start + window,
+        )
+
+    def evict_idle(self, now):
+        cursor = self._connect().execute(
+            "DELETE FROM rate_limits WHERE window_start + 2 * window <= ?", (now,)
+        )
+        return cursor.rowcount
+
+    def clear(self):
+        self._connect().execute("DELETE FROM rate_limits")
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+
+# ===================== LIMITEUR =====================
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend, default_policy: RatePolicy,
+                 exact_policies: dict | None = None, prefix_policies: list | None = None,
+                 evict_interval: float = 60.0):
+        self.backend = backend
+        self.default_policy = default_policy
+        self.exact_policies = exact_policies or {}
+        self.prefix_policies = prefix_policies or []
+        self.evict_interval = evict_interval
+        self._last_eviction = time.time()
+
+    def policy_for(self, path: str) -> RatePolicy:
+        policy = self.exact_policies.get(path)
+        if policy is not None:
+            return policy
+        for prefix, policy in self.prefix_policies:
+            if path.startswith(prefix):
+                return policy
+        return self.default_policy
+
+    def hit(self, client_id: str, path: str, now: float | None = None) -> RateLimitResult | None:
+        """Compte une requête ; None si la route n'est pas limitée"""
+        policy = self.policy_for(path)
+        if policy.limit is None:
+            return None
+
+        now = time.time() if now is None else now
+        self._maybe_evict(now)
+        return self.backend.hit(f"{policy.name}:{client_id}", policy.limit, policy.window, now)
+
+    async def ahit(self, client_id: str, path: str, now: float | None = None) -> RateLimitResult | None:
+        """hit() depuis du code asynchrone : backend bloquant exécuté dans un thread"""
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.hit, client_id, path, now)
+        return self.hit(client_id, path, now)
+
+    def _maybe_evict(self, now: float):
+        if now - self._last_eviction < self.evict_interval:
+            return
+        self._last_eviction = now
+        self.backend.evict_idle(now)
+
+    def clear(self):
+        self.backend.clear()
+
+
+def create_backend() -> RateLimitBackend:
+    """Backend choisi par RATE_LIMIT_BACKEND (memory | sqlite)"""
+    kind = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+    if kind == "sqlite":
+        path = os.getenv(
+            "RATE_LIMIT_SQLITE_PATH",
+            os.path.join(tempfile.gettempdir(), "portfolio_rate_limit.db")
+        )
+        return SQLiteBackend(path)
+    return MemoryBackend()
+
+
+def client_ip(request) -> str:
+    forwarded = request.headers.get("X-Forwarded-For")
+    if forwarded:
+        return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
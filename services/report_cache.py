@@ -0,0 +1,238 @@
+# services/report_cache.py
+"""
+Cache disque des rapports rendus (exports PDF et CSV).
+
+Clé = SHA-256 du type de rapport, de ses paramètres (filtres, titre...)
+et de la version des données (report_version) : un export identique sur
+des données inchangées est servi depuis le fichier déjà rendu, sans
+requête ni rendu : StreamingResponse sur le descripteur ouvert, lu par
+blocs de 64 Kio dans le pool de threads.
+
+Versions des données :
+- dashboard : instant de calcul de l'instantané des métriques
+  (services/metrics.py), qui change au plus toutes les METRICS_TTL_S ;
+- audits : plus grand id d'audit (table en ajout seul) ;
+- users : plus grand id d'utilisateur, effectifs par rôle et statut
+  (activation, désactivation) + instantané des métriques.
+
+Les fichiers vivent dans REPORT_CACHE_DIR ; au-delà de REPORT_CACHE_MAX_MB,
+les moins récemment servis (date de modification, remise à jour à chaque
+lecture) sont supprimés. Le répertoire est partagé entre processus uvicorn :
+un rapport est ouvert avant toute éviction et servi depuis ce descripteur,
+qu'une éviction concurrente (autre requête, autre processus) ne peut plus
+invalider. L'envoi sans copie (FileResponse / sendfile) est abandonné
+volontairement : il rouvre le fichier par son chemin au moment de l'envoi,
+après une éventuelle éviction.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from urllib.parse import quote
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models.audit import Audit
+from models.user import User
+from services.metrics import metrics_snapshot
+
+
+class ReportCache:
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ===================== CLÉS =====================
+    @staticmethod
+    def key(kind: str, params: dict, version: str) -> str:
+        payload = json.dumps({"kind": kind, "params": params, "version": version},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str, ext: str) -> str:
+        return os.path.join(self.directory, f"{key}.{ext}")
+
+    # ===================== LECTURE / ÉCRITURE =====================
+    def get(self, key: str, ext: str):
+        """Rapport ouvert en lecture (binaire), ou None s'il n'est pas en cache"""
+        path = self.path_for(key, ext)
+        try:
+            report = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # récence LRU
+        except FileNotFoundError:
+            pass  # évincé entre-temps : le descripteur ouvert reste lisible
+        return report
+
+    def put(self, key: str, ext: str, write):
+        """
+        `write(chemin)` écrit le rapport ; le fichier n'apparaît qu'une fois
+        complet. Renvoie le rapport ouvert : il est ouvert avant l'éviction,
+        qui épargne de toute façon le fichier qui vient d'être écrit.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(key, ext)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        report = open(path, "rb")
+        self.evict(keep=path)
+        return report
+
+    def get_or_render(self, kind: str, params: dict, version: str, ext: str, render) -> tuple:
+        """(rapport ouvert, servi depuis le cache) ; `render()` renvoie les octets"""
+        return self.get_or_write(kind, params, version, ext, lambda path: _write_bytes(path, render()))
+
+    def get_or_write(self, kind: str, params: dict, version: str, ext: str, write) -> tuple:
+        """Comme get_or_render, pour les rapports écrits directement dans un fichier"""
+        key = self.key(kind, params, version)
+        report = self.get(key, ext)
+        if report is not None:
+            self.hits += 1
+            return report, True
+
+        # Un seul rendu pour des clics simultanés sur le même export
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            report = self.get(key, ext)
+            if report is None:
+                self.misses += 1
+                report = self.put(key, ext, write)
+                hit = False
+            else:
+                self.hits += 1
+                hit = True
+        with self._lock:
+            self._key_locks.pop(key, None)
+        return report, hit
+
+    # ===================== ÉVICTION =====================
+    def _entries(self) -> list:
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self, keep: str | None = None) -> int:
+        """Supprime les fichiers les moins récemment servis au-delà de max_bytes (sauf `keep`)"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue  # Windows : fichier encore ouvert par une réponse en cours
+            total -= size
+            removed += 1
+        self.evictions += removed
+        return removed
+
+    def clear(self):
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    # ===================== MÉTRIQUES =====================
+    def stats(self) -> dict:
+        entries = self._entries()
+        return {
+            "name": "report_cache",
+            "directory": self.directory,
+            "max_bytes": self.max_bytes,
+            "bytes": sum(size for _, size, _ in entries),
+            "files": len(entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+def _write_bytes(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+# ===================== VERSION DES DONNÉES =====================
+def report_version(db: Session, data_type: str, metrics: dict | None = None) -> str:
+    """Change dès que les données affichées par le rapport peuvent changer"""
+    if data_type == "audits":
+        return f"audits:{db.scalar(select(func.max(Audit.id)))}"
+    if data_type not in ("dashboard", "users"):
+        return "static"  # contenu libre : entièrement dans les paramètres
+    metrics = metrics if metrics is not None else metrics_snapshot.get(db)
+    version = f"metrics:{metrics['computed_at'].isoformat()}"
+    if data_type == "users":
+        # Pas de date de modification sur User : effectifs par rôle et statut
+        counts = db.execute(
+            select(User.role, User.status, func.count()).group_by(User.role, User.status)
+            .order_by(User.role, User.status)
+        ).all()
+        version += f":users:{db.scalar(select(func.max(User.id)))}:" + ",".join(
+            f"{role}/{status}={count}" for role, status, count in counts
+        )
+    return version
+
+
+REPORT_CHUNK_SIZE = 64 * 1024
+
+
+def _chunks(report):
+    try:
+        while chunk := report.read(REPORT_CHUNK_SIZE):
+            yield chunk
+    finally:
+        report.close()
+
+
+def report_response(report, media_type: str, filename: str, hit: bool,
+                    headers: dict | None = None) -> StreamingResponse:
+    """Envoie le rapport depuis le descripteur déjà ouvert (voir get/put)"""
+    headers = dict(headers or {})
+    headers["X-Report-Cache"] = "hit" if hit else "miss"
+    headers["Content-Length"] = str(os.fstat(report.fileno()).st_size)
+    quoted = quote(filename)
+    headers["Content-Disposition"] = (
+        f"attachment; filename*=utf-8''{quoted}" if quoted != filename
+        else f'attachment; filename="{filename}"'
+    )
+    # Lecture par blocs dans le pool de threads ; _chunks ferme le descripteur
+    return StreamingResponse(_chunks(report), media_type=media_type, headers=headers)
+
+
+report_cache = ReportCache(
+    directory=os.getenv("REPORT_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "portfolio_report_cache"),
+    max_bytes=int(float(os.getenv("REPORT_CACHE_MAX_MB", 256)) * 1024 * 1024),
+)
@@ -0,0 +1,344 @@
+# services/researcher_profile.py
+"""
+Assemblage du profil public d'un chercheur.
+
+Tout l'agrégat (utilisateur, profil, publications, projets, CV) est chargé en
+un seul aller-retour : chaque collection est agrégée en JSON par une
+sous-requête corrélée (json_agg sur PostgreSQL, json_group_array sur SQLite).
+
+Les profils assemblés sont gardés dans un cache LRU/TTL (profile_cache),
+invalidé via les événements de Session SQLAlchemy dès qu'une écriture
+touchant l'utilisateur, son profil, ses publications, projets ou son CV est
+commitée.
+
+L'annuaire des chercheurs est servi par une seule requête jointe, paginée
+par clé (after_id) plutôt que par OFFSET.
+
+Les variantes *_async servent les routes publiques sur AsyncSession
+(database.get_async_db).
+"""
+import os
+import re
+from itertools import chain
+
+from fastapi import HTTPException
+from sqlalchemy import select, func, literal_column, type_coerce, event, JSON
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+
+from models.user import User
+from models.profile import Profile
+from models.publication import Publication
+from models.project import Project
+from models.cv import TechnicalSkill, SoftSkill, Language, Degree, Experience
+from services.cache import TTLCache
+
+# Collections agrégées : clé -> (modèle, {champ JSON: colonne})
+COLLECTIONS = {
+    "publications": (Publication, {
+        "id": Publication.id,
+        "title": Publication.title,
+        "year": Publication.year,
+    }),
+    "projects": (Project, {
+        "id": Project.id,
+        "title": Project.title,
+        "year": Project.year,
+        "description": Project.description,
+    }),
+    "skills_tech": (TechnicalSkill, {
+        "name": TechnicalSkill.skill_name,
+        "level": TechnicalSkill.level,
+    }),
+    "skills_soft": (SoftSkill, {
+        "name": SoftSkill.skill_name,
+    }),
+    "languages": (Language, {
+        "name": Language.language,
+        "level": Language.level,
+    }),
+    "degrees": (Degree, {
+        "title": Degree.title,
+        "institution": Degree.institution,
+        "year": Degree.year,
+        "description": Degree.description,
+    }),
+    "experiences": (Experience, {
+        "title": Experience.title,
+        "company": Experience.company,
+        "start_date": Experience.start_date,
+        "end_date": Experience.end_date,
+        "description": Experience.description,
+    }),
+}
+
+JSON_DIALECTS = ("postgresql", "sqlite")
+
+# ====================== CACHE ======================
+profile_cache = TTLCache(
+    maxsize=int(os.getenv("PROFILE_CACHE_MAXSIZE", 512)),
+    ttl=float(os.getenv("PROFILE_CACHE_TTL", 300)),
+    name="public_researcher_profiles",
+)
+
+
+# ====================== AGRÉGATION JSON ======================
+def _json_collection(dialect: str, model, fields: dict):
+    """Sous-requête corrélée renvoyant la collection sous forme de tableau JSON"""
+    pairs = []
+    for key, column in fields.items():
+        pairs.extend([literal_column(f"'{key}'"), column])
+
+    if dialect == "postgresql":
+        aggregate = func.json_agg(func.json_build_object(*pairs))
+    else:
+        aggregate = func.json_group_array(func.json_object(*pairs))
+
+    subquery = (
+        select(aggregate)
+        .where(model.profile_id == Profile.id)
+        .scalar_subquery()
+    )
+    return type_coerce(subquery, JSON)
+
+
+def _load_collections(db: Session, profile: Profile | None) -> dict:
+    """Chargement collection par collection (dialectes sans agrégation JSON)"""
+    collections = {}
+    for key, (model, fields) in COLLECTIONS.items():
+        rows = []
+        if profile:
+            rows = db.execute(
+                select(*fields.values()).where(model.profile_id == profile.id)
+            ).all()
+        collections[key] = [dict(zip(fields.keys(), row)) for row in rows]
+    return collections
+
+
+def _format_date(value):
+    if value is None:
+        return None
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+# ====================== SÉRIALISATION ======================
+def serialize_public_profile(user: User, profile: Profile | None, collections: dict) -> dict:
+    """Construit le JSON public attendu par le frontend"""
+    name = user.email.split('@')[0]
+    if profile:
+        if profile.first_name or profile.last_name:
+            name = f"{profile.first_name or ''} {profile.last_name or ''}".strip()
+
+    publications = sorted(collections["publications"], key=lambda p: p["id"])
+    projects = sorted(collections["projects"], key=lambda p: p["id"])
+
+    return {
+        "id": user.id,
+        "email": user.email,
+        "slug": user.slug,
+        "name": name,
+        "firstName": profile.first_name if profile else "",
+        "lastName": profile.last_name if profile else "",
+        "profession": profile.grade if profile else "",
+        "bio": profile.bio if profile else "",
+        "cvUrl": profile.cv_url if profile else "",
+        "avatar": profile.profile_picture if profile else "",
+        "publications": [
+            {
+                "id": pub["id"],
+                "title": pub["title"],
+                "year": pub["year"],
+                "description": "",
+                "link": ""
+            }
+            for pub in publications
+        ],
+        "projects": [
+            {
+                "id": proj["id"],
+                "title": proj["title"],
+                "year": proj["year"],
+                "description": proj["description"] if proj["description"] else "",
+                "link": ""
+            }
+            for proj in projects
+        ],
+        "cv": {
+            "skills_tech": collections["skills_tech"],
+            "skills_soft": collections["skills_soft"],
+            "languages": collections["languages"],
+            "degrees": collections["degrees"],
+            "experiences": [
+                {
+                    "title": e["title"],
+                    "company": e["company"],
+                    "start_date": _format_date(e["start_date"]),
+                    "end_date": _format_date(e["end_date"]),
+                    "description": e["description"]
+                }
+                for e in collections["experiences"]
+            ]
+        }
+    }
+
+
+# ====================== POINT D'ENTRÉE ======================
+def get_public_researcher(db: Session, *, slug: str | None = None, user_id: int | None = None) -> dict | None:
+    """
+    Retourne le profil public d'un chercheur actif (par slug ou par ID),
+    ou None s'il n'existe pas.
+    """
+    cache_key = ("slug", slug) if slug is not None else ("id", user_id)
+    cached = profile_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    dialect = db.get_bind().dialect.name
+    use_json = dialect in JSON_DIALECTS
+
+    columns = [User, Profile]
+    if use_json:
+        columns += [
+            _json_collection(dialect, model, fields).label(key)
+            for key, (model, fields) in COLLECTIONS.items()
+        ]
+
+    stmt = (
+        select(*columns)
+        .outerjoin(Profile, Profile.user_id == User.id)
+        .where(User.role == "researcher", User.status == "active")
+    )
+    if slug is not None:
+        stmt = stmt.where(User.slug == slug)
+    else:
+        stmt = stmt.where(User.id == user_id)
+
+    row = db.execute(stmt.limit(1)).first()
+    if not row:
+        return None
+
+    user, profile = row[0], row[1]
+    if use_json:
+        collections = {key: row._mapping[key] or [] for key in COLLECTIONS}
+    else:
+        collections = _load_collections(db, profile)
+
+    payload = serialize_public_profile(user, profile, collections)
+
+    tags = [f"user:{user.id}"]
+    if profile:
+        tags.append(f"profile:{profile.id}")
+    profile_cache.set(cache_key, payload, tags=tags)
+    return payload
+
+
+async def get_public_researcher_async(db: AsyncSession, *, slug: str | None = None,
+                                      user_id: int | None = None) -> dict | None:
+    """
+    get_public_researcher() sur une AsyncSession : même assemblage, exécuté
+    sur la connexion asynchrone (un succès de cache ne touche pas la base).
+    """
+    return await db.run_sync(get_public_researcher, slug=slug, user_id=user_id)
+
+
+# ====================== INVALIDATION DU CACHE ======================
+PROFILE_CHILD_MODELS = tuple(model for model, _ in COLLECTIONS.values())
+
+# Le CRUD du CV (routes/cv.py) écrit en SQL brut : on repère ces écritures
+_RAW_CV_WRITE = re.compile(
+    r"^\s*(INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+"
+    r"(technical_skills|soft_skills|languages|degrees|experiences)\b",
+    re.IGNORECASE,
+)
+
+PENDING_TAGS_KEY = "profile_cache_tags"
+
+
+def _invalidation_tags(obj) -> list:
+    if isinstance(obj, User):
+        return [f"user:{obj.id}"]
+    if isinstance(obj, Profile):
+        return [f"user:{obj.user_id}", f"profile:{obj.id}"]
+    if isinstance(obj, PROFILE_CHILD_MODELS):
+        return [f"profile:{obj.profile_id}"]
+    return []
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_orm_writes(session, flush_context):
+    pending = session.info.setdefault(PENDING_TAGS_KEY, set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        pending.update(_invalidation_tags(obj))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_raw_cv_writes(orm_execute_state):
+    statement = orm_execute_state.statement
+    if not isinstance(statement, TextClause) or not _RAW_CV_WRITE.match(statement.text):
+        return
+    params = orm_execute_state.parameters
+    if isinstance(params, dict) and params.get("pid") is not None:
+        pending = orm_execute_state.session.info.setdefault(PENDING_TAGS_KEY, set())
+        pending.add(f"profile:{params['pid']}")
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_on_commit(session):
+    tags = session.info.pop(PENDING_TAGS_KEY, None)
+    if tags:
+        profile_cache.invalidate_tags(tags)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop(PENDING_TAGS_KEY, None)
+
+
+# ====================== ANNUAIRE DES CHERCHEURS ======================
+def public_researchers_stmt(after_id: int | None = None, limit: int | None = None):
+    """
+    Chercheurs actifs avec leur profil, en une seule requête jointe.
+    Pagination par clé : seuls les chercheurs d'ID > after_id sont renvoyés.
+    """
+    stmt = (
+        select(User, Profile)
+        .outerjoin(Profile, Profile.user_id == User.id)
+        .where(User.role == "researcher", User.status == "active")
+        .order_by(User.id)
+    )
+    if after_id is not None:
+        stmt = stmt.where(User.id > after_id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def list_public_researchers(db: Session, after_id: int | None = None, limit: int | None = None) -> list:
+    return db.execute(public_researchers_stmt(after_id, limit)).all()
+
+
+async def list_public_researchers_async(db: AsyncSession, after_id: int | None = None,
+                                        limit: int | None = None) -> list:
+    return (await db.execute(public_researchers_stmt(after_id, limit))).all()
+
+
+def parse_fields(fields: str | None, allowed: tuple) -> tuple | None:
+    """Valide le paramètre ?fields=a,b,c (None = tous les champs)"""
+    if not fields:
+        return None
+    requested = tuple(f.strip() for f in fields.split(",") if f.strip())
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Champs inconnus: {', '.join(unknown)}. Champs disponibles: {', '.join(allowed)}"
+        )
+    return requested
+
+
+def project(item: dict, fields: tuple | None) -> dict:
+    """Ne conserve que les champs demandés"""
+    if fields is None:
+        return item
+    return {key: item[key] for key in fields}
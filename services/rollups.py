@@ -0,0 +1,286 @@
+# services/rollups.py
+"""
+Tables de cumul (rollups) pour les graphiques.
+
+Les graphiques ne lisent plus les tables brutes : ils lisent des compteurs
+pré-agrégés, dont la taille dépend du nombre de périodes et non du nombre
+d'audits ou de messages.
+
+- audit_rollups : audits par heure et par jour, rôle et type d'action
+  (Audit.action_code) ;
+- message_rollups : messages de contact par mois.
+
+Maintenance :
+- incrémentale : les insertions ORM sont relevées au flush puis cumulées
+  juste après le commit, dans une courte transaction séparée (les lignes de
+  cumul partagées, heure et jour courants, ne restent pas verrouillées
+  pendant toute la requête) ; les lots d'AuditWriter.flush() sont cumulés
+  dans la transaction du lot ;
+- rattrapage : rebuild_rollups() recalcule depuis les tables brutes
+  (`python -m services.rollups --since 2026-01-01` ou
+  POST /admin/rollups/rebuild), et rattrape aussi un cumul perdu entre
+  commit et mise à jour (arrêt brutal).
+
+Les audits sont en ajout seul : les cumuls survivent à la purge des lignes
+brutes (audit_retention), et rebuild_rollups() ne recalcule jamais les mois
+purgés. Les messages supprimés via l'ORM sont décomptés.
+
+bucket_expr() est l'unique point qui connaît les fonctions de date de chaque
+dialecte (date_trunc sur PostgreSQL, strftime sur SQLite, date_format sur
+MySQL).
+"""
+from collections import Counter
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, event, func, insert, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models.audit import Audit, AuditAction, classify_action
+from models.message_contact import MessageContact
+from models.stats_rollup import AuditRollup, MessageRollup
+
+ROLLUP_GRANULARITIES = ("hour", "day")
+BUCKETS = ("hour", "day", "month")
+
+LABEL_FORMATS = {"hour": "%Y-%m-%d %H:00", "day": "%Y-%m-%d", "month": "%Y-%m"}
+
+
+# ===================== BUCKETS =====================
+def bucket_expr(column, granularity: str, dialect: str):
+    """Expression SQL du début de période de `column` pour le dialecte donné"""
+    if granularity not in BUCKETS:
+        raise ValueError(f"Granularité inconnue : {granularity}")
+    if dialect == "postgresql":
+        return func.date_trunc(granularity, column)
+    if dialect == "sqlite":
+        fmt = {"hour": "%Y-%m-%d %H:00:00", "day": "%Y-%m-%d 00:00:00", "month": "%Y-%m-01 00:00:00"}
+        return func.strftime(fmt[granularity], column)
+    if dialect in ("mysql", "mariadb"):
+        fmt = {"hour": "%Y-%m-%d %H:00:00", "day": "%Y-%m-%d 00:00:00", "month": "%Y-%m-01 00:00:00"}
+        return func.date_format(column, fmt[granularity])
+    raise ValueError(f"Dialecte non supporté pour les rollups : {dialect}")
+
+
+def bucket_start(value: datetime, granularity: str) -> datetime:
+    """Début de période (naïf, UTC) d'une date Python"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    value = value.replace(minute=0, second=0, microsecond=0)
+    if granularity in ("day", "month"):
+        value = value.replace(hour=0)
+    if granularity == "month":
+        value = value.replace(day=1)
+    return value
+
+
+def _as_datetime(value) -> datetime:
+    # strftime (SQLite) et date_format (MySQL) renvoient du texte
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def format_bucket(value: datetime, granularity: str) -> str:
+    return value.strftime(LABEL_FORMATS[granularity])
+
+
+# ===================== MAINTENANCE INCRÉMENTALE =====================
+def _upsert_counts(conn, table, keys: list, rows: list):
+    """Ajoute rows[i]["count"] aux compteurs existants (création si absent)"""
+    if not rows:
+        return
+    dialect = conn.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={"count": table.c.count + stmt.excluded["count"]},
+        )
+        conn.execute(stmt, rows)
+        return
+
+    for row in rows:
+        where = [table.c[key] == row[key] for key in keys]
+        result = conn.execute(update(table).where(*where).values(count=table.c.count + row["count"]))
+        if result.rowcount == 0:
+            conn.execute(insert(table).values(**row))
+
+
+def record_audits(conn, audits: list):
+    """Cumule des audits (dicts user_role / action_code / action_description / date)"""
+    counter = Counter()
+    for audit in audits:
+        date = audit.get("date") or datetime.now(timezone.utc)
+        code = audit.get("action_code")
+        action = AuditAction(code).value if code else classify_action(audit.get("action_description")).value
+        for granularity in ROLLUP_GRANULARITIES:
+            counter[(granularity, bucket_start(date, granularity), audit.get("user_role") or "unknown", action)] += 1
+
+    rows = [
+        {"granularity": g, "bucket_start": b, "user_role": role, "action_type": action, "count": n}
+        for (g, b, role, action), n in counter.items()
+    ]
+    _upsert_counts(conn, AuditRollup.__table__, ["granularity", "bucket_start", "user_role", "action_type"], rows)
+
+
+def record_messages(conn, created_ats: list, sign: int = 1):
+    """Cumule (ou décompte avec sign=-1) des messages par mois"""
+    counter = Counter(bucket_start(d or datetime.now(timezone.utc), "month") for d in created_ats)
+    rows = [{"bucket_start": b, "count": sign * n} for b, n in counter.items()]
+    _upsert_counts(conn, MessageRollup.__table__, ["bucket_start"], rows)
+
+
+@event.listens_for(Session, "before_flush")
+def _load_deleted_messages(session, flush_context, instances):
+    # created_at doit être chargé avant la suppression pour pouvoir décompter
+    for obj in session.deleted:
+        if isinstance(obj, MessageContact):
+            obj.created_at
+
+
+PENDING_ROLLUPS_KEY = "pending_rollups"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_rollups(session, flush_context):
+    audits = [obj for obj in session.new if isinstance(obj, Audit)]
+    new_messages = [obj.created_at for obj in session.new if isinstance(obj, MessageContact)]
+    deleted_messages = [obj.created_at for obj in session.deleted if isinstance(obj, MessageContact)]
+    if not (audits or new_messages or deleted_messages):
+        return
+
+    pending = session.info.setdefault(PENDING_ROLLUPS_KEY, {"audits": [], "messages": [], "deleted": []})
+    pending["audits"] += [
+        {"user_role": a.user_role, "action_code": a.action_code,
+         "action_description": a.action_description, "date": a.date}
+        for a in audits
+    ]
+    pending["messages"] += new_messages
+    pending["deleted"] += deleted_messages
+
+
+@event.listens_for(Session, "after_commit")
+def _rollup_on_commit(session):
+    pending = session.info.pop(PENDING_ROLLUPS_KEY, None)
+    if not pending:
+        return
+    bind = session.get_bind()
+    engine = bind if isinstance(bind, Engine) else bind.engine
+    try:
+        # Option "rollups" : transaction de suivi, distincte de celle de la requête
+        with engine.connect().execution_options(rollups=True) as conn, conn.begin():
+            record_audits(conn, pending["audits"])
+            record_messages(conn, pending["messages"])
+            record_messages(conn, pending["deleted"], sign=-1)
+    except Exception as e:
+        print(f"⚠️  Cumuls non mis à jour (rattrapage : rebuild_rollups) : {e}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rollups(session):
+    session.info.pop(PENDING_ROLLUPS_KEY, None)
+
+
+# ===================== RATTRAPAGE =====================
+def rebuild_rollups(db: Session, since: datetime | None = None) -> dict:
+    """
+    Recalcule les rollups depuis les tables brutes (tout, ou depuis `since`).
+    Les audits ne sont recalculés qu'à partir du plus ancien mois encore en
+    base : les mois purgés par la rétention gardent leurs cumuls.
+    """
+    dialect = db.get_bind().dialect.name
+    message_since = bucket_start(since, "month") if since else None
+
+    first_audit = db.scalar(select(func.min(Audit.date)))
+    audit_since = None
+    if first_audit is not None:
+        audit_since = bucket_start(_as_datetime(first_audit), "month")
+        if since:
+            audit_since = max(audit_since, bucket_start(since, "day"))
+
+    purge_messages = delete(MessageRollup)
+    if since:
+        purge_messages = purge_messages.where(MessageRollup.bucket_start >= message_since)
+    if audit_since is not None:
+        db.execute(delete(AuditRollup).where(AuditRollup.bucket_start >= audit_since))
+    db.execute(purge_messages)
+
+    audit_rows = []
+    for granularity in ROLLUP_GRANULARITIES if audit_since is not None else ():
+        bucket = bucket_expr(Audit.date, granularity, dialect).label("bucket")
+        stmt = select(bucket, Audit.user_role, Audit.action_code, func.count(Audit.id)).where(
+            Audit.date >= audit_since
+        )
+        stmt = stmt.group_by(bucket, Audit.user_role, Audit.action_code)
+        audit_rows += [
+            {"granularity": granularity, "bucket_start": _as_datetime(b), "user_role": role,
+             "action_type": AuditAction(a).value, "count": n}
+            for b, role, a, n in db.execute(stmt)
+        ]
+
+    month = bucket_expr(MessageContact.created_at, "month", dialect).label("bucket")
+    stmt = select(month, func.count(MessageContact.id)).where(MessageContact.created_at.is_not(None))
+    if since:
+        stmt = stmt.where(MessageContact.created_at >= message_since)
+    message_rows = [
+        {"bucket_start": _as_datetime(b), "count": n}
+        for b, n in db.execute(stmt.group_by(month))
+    ]
+
+    if audit_rows:
+        db.execute(insert(AuditRollup), audit_rows)
+    if message_rows:
+        db.execute(insert(MessageRollup), message_rows)
+    db.commit()
+    return {"audit_rollups": len(audit_rows), "message_rollups": len(message_rows)}
+
+
+# ===================== LECTURE =====================
+def audit_series(db: Session, start: datetime | None = None, end: datetime | None = None,
+                 bucket: str = "day") -> list:
+    """[(début de période, nombre d'audits)] entre start et end (bornes incluses)"""
+    source = "hour" if bucket == "hour" else "day"
+    if bucket in ROLLUP_GRANULARITIES:
+        period = AuditRollup.bucket_start
+    else:
+        period = bucket_expr(AuditRollup.bucket_start, bucket, db.get_bind().dialect.name)
+    period = period.label("bucket")
+
+    stmt = select(period, func.sum(AuditRollup.count)).where(AuditRollup.granularity == source)
+    if start:
+        stmt = stmt.where(AuditRollup.bucket_start >= bucket_start(start, bucket))
+    if end:
+        stmt = stmt.where(AuditRollup.bucket_start <= bucket_start(end, source))
+    stmt = stmt.group_by(period).order_by(period)
+    return [(_as_datetime(b), int(n)) for b, n in db.execute(stmt) if n]
+
+
+def message_series(db: Session, start: datetime | None = None, end: datetime | None = None) -> list:
+    """[(mois, nombre de messages)] entre start et end (bornes incluses)"""
+    stmt = select(MessageRollup.bucket_start, MessageRollup.count).where(MessageRollup.count > 0)
+    if start:
+        stmt = stmt.where(MessageRollup.bucket_start >= bucket_start(start, "month"))
+    if end:
+        stmt = stmt.where(MessageRollup.bucket_start <= bucket_start(end, "month"))
+    return [(b, n) for b, n in db.execute(stmt.order_by(MessageRollup.bucket_start))]
+
+
+if __name__ == "__main__":
+    import argparse
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Recalcule les tables de cumul des graphiques")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None,
+                        help="date de début (AAAA-MM-JJ) ; tout l'historique par défaut")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print(f"✅ Rollups recalculés : {rebuild_rollups(db, args.since)}")
+    finally:
+        db.close()
@@ -0,0 +1,874 @@
+# services/search.py
+"""
+Recherche plein texte (GET /search) : projets, publications, cours et
+chercheurs publics.
+
+Deux moteurs, même analyse (accents ignorés, radicaux FR/EN, mots vides
+retirés), même pondération des champs (A titre/nom > B > C) et même forme
+de résultat (classement, pagination, extrait surligné) :
+
+- PostgreSQL : colonne `search_vector tsvector` sur projects, publications,
+  cours et profiles, tenue à jour par trigger (ensure_search_schema) et
+  indexée en GIN ; classement ts_rank_cd, extraits ts_headline calculés
+  sur la seule page demandée.
+- Sinon (SQLite...) : index inversé en mémoire (SearchIndex), construit
+  dans un thread dès le démarrage (503 tant qu'il n'est pas prêt) puis mis
+  à jour par les événements ORM (commits, écritures SQL brut du CV) ;
+  classement BM25. Reconstruction complète en tâche de fond toutes les
+  SEARCH_INDEX_MAX_AGE_S secondes (écritures hors ORM), l'index précédent
+  restant servi entre-temps.
+
+SEARCH_BACKEND=memory force l'index mémoire, y compris sur PostgreSQL.
+Le schéma PostgreSQL est créé par la migration add_search_vectors et
+seulement vérifié au démarrage ; tant qu'il manque, l'index mémoire prend
+le relais.
+"""
+import heapq
+import html
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import chain
+
+from sqlalchemy import event, or_, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.elements import TextClause
+
+from models.cours import Cours
+from models.cv import SoftSkill, TechnicalSkill
+from models.profile import Profile
+from models.project import Project
+from models.publication import Publication
+from models.user import User
+
+SEARCH_TYPES = ("project", "publication", "cours", "researcher")
+FIELD_WEIGHTS = {"A": 3.0, "B": 1.5, "C": 1.0}
+MAX_QUERY_LENGTH = 200
+SNIPPET_WORDS = 30
+MARK_START, MARK_STOP = "\x02", "\x03"
+
+
+# ====================== ANALYSE DU TEXTE ======================
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+STOPWORDS = frozenset("""
+    au aux avec ce ces cet cette dans de des du elle elles en est et il ils je la le les
+    leur leurs lui ma mais me mes moi mon ne nos notre nous on ou par pas plus pour qu que
+    qui sa sans se ses son sont sur ta te tes toi ton tu un une vos votre vous
+    a an and are as at be by for from in into is it its of on or that the these this
+    those to was were with
+""".split())
+
+# Suffixes retirés (le plus long d'abord), puis s/x/e finaux : un radical
+# « léger », commun au français et à l'anglais (robotique, robotiques,
+# robotics -> robot ; nationaux, nationalité -> national)
+SUFFIXES = sorted([
+    ("issements", "is"), ("issement", "is"),
+    ("ations", ""), ("ation", ""), ("atrices", ""), ("atrice", ""), ("ateurs", ""), ("ateur", ""),
+    ("ements", ""), ("ement", ""), ("ments", ""), ("ment", ""),
+    ("iques", ""), ("ique", ""), ("ics", ""),
+    ("euses", ""), ("euse", ""), ("eurs", ""), ("eur", ""), ("eux", ""),
+    ("ities", ""), ("ity", ""), ("ites", ""), ("ite", ""),
+    ("ives", ""), ("ive", ""), ("ings", ""), ("ing", ""), ("ness", ""),
+    ("ies", "y"), ("aux", "al"), ("ers", ""), ("er", ""), ("ed", ""),
+], key=lambda s: len(s[0]), reverse=True)
+MIN_STEM = 3
+
+
+def fold(word: str) -> str:
+    """Minuscules sans accents (Étude -> etude)"""
+    decomposed = unicodedata.normalize("NFKD", word.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def stem(word: str) -> str:
+    if word.isdigit() or len(word) <= MIN_STEM:
+        return word
+    for suffix, replacement in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) + len(replacement) >= MIN_STEM:
+            word = word[:-len(suffix)] + replacement
+            break
+    while len(word) > MIN_STEM and word[-1] in "sxe":
+        word = word[:-1]
+    return word
+
+
+@lru_cache(maxsize=65536)
+def term(token: str) -> str | None:
+    """Terme indexé d'un mot, None pour un mot vide (vocabulaire borné : mis en cache)"""
+    folded = fold(token)
+    if len(folded) < 2 or folded in STOPWORDS:
+        return None
+    return stem(folded)
+
+
+def analyze(value: str | None) -> list:
+    if not value:
+        return []
+    return [t for t in (term(token) for token in TOKEN_RE.findall(value)) if t]
+
+
+def highlight(value: str, terms: set, size: int = SNIPPET_WORDS) -> str:
+    """Extrait HTML échappé autour du premier terme trouvé, termes entre <mark>"""
+    words = list(TOKEN_RE.finditer(value or ""))
+    if not words:
+        return ""
+    hits = [term(w.group()) in terms for w in words]
+    first = hits.index(True) if True in hits else 0
+    start = max(0, first - size // 3)
+    end = min(len(words), start + size)
+
+    parts = ["… " if start > 0 else ""]
+    position = words[start].start()
+    for word, hit in zip(words[start:end], hits[start:end]):
+        parts.append(html.escape(value[position:word.start()]))
+        escaped = html.escape(word.group())
+        parts.append(f"<mark>{escaped}</mark>" if hit else escaped)
+        position = word.end()
+    parts.append(" …" if end < len(words) else html.escape(value[position:]))
+    return "".join(parts)
+
+
+def shorten(value: str | None, length: int = 100) -> str:
+    if value and len(value) > length:
+        return value[:length] + "..."
+    return value or ""
+
+
+def result_url(kind: str, id: int, slug: str | None = None) -> str:
+    if kind == "project":
+        return f"/portfolio?highlight={id}"
+    if kind == "publication":
+        return f"/publications?highlight={id}"
+    if kind == "cours":
+        return f"/cours?highlight={id}"
+    return f"/researcher/public/slug/{slug}" if slug else f"/researcher/public/id/{id}"
+
+
+def parse_types(types: str | None) -> tuple:
+    """'project,cours' -> ('project', 'cours') ; ValueError sur un type inconnu"""
+    if not types:
+        return SEARCH_TYPES
+    wanted = tuple(dict.fromkeys(t.strip() for t in types.split(",") if t.strip()))
+    unknown = [t for t in wanted if t not in SEARCH_TYPES]
+    if unknown:
+        raise ValueError(f"Type(s) inconnu(s) : {', '.join(unknown)} (attendus : {', '.join(SEARCH_TYPES)})")
+    return wanted or SEARCH_TYPES
+
+
+# ====================== DOCUMENTS ======================
+@dataclass
+class Document:
+    kind: str
+    id: int
+    title: str
+    description: str
+    body: str
+    fields: list                  # [(texte, poids A/B/C)]
+    slug: str | None = None
+    profile_id: int | None = None
+    terms: dict = field(default_factory=dict)   # terme -> fréquence pondérée
+    length: float = 0.0
+
+    @property
+    def key(self) -> tuple:
+        return (self.kind, self.id)
+
+    def analyze(self):
+        self.terms = defaultdict(float)
+        for value, weight in self.fields:
+            for t in analyze(value):
+                self.terms[t] += FIELD_WEIGHTS[weight]
+        self.length = sum(self.terms.values())
+        return self
+
+
+def _names(coauthor) -> str:
+    return ", ".join(str(a) for a in coauthor) if isinstance(coauthor, list) else ""
+
+
+def _join(*values) -> str:
+    return " ".join(v for v in values if v)
+
+
+def _body(*values) -> str:
+    return " — ".join(v for v in values if v)
+
+
+def _load_projects(session: Session, ids=None) -> list:
+    stmt = select(Project.id, Project.title, Project.description, Project.coauthor)
+    if ids is not None:
+        stmt = stmt.where(Project.id.in_(ids))
+    docs = []
+    for row in session.execute(stmt):
+        names = _names(row.coauthor)
+        docs.append(Document(
+            "project", row.id, row.title, shorten(row.description), _body(row.description, names),
+            [(row.title, "A"), (row.description, "B"), (names, "C")],
+        ))
+    return docs
+
+
+def _load_publications(session: Session, ids=None) -> list:
+    stmt = select(Publication.id, Publication.title, Publication.journal, Publication.coauthor)
+    if ids is not None:
+        stmt = stmt.where(Publication.id.in_(ids))
+    docs = []
+    for row in session.execute(stmt):
+        names = _names(row.coauthor)
+        docs.append(Document(
+            "publication", row.id, row.title, f"Auteurs: {names} | Journal: {row.journal or 'N/A'}",
+            _body(row.journal, names), [(row.title, "A"), (row.journal, "B"), (names, "C")],
+        ))
+    return docs
+
+
+def _load_cours(session: Session, ids=None) -> list:
+    stmt = select(Cours.id, Cours.title, Cours.description, Cours.curricula)
+    if ids is not None:
+        stmt = stmt.where(Cours.id.in_(ids))
+    return [
+        Document(
+            "cours", row.id, row.title, shorten(row.description), _body(row.description, row.curricula),
+            [(row.title, "A"), (row.description, "B"), (row.curricula, "C")],
+        )
+        for row in session.execute(stmt)
+    ]
+
+
+def _load_researchers(session: Session, user_ids=None, profile_ids=None) -> list:
+    """Chercheurs actifs (comme l'annuaire public), identifiés par l'id utilisateur"""
+    stmt = (
+        select(User.id, User.slug, Profile.id.label("profile_id"), Profile.first_name, Profile.last_name,
+               Profile.grade, Profile.specialite, Profile.diplome, Profile.bio, Profile.description)
+        .join(Profile, Profile.user_id == User.id)
+        .where(User.role == "researcher", User.status == "active")
+    )
+    if user_ids is not None or profile_ids is not None:
+        stmt = stmt.where(or_(User.id.in_(user_ids or ()), Profile.id.in_(profile_ids or ())))
+    rows = session.execute(stmt).all()
+
+    skills = defaultdict(list)
+    profile_ids = [row.profile_id for row in rows]
+    for model in (TechnicalSkill, SoftSkill):
+        if profile_ids:
+            for profile_id, name in session.execute(
+                select(model.profile_id, model.skill_name).where(model.profile_id.in_(profile_ids))
+            ):
+                skills[profile_id].append(name)
+
+    docs = []
+    for row in rows:
+        name = _join(row.first_name, row.last_name)
+        about = _join(row.specialite, row.grade, row.diplome)
+        skill_names = " ".join(skills[row.profile_id])
+        docs.append(Document(
+            "researcher", row.id, name, row.specialite or row.grade or "",
+            _body(about, skill_names, row.bio or row.description),
+            [(name, "A"), (about, "B"), (skill_names, "B"), (_join(row.bio, row.description), "C")],
+            slug=row.slug, profile_id=row.profile_id,
+        ))
+    return docs
+
+
+LOADERS = {"project": _load_projects, "publication": _load_publications, "cours": _load_cours}
+
+
+# ====================== INDEX EN MÉMOIRE (BM25) ======================
+class SearchIndexBuilding(Exception):
+    """Première construction de l'index en cours (tâche de fond) : réessayer plus tard"""
+
+
+class SearchIndex:
+    def __init__(self, max_age: float = 600.0, k1: float = 1.2, b: float = 0.75,
+                 background: bool = True, session_factory=None):
+        self.max_age = max_age
+        self.k1 = k1
+        self.b = b
+        # Construction complète dans un thread, avec sa propre Session (fabrique
+        # synchrone, posée au démarrage) ; sans fabrique : dans la requête
+        self.background = background
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._building = False
+        self._pending = None                   # écritures pendant une construction
+        self._docs = {}                        # (type, id) -> Document
+        self._postings = defaultdict(dict)     # terme -> {(type, id): fréquence}
+        self._profile_users = {}               # profile_id -> user_id
+        self._total_length = 0.0
+        self._dirty = set()
+        self._built_at = None
+
+        self.builds = 0
+        self.background_builds = 0
+        self.refreshes = 0
+        self.queries = 0
+
+    @property
+    def built(self) -> bool:
+        return self._built_at is not None
+
+    # ===================== CONSTRUCTION =====================
+    def build(self, session: Session):
+        with self._lock:
+            self._pending = set()
+        docs = [doc for load in LOADERS.values() for doc in load(session)]
+        docs += _load_researchers(session)
+        with self._lock:
+            self._docs, self._postings, self._profile_users = {}, defaultdict(dict), {}
+            self._total_length = 0.0
+            # Écritures validées pendant la lecture : relues au prochain refresh()
+            self._dirty, self._pending = self._pending or set(), None
+            for doc in docs:
+                self._add(doc)
+            self._built_at = time.monotonic()
+            self.builds += 1
+
+    def build_in_background(self) -> bool:
+        with self._lock:
+            if self._building or self.session_factory is None:
+                return False
+            self._building = True
+        threading.Thread(target=self._background_build, name="search-index-build", daemon=True).start()
+        return True
+
+    def _background_build(self):
+        db = self.session_factory()
+        try:
+            self.build(db)
+            self.background_builds += 1
+        except Exception as e:
+            print(f"⚠️  Construction de l'index de recherche impossible : {e}")
+        finally:
+            db.close()
+            with self._lock:
+                self._building = False
+
+    def clear(self):
+        with self._lock:
+            self._docs, self._postings, self._profile_users = {}, defaultdict(dict), {}
+            self._total_length = 0.0
+            self._dirty = set()
+            self._pending = None
+            self._built_at = None
+
+    def _add(self, doc: Document):
+        self._remove(doc.key)
+        doc.analyze()
+        self._docs[doc.key] = doc
+        for t, frequency in doc.terms.items():
+            self._postings[t][doc.key] = frequency
+        self._total_length += doc.length
+        if doc.profile_id is not None:
+            self._profile_users[doc.profile_id] = doc.id
+
+    def _remove(self, key: tuple):
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+        for t in doc.terms:
+            postings = self._postings.get(t)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[t]
+        self._total_length -= doc.length
+
+    # ===================== MISE À JOUR INCRÉMENTALE =====================
+    def mark_dirty(self, keys):
+        """Clés ('project', id), ('profile', id), ('user', id)... écrites en base (ignorées hors index)"""
+        with self._lock:
+            if self._pending is not None:
+                self._pending.update(keys)
+            if self.built:
+                self._dirty.update(keys)
+
+    def refresh(self, session: Session):
+        """Relit en base les seuls documents modifiés depuis la dernière recherche"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return
+        by_kind = defaultdict(set)
+        for kind, id in dirty:
+            by_kind[kind].add(id)
+
+        try:
+            loaded = {kind: LOADERS[kind](session, ids) for kind, ids in by_kind.items() if kind in LOADERS}
+            researchers = None
+            if by_kind["user"] or by_kind["profile"]:
+                researchers = _load_researchers(session, by_kind["user"], by_kind["profile"])
+        except Exception:
+            with self._lock:
+                self._dirty |= dirty
+            raise
+
+        with self._lock:
+            for kind, docs in loaded.items():
+                for id in by_kind[kind] - {doc.id for doc in docs}:
+                    self._remove((kind, id))  # supprimé
+                for doc in docs:
+                    self._add(doc)
+            if researchers is not None:
+                stale = set(by_kind["user"]) | {
+                    self._profile_users.get(pid) for pid in by_kind["profile"]
+                }
+                for user_id in stale - {doc.id for doc in researchers} - {None}:
+                    self._remove(("researcher", user_id))  # supprimé, désactivé ou sans profil
+                for doc in researchers:
+                    self._add(doc)
+            self.refreshes += 1
+
+    def ensure_fresh(self, session: Session):
+        """
+        Index à jour pour une requête : seules les relectures incrémentales
+        passent par `session` ; construction et reconstruction périodique
+        tournent en tâche de fond, l'index précédent restant servi.
+        """
+        expired = not self.built or time.monotonic() - self._built_at > self.max_age
+        if not (self.background and self.session_factory is not None):
+            if expired:
+                self.build(session)
+            else:
+                self.refresh(session)
+            return
+        if expired:
+            self.build_in_background()
+        if not self.built:
+            raise SearchIndexBuilding("Index de recherche en construction")
+        self.refresh(session)
+
+    # ===================== RECHERCHE =====================
+    def search(self, query: str, types=SEARCH_TYPES, page: int = 1, per_page: int = 10) -> tuple:
+        """(total, [(score, Document)]) : documents contenant tous les termes, BM25 décroissant"""
+        terms = list(dict.fromkeys(analyze(query)))
+        with self._lock:
+            self.queries += 1
+            if not terms:
+                return 0, []
+            postings = [self._postings.get(t) for t in terms]
+            if not all(postings):
+                return 0, []
+            postings.sort(key=len)
+            candidates = [key for key in postings[0] if key[0] in types
+                          and all(key in p for p in postings[1:])]
+
+            n = len(self._docs)
+            avg_length = self._total_length / n if n else 0.0
+            idf = [math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for p in postings]
+            scored = []
+            for key in candidates:
+                doc = self._docs[key]
+                norm = self.k1 * (1 - self.b + self.b * doc.length / avg_length) if avg_length else self.k1
+                score = sum(w * p[key] * (self.k1 + 1) / (p[key] + norm) for w, p in zip(idf, postings))
+                scored.append((score, doc))
+
+        # Seuls les `page * per_page` premiers sont triés
+        start = (page - 1) * per_page
+        top = heapq.nsmallest(start + per_page, scored, key=lambda item: (-item[0], item[1].kind, item[1].id))
+        return len(scored), top[start:]
+
+    # ===================== MÉTRIQUES =====================
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "built": self.built,
+                "building": self._building,
+                "background": self.background,
+                "age_s": round(time.monotonic() - self._built_at, 1) if self.built else None,
+                "max_age_s": self.max_age,
+                "documents": len(self._docs),
+                "terms": len(self._postings),
+                "dirty": len(self._dirty),
+                "builds": self.builds,
+                "background_builds": self.background_builds,
+                "refreshes": self.refreshes,
+                "queries": self.queries,
+            }
+
+
+search_index = SearchIndex(
+    max_age=float(os.getenv("SEARCH_INDEX_MAX_AGE_S", 600)),
+    background=os.getenv("SEARCH_INDEX_BACKGROUND_BUILD", "1") == "1",
+)
+
+
+# ====================== SUIVI DES ÉCRITURES ======================
+# Le CRUD du CV (routes/cv.py) écrit les compétences en SQL brut
+_RAW_SKILL_WRITE = re.compile(
+    r"^\s*(INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+(technical_skills|soft_skills)\b",
+    re.IGNORECASE,
+)
+
+PENDING_KEYS = "search_index_keys"
+
+
+def _index_keys(obj) -> list:
+    if isinstance(obj, Project):
+        return [("project", obj.id)]
+    if isinstance(obj, Publication):
+        return [("publication", obj.id)]
+    if isinstance(obj, Cours):
+        return [("cours", obj.id)]
+    if isinstance(obj, User):
+        return [("user", obj.id)]
+    if isinstance(obj, Profile):
+        return [("profile", obj.id), ("user", obj.user_id)]
+    if isinstance(obj, (TechnicalSkill, SoftSkill)):
+        return [("profile", obj.profile_id)]
+    return []
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_index_writes(session, flush_context):
+    # Toujours collecté : une écriture validée pendant la première construction
+    # (thread de fond) doit être relue ensuite ; mark_dirty() trie
+    pending = session.info.setdefault(PENDING_KEYS, set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        pending.update(_index_keys(obj))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_raw_skill_writes(orm_execute_state):
+    statement = orm_execute_state.statement
+    if not isinstance(statement, TextClause) or not _RAW_SKILL_WRITE.match(statement.text):
+        return
+    params = orm_execute_state.parameters
+    if isinstance(params, dict) and params.get("pid") is not None:
+        orm_execute_state.session.info.setdefault(PENDING_KEYS, set()).add(("profile", params["pid"]))
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_on_commit(session):
+    keys = session.info.pop(PENDING_KEYS, None)
+    if keys:
+        search_index.mark_dirty(keys)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop(PENDING_KEYS, None)
+
+
+# ====================== POSTGRESQL : SCHÉMA ======================
+# Champs indexés par type, pour le trigger ({r} = NEW) et la lecture ({r} = d)
+_SKILLS_SQL = (
+    "concat_ws(' ', (SELECT string_agg(skill_name, ' ') FROM technical_skills WHERE profile_id = {r}.id),"
+    " (SELECT string_agg(skill_name, ' ') FROM soft_skills WHERE profile_id = {r}.id))"
+)
+PG_DOCUMENTS = {
+    "project": {
+        "table": "projects",
+        "columns": ("title", "description", "coauthor"),
+        "title": "{r}.title",
+        "description": "{r}.description",
+        "fields": [("{r}.title", "A"), ("{r}.description", "B"), ("portfolio_names({r}.coauthor::json)", "C")],
+    },
+    "publication": {
+        "table": "publications",
+        "columns": ("title", "journal", "coauthor"),
+        "title": "{r}.title",
+        "description": "concat('Auteurs: ', coalesce(portfolio_names({r}.coauthor::json), ''),"
+                       " ' | Journal: ', coalesce({r}.journal, 'N/A'))",
+        "fields": [("{r}.title", "A"), ("{r}.journal", "B"), ("portfolio_names({r}.coauthor::json)", "C")],
+    },
+    "cours": {
+        "table": "cours",
+        "columns": ("title", "description", "curricula"),
+        "title": "{r}.title",
+        "description": "{r}.description",
+        "fields": [("{r}.title", "A"), ("{r}.description", "B"), ("{r}.curricula", "C")],
+    },
+    "researcher": {
+        "table": "profiles",
+        "columns": ("first_name", "last_name", "grade", "specialite", "diplome", "bio", "description"),
+        "title": "concat_ws(' ', {r}.first_name, {r}.last_name)",
+        "description": "coalesce({r}.specialite, {r}.grade, '')",
+        "fields": [
+            ("concat_ws(' ', {r}.first_name, {r}.last_name)", "A"),
+            ("concat_ws(' ', {r}.specialite, {r}.grade, {r}.diplome)", "B"),
+            (_SKILLS_SQL, "B"),
+            ("concat_ws(' ', {r}.bio, {r}.description)", "C"),
+        ],
+    },
+}
+SKILL_TABLES = ("technical_skills", "soft_skills")
+
+
+def _vector_sql(spec: dict, row: str) -> str:
+    return " || ".join(f"portfolio_tsv({expr.format(r=row)}, '{weight}')" for expr, weight in spec["fields"])
+
+
+def _body_sql(spec: dict, row: str) -> str:
+    exprs = [expr.format(r=row) for expr, weight in spec["fields"] if weight != "A"]
+    return f"concat_ws(' — ', {', '.join(exprs)})"
+
+
+def search_schema_ddl(unaccent: bool = True) -> list:
+    """DDL idempotent : configurations, fonctions, colonnes, triggers, index GIN"""
+    statements = []
+    for config, source, stemmer in (("portfolio_fr", "french", "french_stem"),
+                                    ("portfolio_en", "english", "english_stem")):
+        statements.append(f"""
+            DO $$ BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{config}') THEN
+                    CREATE TEXT SEARCH CONFIGURATION {config} (COPY = pg_catalog.{source});
+                END IF;
+            END $$
+        """)
+        if unaccent:
+            statements.append(
+                f"ALTER TEXT SEARCH CONFIGURATION {config} "
+                f"ALTER MAPPING FOR hword, hword_part, word WITH unaccent, {stemmer}"
+            )
+    statements += [
+        """
+        CREATE OR REPLACE FUNCTION portfolio_names(names json) RETURNS text
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT string_agg(value, ', ') FROM json_array_elements_text(
+                CASE WHEN json_typeof(names) = 'array' THEN names ELSE '[]'::json END)
+        $$
+        """,
+        # Radicaux français et anglais : « robotics » comme « robotique »
+        """
+        CREATE OR REPLACE FUNCTION portfolio_tsv(doc text, weight "char") RETURNS tsvector
+        LANGUAGE sql STABLE AS $$
+            SELECT setweight(to_tsvector('portfolio_fr', coalesce(doc, '')), weight)
+                || setweight(to_tsvector('portfolio_en', coalesce(doc, '')), weight)
+        $$
+        """,
+        """
+        CREATE OR REPLACE FUNCTION portfolio_tsq(q text) RETURNS tsquery
+        LANGUAGE sql STABLE AS $$
+            SELECT websearch_to_tsquery('portfolio_fr', q) || websearch_to_tsquery('portfolio_en', q)
+        $$
+        """,
+    ]
+    for spec in PG_DOCUMENTS.values():
+        table = spec["table"]
+        columns = ", ".join(spec["columns"] + ("search_vector",))
+        statements += [
+            f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector",
+            f"""
+            CREATE OR REPLACE FUNCTION {table}_search_vector() RETURNS trigger
+            LANGUAGE plpgsql AS $$
+            BEGIN
+                NEW.search_vector := {_vector_sql(spec, "NEW")};
+                RETURN NEW;
+            END $$
+            """,
+            f"DROP TRIGGER IF EXISTS {table}_search_vector ON {table}",
+            f"""
+            CREATE TRIGGER {table}_search_vector BEFORE INSERT OR UPDATE OF {columns}
+            ON {table} FOR EACH ROW EXECUTE FUNCTION {table}_search_vector()
+            """,
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING gin (search_vector)",
+        ]
+    # Compétences : recalcul du vecteur du profil concerné
+    statements.append("""
+        CREATE OR REPLACE FUNCTION skills_search_vector() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE profiles SET search_vector = NULL WHERE id = NEW.profile_id;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE profiles SET search_vector = NULL WHERE id = OLD.profile_id;
+            END IF;
+            RETURN NULL;
+        END $$
+    """)
+    for table in SKILL_TABLES:
+        statements += [
+            f"DROP TRIGGER IF EXISTS {table}_search_vector ON {table}",
+            f"""
+            CREATE TRIGGER {table}_search_vector AFTER INSERT OR UPDATE OR DELETE
+            ON {table} FOR EACH ROW EXECUTE FUNCTION skills_search_vector()
+            """,
+        ]
+    # Rattrapage : le trigger calcule le vecteur des lignes existantes
+    statements += [
+        f"UPDATE {spec['table']} SET search_vector = NULL WHERE search_vector IS NULL"
+        for spec in PG_DOCUMENTS.values()
+    ]
+    return statements
+
+
+def ensure_search_schema(conn) -> bool:
+    """Crée ou met à jour le schéma de recherche (PostgreSQL uniquement)"""
+    if conn.dialect.name != "postgresql":
+        return False
+    try:
+        with conn.begin_nested():
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+        unaccent = True
+    except Exception as e:
+        # Extension indisponible (droits) : les accents restent discriminants
+        print(f"⚠️  Extension unaccent indisponible : {e}")
+        unaccent = False
+    for statement in search_schema_ddl(unaccent=unaccent):
+        conn.execute(text(statement))
+    _pg_ready.clear()
+    return True
+
+
+def drop_search_schema(conn):
+    for table in SKILL_TABLES:
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_search_vector ON {table}"))
+    conn.execute(text("DROP FUNCTION IF EXISTS skills_search_vector()"))
+    for spec in PG_DOCUMENTS.values():
+        table = spec["table"]
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_search_vector ON {table}"))
+        conn.execute(text(f"DROP FUNCTION IF EXISTS {table}_search_vector()"))
+        conn.execute(text(f"DROP INDEX IF EXISTS ix_{table}_search_vector"))
+        conn.execute(text(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector"))
+    conn.execute(text("DROP FUNCTION IF EXISTS portfolio_tsq(text)"))
+    conn.execute(text('DROP FUNCTION IF EXISTS portfolio_tsv(text, "char")'))
+    conn.execute(text("DROP FUNCTION IF EXISTS portfolio_names(json)"))
+    conn.execute(text("DROP TEXT SEARCH CONFIGURATION IF EXISTS portfolio_fr"))
+    conn.execute(text("DROP TEXT SEARCH CONFIGURATION IF EXISTS portfolio_en"))
+
+
+# ====================== POSTGRESQL : REQUÊTE ======================
+_pg_ready = {}  # URL de la base -> schéma de recherche présent
+
+
+def pg_search_ready(session: Session) -> bool:
+    bind = session.get_bind()
+    url = str(bind.url)
+    if url not in _pg_ready:
+        # text(...).columns() : lectures (is_select), routables vers le réplica
+        tables = [spec["table"] for spec in PG_DOCUMENTS.values()]
+        columns = session.execute(text(
+            "SELECT count(*) FROM information_schema.columns "
+            "WHERE column_name = 'search_vector' AND table_name = ANY(:tables)"
+        ).columns(), {"tables": tables}).scalar()
+        function = session.execute(text("SELECT to_regprocedure('portfolio_tsq(text)') IS NOT NULL").columns()).scalar()
+        _pg_ready[url] = columns == len(tables) and bool(function)
+        if not _pg_ready[url]:
+            print("⚠️  Schéma de recherche PostgreSQL absent : index en mémoire")
+    return _pg_ready[url]
+
+
+def _pg_source(kind: str) -> str:
+    table = PG_DOCUMENTS[kind]["table"]
+    if kind == "researcher":
+        return (f"{table} d JOIN users u ON u.id = d.user_id "
+                "AND u.role = 'researcher' AND u.status = 'active'")
+    return f"{table} d"
+
+
+def pg_search_sql(types=SEARCH_TYPES) -> str:
+    """
+    Une seule requête : correspondances (index GIN) classées par ts_rank_cd,
+    total, puis titres et extraits ts_headline pour la page seulement.
+    """
+    hits, rows = [], []
+    for kind in types:
+        spec = PG_DOCUMENTS[kind]
+        result_id, slug = ("u.id", "u.slug") if kind == "researcher" else ("d.id", "NULL::text")
+        hits.append(
+            f"SELECT '{kind}'::text AS type, d.id AS doc_id, {result_id} AS id, {slug} AS slug, "
+            f"ts_rank_cd(d.search_vector, q.tsq) AS score "
+            f"FROM {_pg_source(kind)}, q WHERE d.search_vector @@ q.tsq"
+        )
+        rows.append(
+            f"SELECT p.type, p.id, p.slug, p.score, {spec['title'].format(r='d')} AS title, "
+            f"{spec['description'].format(r='d')} AS description, "
+            f"ts_headline('portfolio_fr', {_body_sql(spec, 'd')}, q.tsq, :headline) AS snippet "
+            f"FROM page p JOIN {spec['table']} d ON p.type = '{kind}' AND d.id = p.doc_id, q"
+        )
+    union_hits = "\n                UNION ALL ".join(hits)
+    union_rows = "\n                UNION ALL ".join(rows)
+    return f"""
+        WITH q AS (SELECT portfolio_tsq(:q) AS tsq),
+        hits AS (
+                {union_hits}
+        ),
+        page AS (
+            SELECT * FROM hits ORDER BY score DESC, type, id LIMIT :limit OFFSET :offset
+        )
+        SELECT t.total, r.* FROM (SELECT count(*) AS total FROM hits) t
+        LEFT JOIN (
+                {union_rows}
+        ) r ON true
+        ORDER BY r.score DESC, r.type, r.id
+    """
+
+
+PG_HEADLINE = (f"StartSel={MARK_START}, StopSel={MARK_STOP}, MaxWords={SNIPPET_WORDS}, "
+               "MinWords=12, MaxFragments=2, FragmentDelimiter=\" … \"")
+
+
+def _pg_snippet(value: str | None) -> str:
+    # ts_headline ne protège pas le HTML : échappement, puis balises de surlignage
+    return html.escape(value or "").replace(MARK_START, "<mark>").replace(MARK_STOP, "</mark>")
+
+
+def _pg_search(session: Session, query: str, types, page: int, per_page: int) -> tuple:
+    rows = session.execute(text(pg_search_sql(types)).columns(), {
+        "q": query, "limit": per_page, "offset": (page - 1) * per_page, "headline": PG_HEADLINE,
+    }).all()
+    total = rows[0].total if rows else 0
+    return total, [
+        {
+            "type": row.type, "id": row.id, "title": row.title,
+            "description": shorten(row.description),
+            "url": result_url(row.type, row.id, row.slug),
+            "score": round(float(row.score), 4),
+            "snippet": _pg_snippet(row.snippet),
+        }
+        for row in rows if row.type is not None
+    ]
+
+
+# ====================== RECHERCHE ======================
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto").lower()
+
+
+def search_backend(session: Session) -> str:
+    if SEARCH_BACKEND != "memory" and session.get_bind().dialect.name == "postgresql" \
+            and pg_search_ready(session):
+        return "postgresql"
+    return "memory"
+
+
+def _memory_search(session: Session, query: str, types, page: int, per_page: int) -> tuple:
+    search_index.ensure_fresh(session)
+    total, scored = search_index.search(query, types, page, per_page)
+    terms = set(analyze(query))
+    return total, [
+        {
+            "type": doc.kind, "id": doc.id, "title": doc.title,
+            "description": doc.description,
+            "url": result_url(doc.kind, doc.id, doc.slug),
+            "score": round(score, 4),
+            "snippet": highlight(doc.body or doc.title, terms),
+        }
+        for score, doc in scored
+    ]
+
+
+def search(session: Session, query: str, types=SEARCH_TYPES, page: int = 1, per_page: int = 10) -> dict:
+    """
+    Page `page` des résultats, les plus pertinents d'abord. Depuis une
+    AsyncSession : `await db.run_sync(search, query, ...)`.
+    """
+    backend = search_backend(session)
+    run = _pg_search if backend == "postgresql" else _memory_search
+    total, results = run(session, query, types, page, per_page)
+    return {
+        "query": query,
+        "backend": backend,
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "count": len(results),
+        "results": results,
+    }
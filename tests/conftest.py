@@ -3,7 +3,8 @@ import pytest
 import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool, StaticPool
 import hashlib
 import sys
 
@@ -11,8 +12,10 @@ import sys
 # Ajouter le chemin du projet au sys.path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database import Base, get_db
+from database import Base, get_db, get_async_db
 from main import app, requests_counter  # ✅ Import du compteur global
+from services.researcher_profile import profile_cache
+from auth.principal_cache import principal_cache
 from fastapi.testclient import TestClient
 from datetime import timezone
 
@@ -49,8 +52,25 @@ import auth.router as auth_router
 auth_router.hash_password = mock_hash_password
 auth_router.verify_password = mock_verify_password
 
+# ===================== AUDITS SYNCHRONES EN TEST =====================
+# Les tests lisent les audits juste après la requête : pas de mise en file
+from services.audit_writer import audit_writer
+audit_writer.buffered = False
+
+# Métriques recalculées dans la requête (la base de test n'a qu'une connexion)
+from services.metrics import metrics_snapshot
+metrics_snapshot.background = False
+
+# Rapports rendus : les ids (version des données) sont réutilisés entre tests
+from services.report_cache import report_cache
+# Index de recherche en mémoire : reconstruit pour chaque test, dans la requête
+from services.search import search_index
+search_index.background = False
+
 # ===================== DATABASE TEST (en mémoire) =====================
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# Base mémoire partagée (cache=shared) : le moteur asynchrone des routes
+# publiques (get_async_db) voit les mêmes tables que la Session de test.
+SQLALCHEMY_DATABASE_URL = "sqlite:///file:portfolio_tests?mode=memory&cache=shared&uri=true"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
@@ -58,6 +78,13 @@ engine = create_engine(
     poolclass=StaticPool
 )
 
+# NullPool : une connexion par session asynchrone, fermée en fin de requête
+async_engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://"),
+    poolclass=NullPool
+)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
 TestingSessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
@@ -89,10 +116,21 @@ def client(db):
         finally:
             pass
     
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as async_db:
+            yield async_db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
 
     # ✅ Réinitialiser le rate limiter avant chaque test
     requests_counter.clear()
+    # ✅ Vider le cache des profils publics (les IDs sont réutilisés entre tests)
+    profile_cache.clear()
+    principal_cache.clear()
+    metrics_snapshot.clear()
+    report_cache.clear()
+    search_index.clear()
     
     with TestClient(app) as test_client:
         # Stocker la db dans l'état de l'app pour y accéder dans les tests
@@ -102,6 +140,12 @@ def client(db):
     # Nettoyer les overrides
     app.dependency_overrides.clear()
 
+# ===================== FIXTURE MOTEUR ASYNCHRONE =====================
+@pytest.fixture
+def async_bind():
+    """Engine synchrone sous-jacent au moteur asynchrone (écoute des requêtes)"""
+    return async_engine.sync_engine
+
 # ===================== FIXTURE POUR TOKEN ADMIN =====================
 @pytest.fixture
 def admin_token(client, db):
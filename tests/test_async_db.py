@@ -0,0 +1,57 @@
+# tests/test_async_db.py
+from database import async_database_url
+from models.cours import Cours
+from models.project import Project
+from models.publication import Publication
+from tests.test_researcher_public import QueryCounter, make_directory
+
+
+def test_async_database_url():
+    assert async_database_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+    assert async_database_url(
+        "postgresql+psycopg2://admin:admin@db:5432/portfolio?sslmode=require"
+    ) == "postgresql+asyncpg://admin:admin@db:5432/portfolio"
+
+
+def test_health_uses_async_engine(client, async_bind):
+    with QueryCounter(async_bind) as counter:
+        response = client.get("/health")
+
+    assert response.json()["database"] == "connected"
+    assert counter.count == 1
+
+
+def test_directory_served_by_async_session(client, db, async_bind):
+    make_directory(db, n=3)
+
+    with QueryCounter(async_bind) as counter:
+        response = client.get("/researchers?limit=2&fields=id,firstName")
+
+    assert counter.count == 1
+    assert response.json() == [
+        {"id": 1, "firstName": "Prenom0"},
+        {"id": 2, "firstName": "Prenom1"},
+    ]
+    assert response.headers["X-Next-After-Id"] == "2"
+
+
+def test_search_served_by_async_session(client, db, async_bind):
+    users = make_directory(db, n=1)
+    profile_id = users[0].profile.id
+    db.add_all([
+        Project(profile_id=profile_id, year=2024, title="Robotique marine", coauthor=[]),
+        Publication(profile_id=profile_id, year=2023, title="Étude", journal="Revue de robotique", coauthor=["A. B."]),
+        Cours(profile_id=profile_id, title="Algèbre"),
+    ])
+    db.commit()
+
+    with QueryCounter(async_bind) as counter:
+        data = client.get("/search?q=robotique").json()
+
+    assert counter.count > 0  # construction de l'index mémoire
+    assert sorted(r["type"] for r in data["results"]) == ["project", "publication"]
+
+    # Index déjà construit : aucune requête
+    with QueryCounter(async_bind) as counter:
+        assert client.get("/search?q=robotique").json()["total"] == 2
+    assert counter.count == 0
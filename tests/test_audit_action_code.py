@@ -0,0 +1,53 @@
+# tests/test_audit_action_code.py
+from sqlalchemy import select
+
+from models.audit import Audit, AuditAction
+from models.user import User
+from tests.test_researcher_public import auth_headers
+
+
+def make_user(db, email, role):
+    user = User(email=email, password="x", role=role, status="active")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_action_code_derived_from_description(db):
+    admin = make_user(db, "admin@test.com", "admin")
+    db.add(Audit(user_id=admin.id, user_role="admin", action_description="Export CSV utilisateurs"))
+    db.commit()
+
+    assert db.query(Audit).one().action_code == AuditAction.EXPORT
+
+
+def test_forbidden_attempt_has_code_and_details(client, db):
+    researcher = make_user(db, "chercheur@test.com", "researcher")
+    assert client.get("/admin/sessions", headers=auth_headers(researcher)).status_code == 403
+
+    audit = db.query(Audit).filter(Audit.user_id == researcher.id).one()
+    assert audit.action_code == AuditAction.FORBIDDEN
+    assert audit.details == {"path": "/admin/sessions", "method": "GET"}
+
+
+def test_dashboard_audits_filter_on_action_code(client, db):
+    admin = make_user(db, "admin@test.com", "admin")
+    for description in ["Connexion réussie", "Déconnexion", "Connexion réussie"]:
+        db.add(Audit(user_id=admin.id, user_role="admin", action_description=description))
+    db.commit()
+    headers = auth_headers(admin)
+
+    response = client.get("/admin/dashboard/audits?action=login&with_total=true", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["total"] == 2
+    assert {a["action_code"] for a in response.json()["audits"]} == {"login"}
+
+    assert client.get("/admin/dashboard/audits?action=Connexion", headers=headers).status_code == 400
+
+
+def test_action_filter_uses_composite_index(db):
+    stmt = select(Audit.id).where(Audit.action_code == AuditAction.LOGIN).order_by(Audit.date.desc()).limit(10)
+    compiled = stmt.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+    plan = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").all()
+
+    assert any("ix_audits_action_code_date" in row[-1] for row in plan)
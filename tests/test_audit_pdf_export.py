@@ -0,0 +1,104 @@
+# tests/test_audit_pdf_export.py
+import base64
+import re
+import zlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from models.audit import Audit
+from services.pdf_reports import audit_batches, audit_filters, render_to_file
+from tests.test_metrics_snapshot import make_data
+from tests.test_researcher_public import auth_headers
+
+REPORT = {
+    "title": "Journal complet",
+    "data_type": "audits",
+    "content": "",
+    "generated_by": "admin@test.com",
+    "generated_at": "01/03/2026 10:00:00",
+}
+
+
+def add_audits(db, user_id, start: datetime, count: int):
+    db.execute(insert(Audit), [
+        {"user_id": user_id, "user_role": "admin", "action_description": f"Action {i}",
+         "date": start + timedelta(minutes=i)}
+        for i in range(count)
+    ])
+    db.commit()
+
+
+def pdf_text(data: bytes) -> str:
+    """Contenu des flux (décompressés) du PDF"""
+    text = []
+    for stream in re.findall(rb"stream\r?\n(.*?)endstream", data, re.S):
+        stream = stream.strip()
+        if stream.endswith(b"~>"):  # flux ReportLab : ASCII85 puis Flate
+            stream = base64.a85decode(stream[:-2])
+        try:
+            text.append(zlib.decompress(stream).decode("latin-1"))
+        except zlib.error:
+            pass
+    return "\n".join(text)
+
+
+def page_count(data: bytes) -> int:
+    return len(re.findall(rb"/Type /Page\b", data))
+
+
+def test_audit_filters():
+    assert audit_filters({}) == {"date_from": None, "date_to": None, "limit": 50}
+    assert audit_filters({"date_from": "2026-01-01"})["limit"] is None  # période : sans plafond
+    assert audit_filters({"limit": "5000"})["limit"] == 5000
+
+
+def test_audit_batches_read_by_keyset(db):
+    admin = make_data(db)
+    add_audits(db, admin.id, datetime(2026, 1, 1), 1200)
+    add_audits(db, admin.id, datetime(2025, 6, 1), 10)  # hors période
+
+    filters = audit_filters({"date_from": "2026-01-01", "date_to": "2026-01-31"})
+    batches = list(audit_batches(db, filters, batch_size=500))
+
+    assert [len(rows) for rows in batches] == [500, 500, 200]
+    actions = [row[2] for rows in batches for row in rows]
+    assert len(set(actions)) == 1200
+    assert actions[0] == "Action 1199" and actions[-1] == "Action 0"
+
+
+def test_multi_page_report_numbered(db, tmp_path):
+    admin = make_data(db)
+    add_audits(db, admin.id, datetime(2026, 1, 1), 600)
+    filters = audit_filters({"date_from": "2026-01-01", "date_to": "2026-01-01"})
+    path = tmp_path / "journal.pdf"
+
+    render_to_file({**REPORT, "filters": filters}, str(path), audit_batches(db, filters, batch_size=100))
+
+    data = path.read_bytes()
+    pages = page_count(data)
+    text = pdf_text(data)
+    assert pages > 5
+    assert f"(Page {pages}/) Tj" in text and "(Page 1/) Tj" in text
+    assert f"({pages}) Tj" in text  # total (formulaire commun à toutes les pages)
+    assert "Page 1/1" not in text
+    # En-tête du tableau répété sur chaque page du journal
+    assert text.count("(Date) Tj") >= pages - 1
+    assert "(Total d'audits: 600) Tj" in text.replace("\\'", "'")
+
+
+def test_generate_full_period_audit_pdf(client, db):
+    admin = make_data(db)
+    add_audits(db, admin.id, datetime(2026, 2, 1), 300)
+
+    response = client.post("/api/pdf/generate", headers=auth_headers(admin), json={
+        "title": "Conformité", "data_type": "audits",
+        "filters": {"date_from": "2026-02-01", "date_to": "2026-02-28"},
+    })
+    assert response.status_code == 200
+    assert page_count(response.content) > 1
+
+    invalid = client.post("/api/pdf/generate", headers=auth_headers(admin), json={
+        "data_type": "audits", "filters": {"date_from": "01/02/2026"},
+    })
+    assert invalid.status_code == 400
@@ -0,0 +1,78 @@
+# tests/test_audit_retention.py
+import gzip
+import json
+from datetime import datetime
+
+import pytest
+
+import services.audit_retention as audit_retention
+from models.audit import Audit
+from models.stats_rollup import AuditRollup
+from models.user import User
+from services.audit_retention import apply_retention, ensure_partitions, iter_archive
+from tests.test_researcher_public import auth_headers
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(audit_retention, "ARCHIVE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def seed(db):
+    admin = User(email="root@test.com", password="x", role="super_admin", status="active")
+    other = User(email="chercheur@test.com", password="x", role="researcher", status="active")
+    db.add_all([admin, other])
+    db.commit()
+    for user, date in [(admin, datetime(2025, 1, 3)), (other, datetime(2025, 1, 20)),
+                       (admin, datetime(2025, 2, 1)), (admin, datetime(2026, 10, 1))]:
+        db.add(Audit(user_id=user.id, user_role=user.role, action_description="Consultation", date=date))
+    db.commit()
+    return admin, other
+
+
+def test_partitions_are_noop_on_sqlite(db):
+    assert ensure_partitions(db.connection()) == []
+
+
+def test_retention_archives_then_deletes_old_months(db, archive_dir):
+    seed(db)
+    rollups_before = db.query(AuditRollup).count()
+
+    archived = apply_retention(db, now=datetime(2026, 10, 18), retention_months=12)
+
+    assert [(a["month"], a["rows"]) for a in archived] == [("2025-01", 2), ("2025-02", 1)]
+    assert [a.date for a in db.query(Audit).all()] == [datetime(2026, 10, 1)]
+    assert db.query(AuditRollup).count() == rollups_before
+
+    with gzip.open(archive_dir / "audits_2025_01.ndjson.gz", "rt", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert [r["date"] for r in rows] == ["2025-01-03T00:00:00", "2025-01-20T00:00:00"]
+
+    # Relance : rien de plus à archiver
+    assert apply_retention(db, now=datetime(2026, 10, 18), retention_months=12) == []
+
+
+def test_archive_streamed_back(client, db, archive_dir):
+    admin, other = seed(db)
+    apply_retention(db, now=datetime(2026, 10, 18), retention_months=12)
+    headers = auth_headers(admin)
+
+    listing = client.get("/admin/audit/archives", headers=headers).json()["archives"]
+    assert [a["month"] for a in listing] == ["2025-01", "2025-02"]
+
+    response = client.get(f"/admin/audit/archives/2025-01?user_id={other.id}", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = response.text.splitlines()
+    assert len(lines) == 1 and json.loads(lines[0])["user_id"] == other.id
+
+    assert client.get("/admin/audit/archives/2024-12", headers=headers).status_code == 404
+    assert client.get("/admin/audit/archives/janvier", headers=headers).status_code == 400
+    assert list(iter_archive(datetime(2025, 2, 1))) != []
+
+
+def test_retention_endpoint_reserved_to_super_admin(client, db, archive_dir):
+    admin, other = seed(db)
+    assert client.post("/admin/audit/retention", headers=auth_headers(other)).status_code == 403
+    assert client.post("/admin/audit/retention", headers=auth_headers(admin)).status_code == 200
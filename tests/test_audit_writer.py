@@ -0,0 +1,116 @@
+# tests/test_audit_writer.py
+import time
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models.audit import Audit
+from models.user import User
+from services.audit_writer import AuditWriter
+from tests.test_researcher_public import auth_headers
+
+
+@pytest.fixture
+def file_db(tmp_path):
+    """Base SQLite sur fichier : le writer ouvre ses propres connexions"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'audit.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    user = User(email="admin@test.com", password="x", role="admin", status="active")
+    session.add(user)
+    session.commit()
+    yield session, user
+    session.close()
+    engine.dispose()
+
+
+def test_events_flushed_in_one_executemany(file_db):
+    session, user = file_db
+    writer = AuditWriter(flush_interval_ms=60000, batch_size=1000)
+
+    for i in range(25):
+        writer.enqueue(session, user.id, user.role, f"Consultation {i}")
+    assert session.query(Audit).count() == 0
+    assert writer.stats()["queue_depth"] == 25
+
+    statements = []
+    listener = lambda conn, cursor, stmt, params, ctx, many: "INSERT INTO audits" in stmt and statements.append(many)
+    event.listen(session.get_bind(), "before_cursor_execute", listener)
+    assert writer.flush() == 25
+    event.remove(session.get_bind(), "before_cursor_execute", listener)
+
+    assert statements == [True]  # un seul executemany
+    assert session.query(Audit).count() == 25
+    writer.stop()
+
+
+def test_batch_size_triggers_background_flush(file_db):
+    session, user = file_db
+    writer = AuditWriter(flush_interval_ms=60000, batch_size=5)
+
+    for i in range(5):
+        writer.enqueue(session, user.id, user.role, f"Consultation {i}")
+
+    for _ in range(100):
+        if writer.stats()["written"] == 5:
+            break
+        time.sleep(0.01)
+    assert session.query(Audit).count() == 5
+    writer.stop()
+
+
+def test_backpressure_when_queue_full(file_db):
+    session, user = file_db
+    writer = AuditWriter(flush_interval_ms=60000, batch_size=1000, max_queue=3, put_timeout=0.01)
+
+    for i in range(7):
+        writer.enqueue(session, user.id, user.role, f"Consultation {i}")
+
+    stats = writer.stats()
+    assert stats["backpressure_waits"] >= 1
+    assert stats["queue_depth"] <= 3
+    writer.stop()
+    assert session.query(Audit).count() == 7
+
+
+def test_stop_flushes_pending_events(file_db):
+    session, user = file_db
+    writer = AuditWriter(flush_interval_ms=60000, batch_size=1000)
+    writer.enqueue(session, user.id, user.role, "Export CSV")
+
+    writer.stop()
+    assert session.query(Audit).count() == 1
+    assert writer.stats()["flushes"] == 1
+
+
+def test_audit_writer_stats_endpoint(client, db):
+    admin = User(email="admin@test.com", password="x", role="admin", status="active")
+    db.add(admin)
+    db.commit()
+
+    response = client.get("/admin/audit-writer/stats", headers=auth_headers(admin))
+    assert response.status_code == 200
+    assert {"queue_depth", "last_flush_ms", "avg_flush_ms"} <= set(response.json())
+
+
+def test_bad_row_does_not_block_the_queue(file_db):
+    session, user = file_db
+    writer = AuditWriter(flush_interval_ms=60000, batch_size=1000, max_attempts=2)
+
+    writer.enqueue(session, user.id, user.role, "Consultation 1")
+    writer.enqueue(session, user.id, user.role, "Export", details={"fichier": object()})  # non JSON
+    writer.enqueue(session, user.id, user.role, "Consultation 2")
+
+    assert writer.flush() == 2
+    assert session.query(Audit).count() == 2
+    assert writer.stats()["queue_depth"] == 1  # retentée au prochain lot
+
+    writer.enqueue(session, user.id, user.role, "Consultation 3")
+    assert writer.flush() == 1
+    stats = writer.stats()
+    assert (stats["queue_depth"], stats["dropped"]) == (0, 1)
+    assert writer.dead_letters[0][0]["action_description"] == "Export"
+    assert session.query(Audit).count() == 3
+    writer.stop()
@@ -0,0 +1,51 @@
+# tests/test_cache.py
+import time
+
+from services.cache import TTLCache
+
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")          # "a" devient la plus récente
+    cache.set("c", 3)       # "b" est évincée
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_expiration():
+    cache = TTLCache(maxsize=10, ttl=0.05)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_invalidate_by_tag():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set(("slug", "marie"), {"id": 1}, tags=["user:1"])
+    cache.set(("id", 1), {"id": 1}, tags=["user:1"])
+    cache.set(("id", 2), {"id": 2}, tags=["user:2"])
+
+    cache.invalidate_tags(["user:1"])
+
+    assert cache.get(("slug", "marie")) is None
+    assert cache.get(("id", 1)) is None
+    assert cache.get(("id", 2)) == {"id": 2}
+    assert cache.stats()["invalidations"] == 2
+
+
+def test_hit_ratio():
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("missing")
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
@@ -0,0 +1,79 @@
+# tests/test_csv_export.py
+import csv
+import gzip
+import io
+
+from models.audit import Audit
+from models.profile import Profile
+from models.user import User
+from services.csv_export import csv_chunks, gzip_chunks
+from tests.test_researcher_public import QueryCounter, auth_headers
+
+
+def make_users(db, count):
+    admin = User(email="admin@test.com", password="x", role="admin", status="active")
+    db.add(admin)
+    for i in range(count):
+        user = User(email=f"chercheur{i}@test.com", password="x", role="researcher", status="active")
+        user.profile = Profile(first_name=f"Prénom{i}", last_name=f"Nom{i}", grade="Docteur")
+        db.add(user)
+    db.commit()
+    return admin
+
+
+def test_csv_encoded_in_chunks():
+    rows = ([i, f"ligne {i}"] for i in range(1200))
+    chunks = list(csv_chunks(["id", "texte"], rows, chunk_rows=500))
+
+    assert len(chunks) == 3
+    parsed = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert parsed[0] == ["id", "texte"] and len(parsed) == 1201
+
+    compressed = b"".join(gzip_chunks(iter(chunks)))
+    assert gzip.decompress(compressed) == b"".join(chunks)
+
+
+def test_users_export_constant_queries(client, db):
+    admin = make_users(db, 3)
+    headers = {**auth_headers(admin), "Accept-Encoding": "identity"}
+    client.get("/admin/users/export", headers=headers)
+
+    with QueryCounter(db.get_bind()) as small:
+        client.get("/admin/users/export", headers=headers)
+    make_users_more = [User(email=f"autre{i}@test.com", password="x", role="researcher", status="active",
+                            profile=Profile(first_name="A", last_name="B", grade="Docteur")) for i in range(20)]
+    db.add_all(make_users_more)
+    db.commit()
+    with QueryCounter(db.get_bind()) as large:
+        response = client.get("/admin/users/export", headers=headers)
+
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert large.count == small.count
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["ID", "Email", "Role", "Status", "Prénom", "Nom"]
+    assert len(rows) == 1 + 24
+    assert ["chercheur0@test.com", "Prénom0", "Nom0"] == [rows[2][1], rows[2][4], rows[2][5]]
+
+
+def test_export_gzipped_when_accepted(client, db):
+    admin = make_users(db, 2)
+    response = client.get("/admin/users/export", headers={**auth_headers(admin), "Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text.splitlines()[0] == "ID,Email,Role,Status,Prénom,Nom"
+
+
+def test_audits_export_streams_filtered_rows(client, db):
+    admin = make_users(db, 0)
+    headers = auth_headers(admin)
+    assert client.get("/audits/export/csv", headers=headers).status_code == 404
+
+    for description in ["Connexion réussie", "Déconnexion"]:
+        db.add(Audit(user_id=admin.id, user_role="admin", action_description=description))
+    db.commit()
+
+    response = client.get("/audits/export/csv?action=logout", headers=headers)
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert [r[4] for r in rows[1:]] == ["logout"]
@@ -0,0 +1,84 @@
+# tests/test_db_pool.py
+import pytest
+from sqlalchemy import create_engine, exc
+
+from models.user import User
+from services.db_pool import PoolMetrics, engine_options, pool_settings, warm_pool
+from tests.test_researcher_public import auth_headers
+
+
+def make_engine(tmp_path, name, **overrides):
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    options = {**engine_options("local", url, name), **overrides}
+    engine = create_engine(url, **options)
+    return engine, PoolMetrics(name).attach(engine)
+
+
+def test_pool_settings_per_deployment(monkeypatch):
+    for var in ("DB_POOL_SIZE", "DB_MAX_OVERFLOW", "DB_POOL_TIMEOUT", "DB_POOL_RECYCLE", "DB_POOL_PRE_PING"):
+        monkeypatch.delenv(var, raising=False)
+
+    assert pool_settings("local", "postgresql://h/db")["pool_pre_ping"] is False
+    assert pool_settings("docker", "postgresql://db/db")["pool_size"] == 10
+    render = pool_settings("local", "postgresql://dpg-abc.oregon-postgres.onrender.com/db")
+    assert render["pool_recycle"] == 300 and render["pool_pre_ping"] is True
+
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "1")
+    settings = pool_settings("local", "postgresql://h/db")
+    assert settings["pool_size"] == 3 and settings["pool_pre_ping"] is True
+
+
+def test_in_memory_sqlite_keeps_default_pool():
+    assert engine_options("local", "sqlite:///:memory:", "memoire") == {}
+
+
+def test_checkouts_and_timeouts_recorded(tmp_path):
+    engine, metrics = make_engine(tmp_path, "test-timeout", pool_size=1, max_overflow=0, pool_timeout=0.05)
+
+    held = engine.connect()
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    held.close()
+    with engine.connect():
+        pass
+
+    stats = metrics.stats()
+    assert stats["checkouts"] == 2 and stats["checkins"] == 2
+    assert stats["timeouts"] == 1
+    assert stats["max_wait_ms"] >= 50
+    assert stats["size"] == 1 and stats["checked_out"] == 0
+    engine.dispose()
+
+
+def test_overflow_checkouts_counted(tmp_path):
+    engine, metrics = make_engine(tmp_path, "test-overflow", pool_size=1, max_overflow=2)
+
+    first, second = engine.connect(), engine.connect()
+    assert metrics.stats()["overflow"] == 1
+    first.close()
+    second.close()
+
+    assert metrics.overflow_checkouts == 1
+    engine.dispose()
+
+
+def test_warm_pool_opens_connections(tmp_path):
+    engine, metrics = make_engine(tmp_path, "test-warmup", pool_size=3)
+
+    assert warm_pool(engine, connections=5) == 3
+    assert metrics.connects == 3
+    assert metrics.stats()["checked_in"] == 3
+    engine.dispose()
+
+
+def test_pool_stats_endpoint(client, db):
+    admin = User(email="admin@test.com", password="x", role="admin", status="active")
+    db.add(admin)
+    db.commit()
+
+    response = client.get("/admin/db-pool/stats", headers=auth_headers(admin))
+
+    assert response.status_code == 200
+    names = [pool["name"] for pool in response.json()["pools"]]
+    assert names == ["primary", "async"]
@@ -0,0 +1,156 @@
+# tests/test_db_routing.py
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from models.user import User
+from services.db_routing import (
+    PIN_COOKIE, RoutingSession, replica_health, replica_reads, replica_routing, routing_info,
+)
+
+
+@pytest.fixture
+def engines(tmp_path):
+    """Primaire et réplica : deux fichiers SQLite au contenu distinct (réplica en retard)"""
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine, email in ((primary, "primaire@test.com"), (replica, "replica@test.com")):
+        Base.metadata.create_all(bind=engine)
+        with sessionmaker(bind=engine)() as db:
+            db.add(User(email=email, password="x", role="researcher", status="active"))
+            db.commit()
+    replica_health.mark_up()
+    yield primary, replica
+    replica_health.mark_up()
+    primary.dispose()
+    replica.dispose()
+
+
+@pytest.fixture
+def session_factory(engines):
+    primary, replica = engines
+    return sessionmaker(class_=RoutingSession, info=routing_info(primary, replica))
+
+
+@pytest.fixture
+def replica_allowed():
+    token = replica_reads.set(True)
+    yield
+    replica_reads.reset(token)
+
+
+def emails(db):
+    return db.scalars(select(User.email)).all()
+
+
+def test_reads_stay_on_primary_by_default(session_factory):
+    with session_factory() as db:
+        assert emails(db) == ["primaire@test.com"]
+
+
+def test_public_reads_go_to_replica(session_factory, replica_allowed):
+    with session_factory() as db:
+        assert emails(db) == ["replica@test.com"]
+
+
+def test_reads_after_write_stay_on_primary(session_factory, replica_allowed):
+    with session_factory() as db:
+        db.add(User(email="nouveau@test.com", password="x", role="researcher", status="active"))
+        db.commit()
+
+        assert sorted(emails(db)) == ["nouveau@test.com", "primaire@test.com"]
+
+    # Nouvelle session : de nouveau sur le réplica
+    with session_factory() as db:
+        assert emails(db) == ["replica@test.com"]
+
+
+def test_fallback_to_primary_when_replica_down(engines, session_factory, replica_allowed, tmp_path):
+    broken = create_engine(f"sqlite:///{tmp_path / 'absent' / 'replica.db'}")
+    assert replica_health.check(broken) is False
+
+    with session_factory() as db:
+        assert emails(db) == ["primaire@test.com"]
+    assert replica_health.stats()["fallback_reads"] >= 1
+
+    assert replica_health.check(engines[1]) is True
+    with session_factory() as db:
+        assert emails(db) == ["replica@test.com"]
+
+
+def test_async_session_routes_reads(tmp_path, engines, replica_allowed):
+    primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+    factory = async_sessionmaker(
+        class_=AsyncSession, sync_session_class=RoutingSession,
+        info=routing_info(primary.sync_engine, replica.sync_engine),
+    )
+
+    async def read():
+        async with factory() as db:
+            result = (await db.scalars(select(User.email))).all()
+        await primary.dispose()
+        await replica.dispose()
+        return result
+
+    assert asyncio.run(read()) == ["replica@test.com"]
+
+
+def test_middleware_pins_reads_after_write():
+    app = FastAPI()
+    app.middleware("http")(replica_routing)
+
+    @app.get("/researchers")
+    def directory():
+        return {"replica": replica_reads.get()}
+
+    @app.get("/admin/dashboard")
+    def dashboard():
+        return {"replica": replica_reads.get()}
+
+    @app.post("/portfolio/comment")
+    def comment():
+        return {"replica": replica_reads.get()}
+
+    client = TestClient(app)
+    assert client.get("/researchers").json() == {"replica": True}
+    assert client.get("/admin/dashboard").json() == {"replica": False}
+
+    response = client.post("/portfolio/comment")
+    assert response.json() == {"replica": False}
+    assert PIN_COOKIE in response.cookies
+
+    # Lit ses propres écritures : épinglé sur le primaire
+    assert client.get("/researchers").json() == {"replica": False}
+    client.cookies.clear()
+    assert client.get("/researchers").json() == {"replica": True}
+
+
+def test_public_profile_and_search_read_from_replica(engines, session_factory, replica_allowed):
+    from models.profile import Profile
+    from services.researcher_profile import get_public_researcher, profile_cache
+    from services.search import search, search_index
+
+    for engine, first_name in zip(engines, ("Primaire", "Replique")):
+        with sessionmaker(bind=engine)() as db:
+            db.add(Profile(user_id=1, first_name=first_name, last_name="Nom", grade="MCF"))
+            db.commit()
+    profile_cache.clear()
+    search_index.clear()
+    try:
+        with session_factory() as db:
+            # db.get_bind().dialect (sans requête) ne doit pas épingler la session au primaire
+            profile = get_public_researcher(db, user_id=1)
+            assert "Replique" in str(profile) and "Primaire" not in str(profile)
+            assert (search(db, "replique")["total"], search(db, "primaire")["total"]) == (1, 0)
+            assert not db.info.get("wrote")
+            assert emails(db) == ["replica@test.com"]
+    finally:
+        profile_cache.clear()
+        search_index.clear()
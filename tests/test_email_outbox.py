@@ -0,0 +1,106 @@
+# tests/test_email_outbox.py
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from models.email_outbox import EmailOutbox
+from services.email_outbox import FakeTransport, OutboxWorker, enqueue_email, process_outbox
+
+
+def queue(db, to="chercheur@test.com", max_attempts=5):
+    email = enqueue_email(db, to_email=to, subject="Activation", html="<p>Lien</p>")
+    email.max_attempts = max_attempts
+    db.commit()
+    return email
+
+
+def test_register_enqueues_activation_email(client, db):
+    payload = {"email": "nouveau@test.com", "password": "Secret123!", "first_name": "Ada", "last_name": "Lovelace"}
+    response = client.post("/auth/register", json=payload)
+    assert response.status_code == 200
+
+    email = db.query(EmailOutbox).filter(EmailOutbox.to_email == "nouveau@test.com").one()
+    assert email.status == "pending"
+    assert "/auth/activate?token=" in email.html
+
+
+def test_admin_activation_link_queued_for_brevo(client, db):
+    from models.user import User
+    db.add(User(email="chercheur@test.com", password="x", role="researcher", status="inactive"))
+    db.commit()
+
+    data = client.post("/admin/users/activation-link", json={"email": "chercheur@test.com"}).json()
+    assert "email_sent" not in data  # pas encore envoyé
+    assert (data["email_queued"], data["email_status"]) == (True, "pending")
+
+    email = db.get(EmailOutbox, data["outbox_id"])
+    assert email.transport == "brevo"
+    default, brevo = FakeTransport(), FakeTransport()
+    assert process_outbox(db, default, transports={"brevo": brevo})["sent"] == 1
+    assert default.sent == [] and [m["to"] for m in brevo.sent] == ["chercheur@test.com"]
+
+
+def test_process_outbox_sends_pending(db):
+    queue(db, "a@test.com")
+    queue(db, "b@test.com")
+    transport = FakeTransport()
+
+    result = process_outbox(db, transport)
+
+    assert result == {"sent": 2, "retried": 0, "failed": 0}
+    assert [m["to"] for m in transport.sent] == ["a@test.com", "b@test.com"]
+    assert {e.status for e in db.query(EmailOutbox).all()} == {"sent"}
+
+
+def test_failed_send_retried_with_backoff(db):
+    email = queue(db)
+    transport = FakeTransport(fail_times=1)
+    now = datetime.utcnow()
+
+    assert process_outbox(db, transport, now=now)["retried"] == 1
+    db.refresh(email)
+    assert email.status == "pending"
+    assert email.attempts == 1
+    assert email.next_attempt_at > now
+    assert email.last_error == "Échec simulé"
+
+    # Pas encore dû : rien n'est renvoyé
+    assert process_outbox(db, transport, now=now)["sent"] == 0
+
+    later = email.next_attempt_at + timedelta(seconds=1)
+    assert process_outbox(db, transport, now=later)["sent"] == 1
+    db.refresh(email)
+    assert email.status == "sent"
+    assert email.attempts == 2
+
+
+def test_gives_up_after_max_attempts(db):
+    email = queue(db, max_attempts=2)
+    transport = FakeTransport(fail_times=10)
+
+    process_outbox(db, transport, now=datetime.utcnow())
+    db.refresh(email)
+    result = process_outbox(db, transport, now=email.next_attempt_at + timedelta(seconds=1))
+
+    assert result["failed"] == 1
+    db.refresh(email)
+    assert email.status == "failed"
+    assert transport.sent == []
+
+
+def test_worker_sends_after_commit(db):
+    transport = FakeTransport()
+    worker = OutboxWorker(sessionmaker(bind=db.get_bind()), transport, poll_interval=0.05)
+
+    async def scenario():
+        worker.start()
+        queue(db, "worker@test.com")
+        for _ in range(100):
+            if transport.sent:
+                break
+            await asyncio.sleep(0.02)
+        await worker.stop()
+
+    asyncio.run(scenario())
+    assert [m["to"] for m in transport.sent] == ["worker@test.com"]
@@ -0,0 +1,104 @@
+# tests/test_http_cache.py
+from datetime import datetime
+
+from sqlalchemy import update
+
+from models.user import User
+from models.profile import Profile
+from models.publication import Publication
+
+
+def make_researcher(db):
+    user = User(email="ada@test.com", password="x", role="researcher", status="active", slug="ada")
+    db.add(user)
+    db.flush()
+    profile = Profile(user_id=user.id, first_name="Ada", last_name="Lovelace", grade="Chercheuse")
+    db.add(profile)
+    db.flush()
+    db.add(Publication(profile_id=profile.id, year=1843, title="Notes", coauthor=[]))
+    db.commit()
+    return user, profile
+
+
+def test_public_profile_has_etag_and_cache_control(client, db):
+    make_researcher(db)
+    response = client.get("/researcher/public/slug/ada")
+
+    assert response.status_code == 200
+    assert response.headers["etag"].startswith('"')
+    assert response.headers["cache-control"].startswith("public")
+
+
+def test_if_none_match_returns_304(client, db):
+    make_researcher(db)
+    etag = client.get("/researcher/public/slug/ada").headers["etag"]
+
+    response = client.get("/researcher/public/slug/ada", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_etag_changes_after_write(client, db):
+    _, profile = make_researcher(db)
+    etag = client.get("/researcher/public/slug/ada").headers["etag"]
+
+    profile.first_name = "Augusta Ada"
+    db.commit()
+
+    response = client.get("/researcher/public/slug/ada", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_html_pages_are_private_and_revalidated(client, db):
+    make_researcher(db)
+    response = client.get("/publications")
+
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "private, no-cache"
+    assert "Cookie" in response.headers["vary"]
+
+    again = client.get("/publications", headers={"If-None-Match": response.headers["etag"]})
+    assert again.status_code == 304
+
+
+def test_sitemap_last_modified(client, db):
+    make_researcher(db)
+    response = client.get("/sitemap.xml")
+
+    assert response.status_code == 200
+    last_modified = response.headers["last-modified"]
+
+    again = client.get("/sitemap.xml", headers={"If-Modified-Since": last_modified})
+    assert again.status_code == 304
+
+
+def test_sitemap_follows_publication_edits_and_deletes(client, db):
+    make_researcher(db)
+    old = datetime(2020, 1, 1)
+
+    def age_content():
+        for model in (Profile, Publication):
+            db.execute(update(model).values(updated_at=old))
+        db.commit()
+        db.expire_all()
+        return client.get("/sitemap.xml").headers["last-modified"]
+
+    last_modified = age_content()
+    assert last_modified.endswith("01 Jan 2020 00:00:00 GMT")
+
+    publication = db.query(Publication).one()
+    publication.title = "Notes du traducteur"
+    db.commit()
+    assert client.get("/sitemap.xml", headers={"If-Modified-Since": last_modified}).status_code == 200
+
+    last_modified = age_content()
+    db.delete(db.query(Publication).one())
+    db.commit()
+    assert client.get("/sitemap.xml", headers={"If-Modified-Since": last_modified}).status_code == 200
+
+
+def test_non_public_routes_untouched(client):
+    response = client.get("/health")
+    assert "etag" not in response.headers
@@ -0,0 +1,93 @@
+# tests/test_keyset_pagination.py
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, text
+
+from models.audit import Audit
+from models.user import User
+from tests.test_researcher_public import auth_headers
+
+
+def seed(db, count=25):
+    admin = User(email="admin@test.com", password="x", role="admin", status="active")
+    db.add(admin)
+    db.commit()
+    start = datetime(2026, 1, 1)
+    for i in range(count):
+        # Dates en double pour vérifier le départage par id
+        db.add(Audit(user_id=admin.id, user_role="admin", action_description=f"Consultation {i}",
+                     date=start + timedelta(minutes=i // 2)))
+    db.commit()
+    return admin
+
+
+def expected_order(db):
+    return [a.id for a in db.query(Audit).order_by(Audit.date.desc(), Audit.id.desc())]
+
+
+def test_walk_all_pages_with_next_then_back_with_prev(client, db):
+    headers = auth_headers(seed(db))
+    pages, cursor = [], None
+    while True:
+        url = "/admin/audit/logs?limit=10" + (f"&cursor={cursor}" if cursor else "")
+        body = client.get(url, headers=headers).json()
+        pages.append([log["id"] for log in body["logs"]])
+        cursor = body["next"]
+        if not cursor:
+            break
+
+    assert [len(p) for p in pages] == [10, 10, 5]
+    assert sum(pages, []) == expected_order(db)
+
+    body = client.get(f"/admin/audit/logs?limit=10&cursor={cursor or body['prev']}", headers=headers).json()
+    assert [log["id"] for log in body["logs"]] == pages[1]
+    first = client.get(f"/admin/audit/logs?limit=10&cursor={body['prev']}", headers=headers).json()
+    assert [log["id"] for log in first["logs"]] == pages[0]
+    assert first["prev"] is None
+
+
+def test_deep_page_uses_no_offset_and_no_count(client, db):
+    headers = auth_headers(seed(db))
+    cursor = client.get("/admin/dashboard/audits?limit=20", headers=headers).json()["next"]
+
+    statements = []
+    listener = lambda conn, cursor_, stmt, params, *args: statements.append((stmt, params))
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    body = client.get(f"/admin/dashboard/audits?limit=20&cursor={cursor}", headers=headers).json()
+    event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    assert len(body["audits"]) == 5 and body["next"] is None and "total" not in body
+    audit_queries = [(s, p) for s, p in statements if "FROM audits" in s]
+    assert not any("count(" in s for s, p in audit_queries)
+    # SQLite écrit toujours "LIMIT ? OFFSET ?" : l'offset doit rester à 0
+    assert all(p[-1] == 0 for s, p in audit_queries if "OFFSET" in s)
+
+
+def test_total_on_demand_and_invalid_cursor(client, db):
+    headers = auth_headers(seed(db))
+    body = client.get("/admin/audit/logs?limit=5&with_total=true", headers=headers).json()
+    assert body["total"] == 25 and body["total_is_estimate"] is False
+
+    assert client.get("/admin/audit/logs?cursor=pas-un-curseur", headers=headers).status_code == 400
+
+
+def test_audits_router_pages(client, db):
+    headers = auth_headers(seed(db))
+    body = client.get("/audits/?limit=10&action=read", headers=headers).json()
+    assert len(body["items"]) == 10 and body["next"]
+    assert body["items"][0]["action_code"] == "read"
+
+    html = client.get("/audits/page?limit=10&role=&start_date=", headers=headers)
+    assert html.status_code == 200
+    assert "Plus anciens" in html.text and "Plus récents" not in html.text
+
+
+def test_unfiltered_page_reads_date_id_index(db):
+    seed(db, count=5)
+    query = (db.query(Audit).filter(Audit.date.is_not(None))
+             .order_by(Audit.date.desc(), Audit.id.desc()).limit(11))
+    sql = str(query.statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True}))
+    plan = " ".join(row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+
+    assert "ix_audits_date_id" in plan
+    assert "TEMP B-TREE" not in plan  # pas de tri de toute la table
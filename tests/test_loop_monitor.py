@@ -0,0 +1,51 @@
+# tests/test_loop_monitor.py
+import asyncio
+import inspect
+import time
+
+from services.loop_monitor import LoopLagMonitor
+
+
+def blocking_handler(scope):
+    time.sleep(0.25)
+
+
+def test_blocking_callback_reported_with_route_and_stack():
+    monitor = LoopLagMonitor(threshold_ms=50, interval_ms=10)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        blocking_handler({"type": "http", "method": "GET", "path": "/lent"})
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+
+    assert monitor.blocks == 1
+    report = monitor.reports[0]
+    assert report["route"] == "GET /lent"
+    assert report["lag_ms"] >= 50
+    assert "blocking_handler" in report["stack"]
+
+
+def test_no_report_when_loop_is_free():
+    monitor = LoopLagMonitor(threshold_ms=50, interval_ms=10)
+
+    async def scenario():
+        monitor.start()
+        for _ in range(10):
+            await asyncio.sleep(0.01)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+    assert monitor.blocks == 0
+
+
+def test_blocking_handlers_run_in_threadpool():
+    # Handlers qui utilisent la Session synchrone ou ReportLab : `def`, pas `async def`
+    from routes import dashboard, pdf
+
+    for handler in (dashboard.get_dashboard_stats, dashboard.get_chart_data,
+                    dashboard.get_recent_activities, pdf.generate_pdf_report):
+        assert not inspect.iscoroutinefunction(handler), handler.__name__
@@ -0,0 +1,94 @@
+# tests/test_metrics_snapshot.py
+import time
+
+from models.audit import Audit
+from models.refresh_token import RefreshToken
+from models.user import User
+from services.metrics import MetricsSnapshot, compute_metrics, metrics_snapshot
+from tests.test_researcher_public import QueryCounter, auth_headers
+
+
+def make_data(db):
+    admin = User(email="admin@test.com", password="x", role="admin", status="active")
+    db.add_all([
+        admin,
+        User(email="a@test.com", password="x", role="researcher", status="active"),
+        User(email="b@test.com", password="x", role="researcher", status="inactive"),
+    ])
+    db.commit()
+    db.add_all([
+        RefreshToken(user_id=admin.id, token="t1", revoked=False),
+        RefreshToken(user_id=admin.id, token="t2", revoked=True),
+        Audit(user_id=admin.id, user_role="admin", action_description="Connexion réussie"),
+    ])
+    db.commit()
+    return admin
+
+
+def test_metrics_computed_in_one_query(db):
+    make_data(db)
+
+    with QueryCounter(db.get_bind()) as counter:
+        metrics = compute_metrics(db)
+
+    assert counter.count == 1
+    assert metrics["total_users"] == 3
+    assert metrics["active_users"] == 2 and metrics["inactive_users"] == 1
+    assert metrics["active_sessions"] == 1
+    assert metrics["total_audits"] == 1 and metrics["recent_audits_7d"] == 1
+    assert metrics["total_publications"] == 0
+    assert metrics["users_by_role"] == {"admin": 1, "researcher": 2}
+
+
+def test_metrics_on_empty_database(db):
+    metrics = compute_metrics(db)
+    assert metrics["total_users"] == 0 and metrics["users_by_role"] == {}
+
+
+def test_snapshot_cached_until_ttl(db):
+    make_data(db)
+    snapshot = MetricsSnapshot(ttl=60, background=False)
+    first = snapshot.get(db)
+
+    db.add(User(email="c@test.com", password="x", role="researcher", status="active"))
+    db.commit()
+    with QueryCounter(db.get_bind()) as counter:
+        cached = snapshot.get(db)
+
+    assert counter.count == 0
+    assert cached["total_users"] == first["total_users"] == 3
+    assert cached["stale"] is False and cached["age_seconds"] >= 0
+
+    snapshot.ttl = 0
+    assert snapshot.get(db)["total_users"] == 4
+    assert snapshot.stats()["refreshes"] == 2
+
+
+def test_stale_snapshot_served_while_refreshing(db, monkeypatch):
+    make_data(db)
+    snapshot = MetricsSnapshot(ttl=0.01, max_stale=60, background=True)
+    snapshot.refresh(db)
+    refreshed = []
+    monkeypatch.setattr(snapshot, "_refresh_in_background", refreshed.append)
+    time.sleep(0.02)
+
+    stale = snapshot.get(db)
+
+    assert stale["stale"] is True and stale["total_users"] == 3
+    assert refreshed == [db.get_bind()]
+
+
+def test_dashboard_consumers_share_snapshot(client, db):
+    admin = make_data(db)
+    headers = auth_headers(admin)
+
+    stats = client.get("/api/dashboard/stats", headers=headers).json()
+    assert stats["general"]["total_users"] == 3
+    assert stats["users_by_role"] == {"admin": 1, "researcher": 2}
+    assert "age_seconds" in stats
+
+    hits = metrics_snapshot.hits
+    response = client.get("/admin/dashboard/export/csv", headers=headers)
+    # Les compteurs viennent de l'instantané (l'audit de l'export n'y figure pas encore)
+    assert metrics_snapshot.hits == hits + 1
+    assert response.text.splitlines()[1].startswith("3,2,1,1,1,")
@@ -0,0 +1,65 @@
+# tests/test_password_service.py
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from auth import security
+from auth.password_service import PasswordService
+from tests.test_researcher_public import auth_headers
+
+
+def test_hash_and_verify_roundtrip():
+    service = PasswordService(max_workers=2)
+    hashed = service.hash_sync("Secret123!")
+
+    assert service.verify_sync("Secret123!", hashed)
+    assert not asyncio.run(service.verify("mauvais", hashed))
+    assert service.stats()["completed"] == 3
+    service.shutdown()
+
+
+def test_queue_full_rejected():
+    release = threading.Event()
+
+    service = PasswordService(max_workers=1, max_queue=1)
+    running = service._submit(lambda: release.wait(5))
+    queued = service._submit(lambda: release.wait(5))
+
+    with pytest.raises(HTTPException) as exc:
+        service.hash_sync("x")
+    assert exc.value.status_code == 503
+
+    stats = service.stats()
+    assert stats["queue_depth"] == 1
+    assert stats["rejected"] == 1
+
+    release.set()
+    running.result(), queued.result()
+    assert service.stats()["in_flight"] == 0
+    service.shutdown()
+
+
+def test_login_compat_verifies_through_pool(client, db):
+    """Le login async de main.py vérifie le mot de passe dans le pool"""
+    from models.user import User
+
+    db.add(User(email="login@test.com", password=security.hash_password("Secret123!"),
+                role="researcher", status="active", is_active=True))
+    db.commit()
+
+    response = client.post("/login", json={"email": "login@test.com", "password": "Secret123!"})
+    assert response.status_code == 200
+
+
+def test_password_pool_stats_endpoint(client, db):
+    from models.user import User
+
+    admin = User(email="admin@test.com", password="x", role="admin", status="active")
+    db.add(admin)
+    db.commit()
+
+    response = client.get("/admin/password-pool/stats", headers=auth_headers(admin))
+    assert response.status_code == 200
+    assert {"in_flight", "queue_depth", "max_workers"} <= set(response.json())
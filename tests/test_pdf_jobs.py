@@ -0,0 +1,122 @@
+# tests/test_pdf_jobs.py
+import os
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from services.pdf_jobs import DONE, PDFJobService
+from services.pdf_reports import render_report, render_to_file, report_styles
+from tests.test_researcher_public import auth_headers
+
+AUDITS_REPORT = {
+    "title": "Journal",
+    "data_type": "audits",
+    "content": "",
+    "generated_by": "admin@test.com",
+    "generated_at": "01/01/2026 10:00:00",
+    "rows": [["01/01/2026 09:00", "ID: 1 (admin)", "Connexion"]] * 200,
+}
+
+
+def wait_done(service, job, timeout=60):
+    job.future.result(timeout=timeout)
+    deadline = time.time() + 5
+    while not job.finished and time.time() < deadline:
+        time.sleep(0.01)
+    return service.get(job.id)
+
+
+def test_styles_built_once_per_process():
+    assert report_styles() is report_styles()
+    assert render_report(AUDITS_REPORT).startswith(b"%PDF")
+
+
+def test_render_in_process_pool(tmp_path):
+    service = PDFJobService(str(tmp_path), max_workers=1, use_processes=True)
+    try:
+        job = wait_done(service, service.submit(render_to_file, (AUDITS_REPORT,), owner_id=1, filename="journal.pdf"))
+        assert job.status == DONE
+        with open(job.path, "rb") as f:
+            assert f.read(4) == b"%PDF"
+        assert job.size == os.path.getsize(job.path)
+        assert service.stats()["completed"] == 1
+    finally:
+        service.shutdown()
+
+
+def test_finished_files_expire(tmp_path):
+    service = PDFJobService(str(tmp_path), retention=60, use_processes=False)
+    job = wait_done(service, service.submit(render_to_file, (AUDITS_REPORT,), owner_id=1, filename="journal.pdf"))
+    orphan = tmp_path / "ancien.pdf"
+    orphan.write_bytes(b"%PDF")
+    os.utime(orphan, (time.time() - 120, time.time() - 120))
+
+    assert service.purge_expired() == 0
+    assert os.path.exists(job.path) and not orphan.exists()
+
+    assert service.purge_expired(now=job.expires_at + 1) == 1
+    assert service.get(job.id) is None
+    assert not os.path.exists(job.path)
+    service.shutdown()
+
+
+def test_job_visible_from_another_worker(tmp_path):
+    # Deux workers uvicorn : même PDF_JOBS_DIR, registres en mémoire distincts
+    first = PDFJobService(str(tmp_path), use_processes=False)
+    second = PDFJobService(str(tmp_path), use_processes=False)
+    job = first.submit(render_to_file, (AUDITS_REPORT,), owner_id=7, filename="journal.pdf")
+
+    seen = second.get(job.id)
+    assert (seen.owner_id, seen.filename, seen.future) == (7, "journal.pdf", None)
+
+    wait_done(first, job)
+    seen = second.get(job.id)
+    assert seen.status == DONE and seen.size == os.path.getsize(seen.path)
+    assert second.get("../" + job.id) is None
+
+    first.purge_expired(now=job.expires_at + 1)
+    assert second.get(job.id) is None
+    first.shutdown()
+
+
+def test_too_many_pending_jobs_rejected(tmp_path):
+    service = PDFJobService(str(tmp_path), max_pending=0, use_processes=False)
+    with pytest.raises(HTTPException) as exc:
+        service.submit(render_to_file, (AUDITS_REPORT,), owner_id=1, filename="journal.pdf")
+    assert exc.value.status_code == 503
+    assert service.stats()["rejected"] == 1
+
+
+def test_job_api_flow(client, db, tmp_path, monkeypatch):
+    from models.user import User
+    from routes import pdf
+
+    service = PDFJobService(str(tmp_path), use_processes=False)
+    monkeypatch.setattr(pdf, "pdf_jobs", service)
+    admin = User(email="admin@test.com", password="x", role="admin", status="active")
+    other = User(email="other@test.com", password="x", role="admin", status="active")
+    db.add_all([admin, other])
+    db.commit()
+
+    response = client.post("/api/pdf/jobs", json={"title": "Audits", "data_type": "audits"},
+                           headers=auth_headers(admin))
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    assert response.json()["download_url"] == f"/api/pdf/jobs/{job_id}"
+
+    events = client.get(f"/api/pdf/jobs/{job_id}/events", headers=auth_headers(admin))
+    assert events.headers["content-type"].startswith("text/event-stream")
+    assert "event: done" in events.text
+
+    status = client.get(f"/api/pdf/jobs/{job_id}/status", headers=auth_headers(admin))
+    assert status.json()["status"] == "done"
+
+    download = client.get(f"/api/pdf/jobs/{job_id}", headers=auth_headers(admin))
+    assert download.status_code == 200
+    assert download.headers["content-type"] == "application/pdf"
+    assert download.content.startswith(b"%PDF")
+
+    # Tâche d'un autre utilisateur : introuvable
+    assert client.get(f"/api/pdf/jobs/{job_id}", headers=auth_headers(other)).status_code == 404
+    service.shutdown()
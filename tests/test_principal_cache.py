@@ -0,0 +1,85 @@
+# tests/test_principal_cache.py
+from models.user import User
+from auth.principal_cache import principal_cache
+from tests.test_researcher_public import QueryCounter, auth_headers
+
+
+def make_user(db, email, role):
+    user = User(email=email, password="x", role=role, status="active")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_principal_served_from_cache(client, db):
+    admin = make_user(db, "admin@test.com", "admin")
+    headers = auth_headers(admin)
+
+    assert client.get("/admin/cache/stats", headers=headers).status_code == 200
+
+    with QueryCounter(db.get_bind()) as counter:
+        response = client.get("/admin/cache/stats", headers=headers)
+
+    assert response.status_code == 200
+    assert counter.count == 0
+    stats = {c["name"]: c for c in response.json()["caches"]}["user_principals"]
+    assert stats["hits"] >= 1
+
+
+def test_role_change_invalidates_principal(client, db):
+    super_admin = make_user(db, "root@test.com", "super_admin")
+    admin = make_user(db, "admin@test.com", "admin")
+    admin_headers = auth_headers(admin)
+
+    assert client.get("/admin/cache/stats", headers=admin_headers).status_code == 200
+
+    response = client.put(
+        f"/admin/users/{admin.id}/role",
+        json={"role": "researcher"},
+        headers=auth_headers(super_admin),
+    )
+    assert response.status_code == 200
+
+    assert client.get("/admin/cache/stats", headers=admin_headers).status_code == 403
+
+
+def test_token_without_iat_not_cached(client, db):
+    from jose import jwt as jose_jwt
+    from auth.jwt import SECRET_KEY, ALGORITHM
+
+    admin = make_user(db, "admin@test.com", "admin")
+    token = jose_jwt.encode({"sub": str(admin.id), "role": "admin"}, SECRET_KEY, algorithm=ALGORITHM)
+
+    response = client.get("/admin/cache/stats", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert len(principal_cache) == 0
+
+
+# ===================== RÉSOLUTION UNIQUE PAR REQUÊTE =====================
+
+def test_principal_resolved_once_per_request(client, db, monkeypatch):
+    import auth.jwt as auth_jwt
+
+    calls = []
+    original = auth_jwt.decode_access_token
+    monkeypatch.setattr(auth_jwt, "decode_access_token", lambda token: calls.append(token) or original(token))
+
+    admin = make_user(db, "admin@test.com", "admin")
+    # require_role + Depends(get_current_user) sur la même route
+    response = client.post("/admin/sessions/revoke/999", headers=auth_headers(admin))
+
+    assert response.status_code == 404
+    assert len(calls) == 1
+
+
+def test_forbidden_attempt_is_audited(client, db):
+    from models.audit import Audit
+
+    researcher = make_user(db, "chercheur@test.com", "researcher")
+    response = client.get("/admin/sessions", headers=auth_headers(researcher))
+
+    assert response.status_code == 403
+    audit = db.query(Audit).filter(Audit.user_id == researcher.id).first()
+    assert audit is not None
+    assert "non autorisée" in audit.action_description
+    assert audit.user_role == "researcher"
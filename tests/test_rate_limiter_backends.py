@@ -0,0 +1,113 @@
+# tests/test_rate_limiter_backends.py
+import asyncio
+import threading
+
+import pytest
+
+from services.rate_limiter import RateLimitBackend, RateLimiter, RatePolicy, MemoryBackend, SQLiteBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "rate_limit.db"))
+    return MemoryBackend()
+
+
+def make_limiter(backend, limit=5, window=60):
+    return RateLimiter(
+        backend=backend,
+        default_policy=RatePolicy(name="default", limit=limit, window=window),
+        exact_policies={"/health": RatePolicy(name="public", limit=None)},
+        prefix_policies=[("/auth/login", RatePolicy(name="auth", limit=2, window=window))],
+    )
+
+
+def test_blocks_after_limit(backend):
+    limiter = make_limiter(backend)
+    now = 6000.0  # début d'une fenêtre de 60 s
+
+    results = [limiter.hit("1.2.3.4", "/api/x", now=now) for _ in range(6)]
+    assert [r.allowed for r in results] == [True] * 5 + [False]
+    assert results[4].remaining == 0
+    assert results[0].reset_at == 6060
+
+
+def test_previous_window_weighted(backend):
+    limiter = make_limiter(backend, limit=10)
+    for _ in range(10):
+        limiter.hit("ip", "/api/x", now=6000.0)
+
+    # À mi-fenêtre suivante, la fenêtre précédente compte pour moitié
+    allowed = [limiter.hit("ip", "/api/x", now=6090.0).allowed for _ in range(6)]
+    assert allowed == [True] * 5 + [False]
+
+    # Deux fenêtres plus tard, le compteur est remis à zéro
+    assert limiter.hit("ip", "/api/x", now=6200.0).remaining == 9
+
+
+def test_policies_per_route(backend):
+    limiter = make_limiter(backend)
+
+    assert limiter.hit("ip", "/health", now=6000.0) is None
+    assert [limiter.hit("ip", "/auth/login", now=6000.0).allowed for _ in range(3)] == [True, True, False]
+    # Le compteur d'authentification est séparé du compteur par défaut
+    assert limiter.hit("ip", "/api/x", now=6000.0).remaining == 4
+
+
+def test_idle_keys_evicted(backend):
+    limiter = make_limiter(backend)
+    limiter.hit("a", "/api/x", now=6000.0)
+    limiter.hit("b", "/api/x", now=6100.0)
+    assert len(backend) == 2
+
+    assert backend.evict_idle(now=6130.0) == 1
+    assert len(backend) == 1
+
+
+def test_sqlite_backend_shared_between_instances(tmp_path):
+    path = str(tmp_path / "shared.db")
+    worker_1 = make_limiter(SQLiteBackend(path), limit=3)
+    worker_2 = make_limiter(SQLiteBackend(path), limit=3)
+
+    assert worker_1.hit("ip", "/api/x", now=6000.0).allowed
+    assert worker_2.hit("ip", "/api/x", now=6000.0).allowed
+    assert worker_1.hit("ip", "/api/x", now=6000.0).allowed
+    assert not worker_2.hit("ip", "/api/x", now=6000.0).allowed
+
+
+def test_async_hit_keeps_sqlite_off_event_loop(tmp_path):
+    class RecordingBackend(SQLiteBackend):
+        def hit(self, key, limit, window, now):
+            self.thread = threading.current_thread()
+            return super().hit(key, limit, window, now)
+
+    limiter = make_limiter(RecordingBackend(str(tmp_path / "rate_limit.db")))
+
+    async def scenario():
+        result = await limiter.ahit("ip", "/api/x", now=6000.0)
+        return result, threading.current_thread()
+
+    result, loop_thread = asyncio.run(scenario())
+    assert result.allowed
+    assert limiter.backend.thread is not loop_thread
+
+    # Backend mémoire : pas de saut de thread
+    memory = make_limiter(MemoryBackend())
+    assert asyncio.run(memory.ahit("ip", "/api/x", now=6000.0)).allowed
+
+
+def test_app_auth_policy_covers_compat_login():
+    from main import limiter
+    for path in ("/login", "/auth/login", "/auth/register"):
+        policy = limiter.policy_for(path)
+        assert (policy.name, policy.limit) == ("auth", 100)
+
+
+def test_incomplete_backend_fails_at_construction():
+    class HitOnly(RateLimitBackend):
+        def hit(self, key, limit, window, now):
+            return None
+
+    with pytest.raises(TypeError):
+        HitOnly()
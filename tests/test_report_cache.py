@@ -0,0 +1,108 @@
+# tests/test_report_cache.py
+import os
+import time
+
+from models.audit import Audit
+from services.report_cache import ReportCache, report_cache, report_version
+from tests.test_metrics_snapshot import make_data
+from tests.test_researcher_public import auth_headers
+
+
+def test_render_once_per_key(tmp_path):
+    cache = ReportCache(str(tmp_path))
+    renders = []
+
+    def render():
+        renders.append(1)
+        return b"rapport"
+
+    report, hit = cache.get_or_render("audits.pdf", {"limit": 50}, "v1", "pdf", render)
+    assert not hit and report.read() == b"rapport"
+    cached, hit = cache.get_or_render("audits.pdf", {"limit": 50}, "v1", "pdf", render)
+    assert hit and cached.name == report.name
+
+    # Autres filtres ou nouvelles données : autre fichier
+    assert cache.get_or_render("audits.pdf", {"limit": 10}, "v1", "pdf", render)[0].name != report.name
+    assert cache.get_or_render("audits.pdf", {"limit": 50}, "v2", "pdf", render)[0].name != report.name
+    assert len(renders) == 3
+    assert cache.stats()["hits"] == 1 and cache.stats()["files"] == 3
+
+
+def test_least_recently_served_evicted(tmp_path):
+    cache = ReportCache(str(tmp_path), max_bytes=250)
+    first = cache.get_or_render("a", {}, "v", "pdf", lambda: b"x" * 100)[0].name
+    second = cache.get_or_render("b", {}, "v", "pdf", lambda: b"x" * 100)[0].name
+    old = time.time() - 60
+    os.utime(first, (old, old))
+    os.utime(second, (old - 60, old - 60))
+    cache.get_or_render("a", {}, "v", "pdf", lambda: b"")  # lecture : `a` redevient récent
+
+    cache.get_or_render("c", {}, "v", "pdf", lambda: b"x" * 100)
+
+    assert os.path.exists(first) and not os.path.exists(second)
+    assert cache.evictions == 1
+
+
+def test_report_survives_eviction(tmp_path):
+    # Rapport plus gros que le cache : il ne s'évince pas lui-même
+    cache = ReportCache(str(tmp_path), max_bytes=50)
+    report, hit = cache.get_or_render("gros", {}, "v", "pdf", lambda: b"x" * 100)
+    assert not hit and os.path.exists(report.name) and cache.evictions == 0
+
+    # Une écriture concurrente évince le fichier déjà servi : le descripteur reste lisible
+    served, hit = cache.get_or_render("gros", {}, "v", "pdf", lambda: b"")
+    assert hit
+    cache.get_or_render("autre", {}, "v", "pdf", lambda: b"y" * 100)
+    assert not os.path.exists(report.name)
+    assert served.read() == b"x" * 100
+
+
+def test_audit_version_follows_max_id(db):
+    admin = make_data(db)
+    before = report_version(db, "audits")
+    db.add(Audit(user_id=admin.id, user_role="admin", action_description="Export"))
+    db.commit()
+    assert report_version(db, "audits") != before
+    assert report_version(db, "autre") == "static"
+
+
+def test_users_version_follows_status(db):
+    admin = make_data(db)
+    before = report_version(db, "users")
+    admin.status = "inactive"  # ni nouvel id, ni nouvel instantané des métriques
+    db.commit()
+    assert report_version(db, "users") != before
+
+
+def test_dashboard_csv_served_from_cache(client, db):
+    admin = make_data(db)
+
+    plain = {**auth_headers(admin), "Accept-Encoding": "identity"}
+    first = client.get("/admin/dashboard/export/csv", headers=plain)
+    assert first.headers["x-report-cache"] == "miss"
+    second = client.get("/admin/dashboard/export/csv", headers=plain)
+    assert second.headers["x-report-cache"] == "hit"
+    assert second.content == first.content
+    assert "Total utilisateurs" in second.text
+
+    compressed = client.get("/admin/dashboard/export/csv", headers={
+        **auth_headers(admin), "Accept-Encoding": "gzip"
+    })
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.headers["x-report-cache"] == "miss"  # variante gzip : autre fichier
+    assert compressed.text == first.text  # décompressé par le client
+
+
+def test_api_pdf_cached_until_new_audit(client, db):
+    admin = make_data(db)
+    body = {"title": "Audits", "data_type": "audits"}
+
+    assert client.post("/api/pdf/generate", json=body, headers=auth_headers(admin)).headers["x-report-cache"] == "miss"
+    cached = client.post("/api/pdf/generate", json=body, headers=auth_headers(admin))
+    assert cached.headers["x-report-cache"] == "hit"
+    assert cached.content.startswith(b"%PDF")
+
+    db.add(Audit(user_id=admin.id, user_role="admin", action_description="Nouvelle action"))
+    db.commit()
+    assert client.post("/api/pdf/generate", json=body, headers=auth_headers(admin)).headers["x-report-cache"] == "miss"
+    assert report_cache.stats()["files"] == 2
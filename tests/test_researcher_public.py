@@ -0,0 +1,230 @@
+# tests/test_researcher_public.py
+import pytest
+from datetime import date
+from sqlalchemy import event
+
+from models.user import User
+from models.profile import Profile
+from models.publication import Publication
+from models.project import Project
+from models.cv import TechnicalSkill, SoftSkill, Language, Degree, Experience
+
+
+# ===================== HELPERS =====================
+
+def make_researcher(db, email="marie@test.com", slug="marie", status="active"):
+    user = User(email=email, password="x", role="researcher", status=status, slug=slug)
+    db.add(user)
+    db.flush()
+
+    profile = Profile(user_id=user.id, first_name="Marie", last_name="Curie", grade="Professeure", bio="Physicienne")
+    db.add(profile)
+    db.flush()
+
+    db.add_all([
+        Publication(profile_id=profile.id, year=1903, title="Radioactivité", coauthor=["Pierre"]),
+        Publication(profile_id=profile.id, year=1911, title="Polonium", coauthor=[]),
+        Project(profile_id=profile.id, year=1910, title="Institut du radium", coauthor=[], description="Labo"),
+        TechnicalSkill(profile_id=profile.id, skill_name="Spectrométrie", level=90),
+        SoftSkill(profile_id=profile.id, skill_name="Rigueur"),
+        Language(profile_id=profile.id, language="Polonais", level="Natif"),
+        Degree(profile_id=profile.id, title="Doctorat", institution="Sorbonne", year=1903, description="Physique"),
+        Experience(profile_id=profile.id, title="Professeure", company="Sorbonne",
+                   start_date=date(1906, 11, 5), end_date=None, description="Chaire"),
+    ])
+    db.commit()
+    return user
+
+
+class QueryCounter:
+    """Compte les requêtes SQL émises sur l'engine de test"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _callback(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._callback)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._callback)
+
+
+# ===================== TESTS =====================
+
+def test_profile_by_slug_returns_full_aggregate(client, db):
+    make_researcher(db)
+
+    response = client.get("/researcher/public/slug/marie")
+    assert response.status_code == 200
+
+    data = response.json()
+    assert data["name"] == "Marie Curie"
+    assert [p["title"] for p in data["publications"]] == ["Radioactivité", "Polonium"]
+    assert data["projects"][0]["description"] == "Labo"
+    assert data["cv"]["skills_tech"] == [{"name": "Spectrométrie", "level": 90}]
+    assert data["cv"]["skills_soft"] == [{"name": "Rigueur"}]
+    assert data["cv"]["languages"] == [{"name": "Polonais", "level": "Natif"}]
+    assert data["cv"]["degrees"][0]["institution"] == "Sorbonne"
+    assert data["cv"]["experiences"][0]["start_date"] == "1906-11-05"
+    assert data["cv"]["experiences"][0]["end_date"] is None
+
+
+def test_profile_by_id_matches_slug(client, db):
+    user = make_researcher(db)
+
+    by_id = client.get(f"/researcher/public/id/{user.id}").json()
+    by_slug = client.get("/researcher/public/slug/marie").json()
+    assert by_id == by_slug
+
+
+def test_profile_loaded_in_single_query(client, db, async_bind):
+    """Régression : tout l'agrégat doit être chargé en un seul aller-retour"""
+    user = make_researcher(db)
+    db.expire_all()
+
+    with QueryCounter(async_bind) as counter:
+        response = client.get(f"/researcher/public/id/{user.id}")
+
+    assert response.status_code == 200
+    assert counter.count <= 2
+
+
+def test_researcher_without_profile(client, db):
+    user = User(email="solo@test.com", password="x", role="researcher", status="active", slug="solo")
+    db.add(user)
+    db.commit()
+
+    data = client.get("/researcher/public/slug/solo").json()
+    assert data["name"] == "solo"
+    assert data["publications"] == []
+    assert data["cv"]["experiences"] == []
+
+
+@pytest.mark.parametrize("status", ["inactive", "pending"])
+def test_inactive_researcher_not_found(client, db, status):
+    make_researcher(db, status=status)
+    assert client.get("/researcher/public/slug/marie").status_code == 404
+
+
+# ===================== ANNUAIRE =====================
+
+def make_directory(db, n=5):
+    users = []
+    for i in range(n):
+        user = User(email=f"r{i}@test.com", password="x", role="researcher", status="active", slug=f"r{i}")
+        db.add(user)
+        db.flush()
+        db.add(Profile(user_id=user.id, first_name=f"Prenom{i}", last_name="Nom", grade="MCF"))
+        users.append(user)
+    db.add(User(email="admin@lab.com", password="x", role="admin", status="active"))
+    db.commit()
+    return users
+
+
+def test_directory_single_query(client, db, async_bind):
+    make_directory(db, n=6)
+    db.expire_all()
+
+    with QueryCounter(async_bind) as counter:
+        response = client.get("/researcher/public/list")
+
+    assert response.status_code == 200
+    assert len(response.json()) == 6
+    assert counter.count == 1
+
+
+def test_directory_keyset_pagination(client, db):
+    users = make_directory(db, n=5)
+
+    first = client.get("/researcher/public/list?limit=2")
+    assert [r["slug"] for r in first.json()] == ["r0", "r1"]
+    next_id = first.headers["X-Next-After-Id"]
+    assert next_id == str(users[1].id)
+
+    second = client.get(f"/researcher/public/list?limit=2&after_id={next_id}")
+    assert [r["slug"] for r in second.json()] == ["r2", "r3"]
+
+    last = client.get(f"/researcher/public/list?limit=2&after_id={users[3].id}")
+    assert [r["slug"] for r in last.json()] == ["r4"]
+    assert "X-Next-After-Id" not in last.headers
+
+
+def test_directory_field_projection(client, db):
+    make_directory(db, n=2)
+
+    data = client.get("/researcher/public/list?fields=id,name,slug").json()
+    assert set(data[0].keys()) == {"id", "name", "slug"}
+    assert data[0]["name"] == "Prenom0 Nom"
+
+    assert client.get("/researcher/public/list?fields=id,password").status_code == 400
+
+
+def test_researchers_endpoint_paginated_and_projected(client, db):
+    make_directory(db, n=3)
+
+    data = client.get("/researchers?limit=2&fields=email,firstName").json()
+    assert data == [
+        {"email": "r0@test.com", "firstName": "Prenom0"},
+        {"email": "r1@test.com", "firstName": "Prenom1"},
+    ]
+
+
+# ===================== CACHE DES PROFILS =====================
+
+def auth_headers(user):
+    from auth.jwt import create_access_token
+    return {"Authorization": f"Bearer {create_access_token(user_id=user.id, role=user.role)}"}
+
+
+def test_cached_profile_served_without_query(client, db, async_bind):
+    user = make_researcher(db)
+    client.get(f"/researcher/public/id/{user.id}")
+
+    with QueryCounter(async_bind) as counter:
+        response = client.get(f"/researcher/public/id/{user.id}")
+
+    assert response.status_code == 200
+    assert counter.count == 0
+
+
+def test_profile_update_invalidates_cache(client, db):
+    user = make_researcher(db)
+    assert client.get("/researcher/public/slug/marie").json()["bio"] == "Physicienne"
+
+    profile = db.query(Profile).filter(Profile.user_id == user.id).first()
+    profile.bio = "Double prix Nobel"
+    db.commit()
+
+    assert client.get("/researcher/public/slug/marie").json()["bio"] == "Double prix Nobel"
+
+
+def test_raw_cv_write_invalidates_cache(client, db):
+    user = make_researcher(db)
+    before = client.get(f"/researcher/public/id/{user.id}").json()
+    assert len(before["cv"]["skills_soft"]) == 1
+
+    response = client.post("/cv/soft-skills", json={"name": "Ténacité"}, headers=auth_headers(user))
+    assert response.status_code == 200
+
+    after = client.get(f"/researcher/public/id/{user.id}").json()
+    assert {"name": "Ténacité"} in after["cv"]["skills_soft"]
+
+
+def test_admin_cache_stats(client, db):
+    admin = User(email="admin@test.com", password="x", role="admin", status="active")
+    db.add(admin)
+    db.commit()
+    make_researcher(db)
+    client.get("/researcher/public/slug/marie")
+    client.get("/researcher/public/slug/marie")
+
+    response = client.get("/admin/cache/stats", headers=auth_headers(admin))
+    assert response.status_code == 200
+    stats = {c["name"]: c for c in response.json()["caches"]}["public_researcher_profiles"]
+    assert stats["hits"] >= 1
+    assert stats["misses"] >= 1
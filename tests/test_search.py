@@ -0,0 +1,184 @@
+# tests/test_search.py
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+
+from models.cours import Cours
+from models.cv import TechnicalSkill
+from models.project import Project
+from models.publication import Publication
+from services.search import SearchIndex, SearchIndexBuilding, analyze, highlight, pg_search_sql, search_schema_ddl
+from tests.test_researcher_public import make_directory
+
+
+def test_analyzer_ignores_accents_and_inflections():
+    assert analyze("Études robotiques marines") == analyze("etude robotique marine")
+    assert analyze("Robotics") == analyze("robotique")
+    assert analyze("Nationaux") == analyze("nationalité")
+    assert analyze("la robotique et les données") == analyze("robotique données")
+
+
+def test_highlight_escapes_html():
+    snippet = highlight("Capteurs <b>robotiques</b> & drones", set(analyze("robotique")))
+    assert snippet == "Capteurs &lt;b&gt;<mark>robotiques</mark>&lt;/b&gt; &amp; drones"
+
+
+def test_title_ranks_above_description(db):
+    make_directory(db, n=1)
+    profile_id = 1
+    db.add_all([
+        Project(profile_id=profile_id, year=2024, title="Capteurs côtiers",
+                description="Mesures pour la robotique sous-marine", coauthor=[]),
+        Project(profile_id=profile_id, year=2024, title="Robotique marine", coauthor=[]),
+    ])
+    db.commit()
+
+    index = SearchIndex()
+    index.build(db)
+    total, scored = index.search("robotique")
+    assert total == 2
+    assert [doc.title for _, doc in scored] == ["Robotique marine", "Capteurs côtiers"]
+
+    # Tous les termes doivent être présents, quel que soit le champ
+    assert index.search("robotique côtiers")[0] == 1
+    assert index.search("robotique drones")[0] == 0
+
+
+def wait_built(index: SearchIndex, builds: int):
+    deadline = time.monotonic() + 5
+    while index.stats()["background_builds"] < builds and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert index.stats()["background_builds"] == builds
+
+
+def test_index_built_in_background(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'search.db'}")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    index = SearchIndex(session_factory=factory)
+    with factory() as db:
+        make_directory(db, n=1)
+        db.add(Project(profile_id=1, year=2024, title="Robotique marine", coauthor=[]))
+        db.commit()
+
+        # Première construction : hors requête, 503 en attendant
+        with pytest.raises(SearchIndexBuilding):
+            index.ensure_fresh(db)
+        wait_built(index, 1)
+        index.ensure_fresh(db)
+        assert index.search("robotique")[0] == 1
+
+        # Index expiré : l'ancien reste servi pendant la reconstruction
+        index.max_age = 0
+        db.add(Project(profile_id=1, year=2024, title="Robotique agricole", coauthor=[]))
+        db.commit()
+        index.ensure_fresh(db)
+        assert index.search("robotique")[0] == 1
+        wait_built(index, 2)
+        assert index.search("robotique")[0] == 2
+    engine.dispose()
+
+
+def test_write_committed_during_first_build(db, monkeypatch):
+    import services.search as search_module
+    from services.search import search_index
+    make_directory(db, n=1)
+    load = search_module._load_researchers
+
+    def load_then_write(session, *args, **kwargs):
+        docs = load(session, *args, **kwargs)
+        if not args and not kwargs:  # construction complète : projets déjà lus
+            db.add(Project(profile_id=1, year=2024, title="Robotique marine", coauthor=[]))
+            db.commit()
+        return docs
+
+    monkeypatch.setattr(search_module, "_load_researchers", load_then_write)
+    try:
+        search_index.build(db)
+        assert search_index.search("robotique")[0] == 0
+        search_index.refresh(db)
+        assert search_index.search("robotique")[0] == 1
+    finally:
+        search_index.clear()
+
+
+def test_search_endpoint(client, db):
+    users = make_directory(db, n=2)
+    profile = users[0].profile
+    profile.bio = "Travaux sur la <robotique> collaborative"
+    db.add_all([
+        TechnicalSkill(profile_id=users[1].profile.id, skill_name="Robotique", level=4),
+        Project(profile_id=profile.id, year=2024, title="Robotique marine", coauthor=[]),
+        Publication(profile_id=profile.id, year=2023, title="Étude", journal="Revue de robotique", coauthor=["A. B."]),
+        Cours(profile_id=profile.id, title="Algèbre"),
+    ])
+    db.commit()
+
+    data = client.get("/search?q=ROBOTIQUES").json()
+    assert data["total"] == 4
+    assert data["results"][0]["type"] == "project"
+    assert sorted(r["type"] for r in data["results"]) == ["project", "publication", "researcher", "researcher"]
+    researcher = next(r for r in data["results"] if r["type"] == "researcher" and r["id"] == users[0].id)
+    assert researcher["url"] == "/researcher/public/slug/r0"
+    assert "&lt;<mark>robotique</mark>&gt;" in researcher["snippet"]
+
+    page = client.get("/search?q=robotique&types=researcher&per_page=1&page=2").json()
+    assert (page["total"], page["count"], page["page"]) == (2, 1, 2)
+
+    assert client.get("/search?q=robotique&types=inconnu").status_code == 400
+    assert client.get("/search?q=robotique&per_page=100").status_code == 422
+
+
+def test_search_unavailable_while_index_builds(client, db, monkeypatch):
+    from services.search import search_index
+    monkeypatch.setattr(search_index, "background", True)
+    monkeypatch.setattr(search_index, "session_factory", sessionmaker())
+    monkeypatch.setattr(search_index, "build_in_background", lambda: True)
+
+    response = client.get("/search?q=robotique")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+
+
+def test_index_follows_orm_and_raw_writes(client, db):
+    users = make_directory(db, n=1)
+    profile_id = users[0].profile.id
+    assert client.get("/search?q=hydrologie").json()["total"] == 0
+
+    project = Project(profile_id=profile_id, year=2024, title="Hydrologie urbaine", coauthor=[])
+    db.add(project)
+    db.commit()
+    assert [r["id"] for r in client.get("/search?q=hydrologie").json()["results"]] == [project.id]
+
+    db.delete(project)
+    db.commit()
+    assert client.get("/search?q=hydrologie").json()["total"] == 0
+
+    # Compétences écrites en SQL brut (routes/cv.py)
+    db.execute(text("INSERT INTO technical_skills (profile_id, skill_name, level) VALUES (:pid, 'Hydrologie', 3)"),
+               {"pid": profile_id})
+    db.commit()
+    assert client.get("/search?q=hydrologie").json()["results"][0]["type"] == "researcher"
+
+    # Chercheur désactivé : retiré des résultats
+    users[0].status = "inactive"
+    db.commit()
+    assert client.get("/search?q=hydrologie").json()["total"] == 0
+
+
+def test_postgresql_query_and_schema():
+    sql = pg_search_sql(("project", "researcher"))
+    assert "d.search_vector @@ q.tsq" in sql
+    assert "u.status = 'active'" in sql
+    assert "FROM publications" not in sql
+    assert "ts_headline" in sql and "LIMIT :limit OFFSET :offset" in sql
+
+    ddl = "\n".join(search_schema_ddl())
+    for table in ("projects", "publications", "cours", "profiles"):
+        assert f"ix_{table}_search_vector ON {table} USING gin (search_vector)" in ddl
+    assert "WITH unaccent, french_stem" in ddl
+    assert "unaccent" not in "\n".join(search_schema_ddl(unaccent=False))
@@ -0,0 +1,161 @@
+# tests/test_stats_rollups.py
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, event, select
+
+from models.audit import Audit, AuditAction, classify_action
+from models.message_contact import MessageContact
+from models.profile import Profile
+from models.stats_rollup import AuditRollup, MessageRollup
+from models.user import User
+from services.rollups import bucket_expr, bucket_start, rebuild_rollups
+from tests.test_researcher_public import auth_headers
+
+
+def make_admin(db):
+    admin = User(email="admin@test.com", password="x", role="admin", status="active")
+    db.add(admin)
+    db.commit()
+    return admin
+
+
+def add_audits(db, user, dates, description="Connexion réussie"):
+    for date in dates:
+        db.add(Audit(user_id=user.id, user_role=user.role, action_description=description, date=date))
+    db.commit()
+
+
+def rollup_rows(db):
+    return sorted(
+        (r.granularity, r.bucket_start, r.user_role, r.action_type, r.count)
+        for r in db.query(AuditRollup).all()
+    )
+
+
+def test_bucket_expr_matches_python_bucketing(db):
+    value = datetime(2026, 3, 14, 15, 9, 26, 535897)
+    for granularity in ("hour", "day", "month"):
+        sql = db.execute(select(bucket_expr(value, granularity, "sqlite"))).scalar()
+        assert datetime.fromisoformat(sql) == bucket_start(value, granularity)
+
+
+def test_action_classification():
+    assert classify_action("Connexion réussie") == AuditAction.LOGIN
+    assert classify_action("Déconnexion") == AuditAction.LOGOUT
+    assert classify_action("Tentative d'accès non autorisée à /admin") == AuditAction.FORBIDDEN
+    assert classify_action("Publication supprimée: X") == AuditAction.DELETE
+    assert classify_action("Quelque chose d'autre") == AuditAction.OTHER
+
+
+def test_insert_updates_hour_and_day_rollups(db):
+    admin = make_admin(db)
+    add_audits(db, admin, [datetime(2026, 1, 5, 10, 5), datetime(2026, 1, 5, 10, 40), datetime(2026, 1, 5, 11, 0)])
+
+    rows = rollup_rows(db)
+    assert ("day", datetime(2026, 1, 5), "admin", "login", 3) in rows
+    assert ("hour", datetime(2026, 1, 5, 10), "admin", "login", 2) in rows
+    assert ("hour", datetime(2026, 1, 5, 11), "admin", "login", 1) in rows
+
+
+def test_rebuild_matches_incremental(db):
+    admin = make_admin(db)
+    add_audits(db, admin, [datetime(2026, 1, 5, 10, 5), datetime(2026, 2, 1, 0, 0)])
+    add_audits(db, admin, [datetime(2026, 2, 1, 23, 59)], description="Export CSV utilisateurs")
+    incremental = rollup_rows(db)
+
+    db.query(AuditRollup).delete()
+    db.commit()
+    rebuild_rollups(db)
+
+    assert rollup_rows(db) == incremental
+
+
+def test_message_rollup_counts_inserts_and_deletes(db):
+    user = make_admin(db)
+    profile = Profile(user_id=user.id, grade="Docteur")
+    db.add(profile)
+    db.commit()
+    messages = [
+        MessageContact(profile_id=profile.id, sender_name="A", sender_email="a@test.com",
+                       message="Bonjour", created_at=datetime(2026, 4, day))
+        for day in (1, 20)
+    ]
+    db.add_all(messages)
+    db.commit()
+    db.delete(messages[0])
+    db.commit()
+
+    rollup = db.query(MessageRollup).one()
+    assert (rollup.bucket_start, rollup.count) == (datetime(2026, 4, 1), 1)
+
+
+def test_audit_stats_reads_rollups_only(client, db):
+    admin = make_admin(db)
+    add_audits(db, admin, [datetime(2026, 1, 5, 10), datetime(2026, 1, 6, 9), datetime(2026, 1, 6, 18)])
+    headers = auth_headers(admin)
+
+    statements = []
+    listener = lambda conn, cursor, stmt, *args: statements.append(stmt)
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    response = client.get("/admin/audit-stats?from=2026-01-06&to=2026-01-31", headers=headers)
+    event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    assert response.status_code == 200
+    assert response.json() == [{"date": "2026-01-06", "count": 2}]
+    assert not any("FROM audits" in stmt for stmt in statements)
+
+    hourly = client.get("/admin/audit-stats?from=2026-01-06&bucket=hour", headers=headers).json()
+    assert [h["date"] for h in hourly][:2] == ["2026-01-06 09:00", "2026-01-06 18:00"]
+
+    monthly = client.get("/admin/audit-stats?bucket=month", headers=headers).json()
+    assert monthly[0] == {"date": "2026-01", "count": 3}
+
+    assert client.get("/admin/audit-stats?bucket=week", headers=headers).status_code == 400
+
+
+def test_dashboard_charts_accept_range(client, db):
+    admin = make_admin(db)
+    now = datetime.utcnow()
+    add_audits(db, admin, [now - timedelta(days=60), now - timedelta(days=1)])
+    headers = auth_headers(admin)
+
+    default = client.get("/api/dashboard/charts", headers=headers).json()
+    assert sum(default["audits"]["data"]) == 1
+
+    start = (now - timedelta(days=90)).date().isoformat()
+    ranged = client.get(f"/api/dashboard/charts?from={start}&bucket=month", headers=headers).json()
+    assert sum(ranged["audits"]["data"]) == 2
+
+
+def test_rollups_updated_after_commit_only(db):
+    admin = make_admin(db)
+    db.add(Audit(user_id=admin.id, user_role=admin.role, action_description="Connexion réussie",
+                 date=datetime(2026, 1, 5, 10)))
+    db.flush()
+    assert db.query(AuditRollup).count() == 0  # pas de verrou sur les cumuls pendant la transaction
+    db.commit()
+    assert ("day", datetime(2026, 1, 5), "admin", "login", 1) in rollup_rows(db)
+
+    db.add(Audit(user_id=admin.id, user_role=admin.role, action_description="Connexion réussie",
+                 date=datetime(2026, 1, 5, 11)))
+    db.flush()
+    db.rollback()
+    assert ("day", datetime(2026, 1, 5), "admin", "login", 1) in rollup_rows(db)
+
+
+def test_full_rebuild_keeps_purged_months(db):
+    admin = make_admin(db)
+    add_audits(db, admin, [datetime(2026, 1, 5, 10), datetime(2026, 2, 3, 9)])
+    before = rollup_rows(db)
+
+    # Rétention : janvier archivé puis supprimé des audits bruts
+    db.execute(delete(Audit).where(Audit.date < datetime(2026, 2, 1)))
+    db.commit()
+    rebuild_rollups(db)
+    assert rollup_rows(db) == before
+
+    # Plus aucun audit brut : les cumuls restent intacts
+    db.execute(delete(Audit))
+    db.commit()
+    rebuild_rollups(db)
+    assert rollup_rows(db) == before
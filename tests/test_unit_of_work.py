@@ -0,0 +1,79 @@
+# tests/test_unit_of_work.py
+import pytest
+from sqlalchemy import event
+
+from database import unit_of_work
+from models.user import User
+from models.profile import Profile
+from models.audit import Audit
+
+
+class CommitCounter:
+    """Compte les COMMIT de la requête (hors mise à jour des cumuls après commit)"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _callback(self, conn):
+        if not conn.get_execution_options().get("rollups"):
+            self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, "commit", self._callback)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "commit", self._callback)
+
+
+def test_rollback_on_failure_leaves_nothing(db):
+    with pytest.raises(RuntimeError):
+        with unit_of_work(db):
+            user = User(email="moitie@test.com", password="x", role="researcher", status="pending")
+            db.add(user)
+            db.flush()
+            db.add(Profile(user_id=user.id, first_name="A", last_name="B", grade="MCF"))
+            raise RuntimeError("étape suivante en échec")
+
+    assert db.query(User).filter(User.email == "moitie@test.com").first() is None
+    assert db.query(Profile).count() == 0
+
+
+def test_users_register_commits_once(client, db):
+    payload = {"email": "unique@test.com", "password": "Secret123!", "first_name": "Ada", "last_name": "L"}
+
+    with CommitCounter(db.get_bind()) as counter:
+        response = client.post("/users/users/register", json=payload)
+
+    assert response.status_code == 200
+    assert counter.count == 1
+
+    user = db.query(User).filter(User.email == "unique@test.com").one()
+    assert db.query(Profile).filter(Profile.user_id == user.id).count() == 1
+    assert db.query(Audit).filter(Audit.user_id == user.id).count() == 1
+
+
+def test_auth_register_commits_once(client, db):
+    payload = {"email": "auth@test.com", "password": "Secret123!", "first_name": "Ada", "last_name": "L"}
+
+    with CommitCounter(db.get_bind()) as counter:
+        response = client.post("/auth/register", json=payload)
+
+    assert response.status_code == 200
+    assert counter.count == 1
+
+
+def test_failed_register_does_not_leave_half_created_user(client, db, monkeypatch):
+    import routes.user as user_routes
+
+    def broken_profile(**kwargs):
+        raise RuntimeError("profil impossible")
+
+    monkeypatch.setattr(user_routes, "Profile", broken_profile)
+    payload = {"email": "casse@test.com", "password": "Secret123!"}
+
+    with pytest.raises(RuntimeError):
+        client.post("/users/users/register", json=payload)
+
+    assert db.query(User).filter(User.email == "casse@test.com").first() is None